@@ -0,0 +1,393 @@
+import json
+import tracemalloc
+from asyncio import run
+from pathlib import Path
+from time import perf_counter_ns, perf_counter
+from typing import Callable, Optional
+
+import click
+import numpy as np
+from datek_agar_core.game import FOOD_RESPAWN_SECONDS, REFRESH_FREQUENCY, Simulation
+from datek_agar_core.lifecycle import FoodLifecycle
+from datek_agar_core.network.server import GameStatusFilter
+from datek_agar_core.types import Organism, id_allocator
+from datek_agar_core.universe import Universe, HALF_PI
+from datek_agar_core.utils import create_logger
+from datek_agar_core.world import World, OrganismStore
+from pydantic import BaseModel
+
+PHASES = (
+    "move_bacterias",
+    "merge_cells",
+    "age_food",
+    "place_food",
+    "feed_bacterias_to_other_bacterias",
+    "feed_organisms_to_bacterias",
+    "filter_game_status",
+)
+
+FOOD_LIFETIME_SECONDS = 60
+"""
+Food of the benchmark worlds decays after 0-2 times of this, so only a small
+part of it decays during a run and the food density stays steady
+"""
+
+
+class WorldConfig(BaseModel):
+    bacteria_count: int
+    food_density: float
+    """Food organisms per square micrometer"""
+    world_size: float
+    cells_per_player: int = 1
+    """`bacteria_count` counts the cells"""
+    tick_rate: float = REFRESH_FREQUENCY
+    """Turns per second of the simulation"""
+
+
+class PhaseResult(BaseModel):
+    ns_per_op: float
+    ops: int
+
+
+class ScenarioResult(BaseModel):
+    config: WorldConfig
+    ticks: int
+    phases: dict[str, PhaseResult]
+    tick_p50_ns: float
+    tick_p99_ns: float
+
+
+class EntityStorageResult(BaseModel):
+    count: int
+    model_bytes: int
+    model_seconds: float
+    store_bytes: int
+    store_seconds: float
+
+
+class Regression(BaseModel):
+    scenario: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def slowdown(self) -> float:
+        return self.current / self.baseline - 1
+
+    def __str__(self):
+        return (
+            f"{self.scenario}.{self.metric}: {self.baseline:.0f} ns -> "
+            f"{self.current:.0f} ns (+{self.slowdown:.1%})"
+        )
+
+
+SCENARIOS = {
+    "small": WorldConfig(bacteria_count=10, food_density=0.02, world_size=200),
+    "medium": WorldConfig(bacteria_count=50, food_density=0.02, world_size=400),
+    "large": WorldConfig(bacteria_count=200, food_density=0.05, world_size=1000),
+    "split": WorldConfig(
+        bacteria_count=800, food_density=0.02, world_size=400, cells_per_player=16
+    ),
+    "crowded": WorldConfig(
+        bacteria_count=4000, food_density=0.05, world_size=1000, cells_per_player=16
+    ),
+}
+
+
+def build_world(
+    config: WorldConfig, seed: int = 0
+) -> tuple[Universe, World, list[str]]:
+    """
+    Creates a populated world with moving bacterias and a nutrient budget which
+    keeps the food count at the configured density.
+    Returns the universe, the world and the addresses of the players.
+    """
+    rng = np.random.default_rng(seed)
+    food_count = int(config.food_density * config.world_size**2)
+    bacteria_radii = rng.uniform(
+        Universe.BACTERIA_STARTING_RADIUS,
+        Universe.BACTERIA_STARTING_RADIUS * 4,
+        config.bacteria_count,
+    )
+    total_nutrient = (
+        food_count * Universe.FOOD_ORGANISM_SIZE
+        + float(np.sum(bacteria_radii**2)) * HALF_PI
+    )
+
+    universe = Universe(total_nutrient=total_nutrient, world_size=config.world_size)
+    world = World()
+
+    angles = rng.uniform(0, 2 * np.pi, config.bacteria_count)
+    max_speeds = universe.calculate_organism_max_speed(bacteria_radii)
+    ids = id_allocator.create_many(config.bacteria_count)
+    owners = np.repeat(ids[:: config.cells_per_player], config.cells_per_player)
+    world.bacterias.add(
+        rng.uniform(0, config.world_size, (config.bacteria_count, 2)),
+        bacteria_radii,
+        speeds=np.stack((np.cos(angles), np.sin(angles)), axis=1) * max_speeds[:, None],
+        max_speeds=max_speeds,
+        owners=owners[: config.bacteria_count],
+        ids=ids,
+    )
+
+    world.organisms.add(rng.uniform(0, config.world_size, (food_count, 2)))
+
+    player_count = len(range(0, config.bacteria_count, config.cells_per_player))
+    addresses = [f"127.0.0.1:{10000 + i}" for i in range(player_count)]
+
+    return universe, world, addresses
+
+
+def build_lifecycle(config: WorldConfig, seed: int = 0) -> FoodLifecycle:
+    return FoodLifecycle(
+        min_lifetime_turns=1,
+        max_lifetime_turns=round(FOOD_LIFETIME_SECONDS * 2 * config.tick_rate),
+        respawn_turns=round(FOOD_RESPAWN_SECONDS * config.tick_rate),
+        seed=seed,
+    )
+
+
+def run_scenario(config: WorldConfig, ticks: int, seed: int = 0) -> ScenarioResult:
+    return run(_run_scenario(config, ticks, seed))
+
+
+def measure_entity_storage(count: int, seed: int = 0) -> EntityStorageResult:
+    """
+    Compares the memory usage and construction time of `count` food organisms
+    as pydantic models and in an `OrganismStore`
+    """
+    positions = np.random.default_rng(seed).uniform(0, 1000, (count, 2))
+    position_tuples = [tuple(position) for position in positions.tolist()]
+
+    def create_models():
+        return [Organism(position=position) for position in position_tuples]
+
+    def create_store():
+        store = OrganismStore()
+        store.add(positions)
+        return store
+
+    model_seconds, model_bytes = _measure(create_models)
+    store_seconds, store_bytes = _measure(create_store)
+
+    return EntityStorageResult(
+        count=count,
+        model_bytes=model_bytes,
+        model_seconds=model_seconds,
+        store_bytes=store_bytes,
+        store_seconds=store_seconds,
+    )
+
+
+def compare_results(
+    baseline: dict[str, ScenarioResult],
+    current: dict[str, ScenarioResult],
+    threshold: float,
+) -> list[Regression]:
+    """
+    :param threshold: allowed relative slowdown, 0.2 means 20%
+    """
+    regressions = []
+
+    for name, result in current.items():
+        if (baseline_result := baseline.get(name)) is None:
+            continue
+
+        for metric, (baseline_value, current_value) in _metric_pairs(
+            baseline_result, result
+        ).items():
+            if baseline_value and current_value > baseline_value * (1 + threshold):
+                regressions.append(
+                    Regression(
+                        scenario=name,
+                        metric=metric,
+                        baseline=baseline_value,
+                        current=current_value,
+                    )
+                )
+
+    return regressions
+
+
+def load_results(path: Path) -> dict[str, ScenarioResult]:
+    data = json.loads(path.read_text())
+    return {name: ScenarioResult(**value) for name, value in data.items()}
+
+
+def save_results(path: Path, results: dict[str, ScenarioResult]):
+    data = {name: result.dict() for name, result in results.items()}
+    path.write_text(json.dumps(data, indent=2))
+
+
+@click.command()
+@click.option(
+    "--scenario",
+    "scenarios",
+    multiple=True,
+    type=click.Choice(list(SCENARIOS)),
+    help="Scenario to run, can be repeated. Runs every scenario by default",
+)
+@click.option("--ticks", default=50, help="Simulated ticks per scenario")
+@click.option("--seed", default=0, help="Random seed")
+@click.option("--baseline", type=click.Path(path_type=Path), help="Baseline JSON")
+@click.option(
+    "--save-baseline",
+    is_flag=True,
+    help="Store the results as the new baseline instead of comparing",
+)
+@click.option("--threshold", default=0.2, help="Allowed relative slowdown")
+@click.option(
+    "--entities",
+    default=0,
+    help="Compare the storage of this many food organisms as models and arrays",
+)
+def run_benchmark(
+    scenarios: tuple[str],
+    ticks: int,
+    seed: int,
+    baseline: Optional[Path],
+    save_baseline: bool,
+    threshold: float,
+    entities: int,
+):
+    if entities:
+        _log_entity_storage(measure_entity_storage(entities, seed))
+
+    results = {
+        name: run_scenario(SCENARIOS[name], ticks, seed)
+        for name in scenarios or SCENARIOS
+    }
+
+    for name, result in results.items():
+        _log_result(name, result)
+
+    if baseline is None:
+        return
+
+    if save_baseline or not baseline.exists():
+        save_results(baseline, results)
+        _logger.info(f"Baseline saved to {baseline}")
+        return
+
+    regressions = compare_results(load_results(baseline), results, threshold)
+    for regression in regressions:
+        _logger.error(f"Regression: {regression}")
+
+    if regressions:
+        raise SystemExit(1)
+
+
+async def _run_scenario(config: WorldConfig, ticks: int, seed: int) -> ScenarioResult:
+    universe, world, addresses = build_world(config, seed)
+    lifecycle = build_lifecycle(config, seed)
+    lifecycle.on_spawn(world.organisms.ids)
+    simulation = Simulation(
+        universe=universe,
+        world=world,
+        seed=seed,
+        lifecycle=lifecycle,
+        tick_rate=config.tick_rate,
+    )
+    game_status_filter = GameStatusFilter(universe)
+
+    for id_, address in zip(np.unique(world.bacterias.owners).tolist(), addresses):
+        await game_status_filter.register_player(id_, address)
+
+    async def filter_game_status():
+        await game_status_filter.set_world(world.copy())
+        for address in addresses:
+            await game_status_filter.get_filtered_game_status(address)
+
+    phases: dict[str, Callable] = {
+        "move_bacterias": simulation.move_bacterias,
+        "merge_cells": simulation.merge_cells,
+        "age_food": simulation.age_food,
+        "place_food": simulation.place_food,
+        "feed_bacterias_to_other_bacterias": simulation.feed_bacterias_to_other_bacterias,
+        "feed_organisms_to_bacterias": simulation.feed_organisms_to_bacterias,
+    }
+
+    phase_times = {name: [] for name in PHASES}
+    tick_times = []
+
+    for _ in range(ticks):
+        tick_start = perf_counter_ns()
+        for name, phase in phases.items():
+            start = perf_counter_ns()
+            phase()
+            phase_times[name].append(perf_counter_ns() - start)
+
+        start = perf_counter_ns()
+        await filter_game_status()
+        end = perf_counter_ns()
+        phase_times["filter_game_status"].append(end - start)
+        tick_times.append(end - tick_start)
+
+    return ScenarioResult(
+        config=config,
+        ticks=ticks,
+        phases={
+            name: PhaseResult(ns_per_op=float(np.mean(times)), ops=len(times))
+            for name, times in phase_times.items()
+        },
+        tick_p50_ns=float(np.percentile(tick_times, 50)),
+        tick_p99_ns=float(np.percentile(tick_times, 99)),
+    )
+
+
+def _metric_pairs(
+    baseline: ScenarioResult, current: ScenarioResult
+) -> dict[str, tuple[float, float]]:
+    pairs = {
+        name: (baseline.phases[name].ns_per_op, phase.ns_per_op)
+        for name, phase in current.phases.items()
+        if name in baseline.phases
+    }
+    pairs["tick_p50"] = (baseline.tick_p50_ns, current.tick_p50_ns)
+    pairs["tick_p99"] = (baseline.tick_p99_ns, current.tick_p99_ns)
+    return pairs
+
+
+def _measure(create: Callable) -> tuple[float, int]:
+    start = perf_counter()
+    created = create()
+    seconds = perf_counter() - start
+    del created
+
+    tracemalloc.start()
+    created = create()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del created
+
+    return seconds, allocated
+
+
+def _log_entity_storage(result: EntityStorageResult):
+    _logger.info(f"{result.count} food organisms:")
+    _logger.info(
+        f"  models: {result.model_bytes / 2**20:.1f} MiB, "
+        f"{result.model_seconds * 1000:.1f} ms"
+    )
+    _logger.info(
+        f"  store: {result.store_bytes / 2**20:.1f} MiB, "
+        f"{result.store_seconds * 1000:.1f} ms"
+    )
+
+
+def _log_result(name: str, result: ScenarioResult):
+    config = result.config
+    _logger.info(
+        f"{name}: bacterias={config.bacteria_count} "
+        f"food_density={config.food_density} world_size={config.world_size}"
+    )
+    for phase_name, phase in result.phases.items():
+        _logger.info(f"  {phase_name}: {phase.ns_per_op:.0f} ns/op")
+
+    _logger.info(
+        f"  tick p50: {result.tick_p50_ns:.0f} ns, p99: {result.tick_p99_ns:.0f} ns"
+    )
+
+
+_logger = create_logger(__name__)
@@ -1,15 +1,30 @@
-from asyncio import Queue, Task, sleep, Lock
+from asyncio import Queue, Task, sleep, Lock, get_running_loop
 from math import floor, pi, sin, cos
-from random import random, uniform
-from typing import Iterable, Set, Union
+from time import perf_counter
+from typing import Iterable, Union, Optional
 
 import numpy as np
-from datek_agar_core.types import GameStatus, Bacteria, Organism, Position
-from datek_agar_core.universe import Universe, HALF_PI
+from datek_agar_core.lifecycle import FoodLifecycle, FoodLifecycleState
+from datek_agar_core.metrics import metrics
+from datek_agar_core.overload import OverloadController, OverloadLevel, FOOD_DEFER_TURNS
+from datek_agar_core.profiler import TurnProfiler
+from datek_agar_core.shared_ring import WorldRingPublisher
+from datek_agar_core.persistence import Snapshot, SnapshotHeader, validate_header
+from datek_agar_core.types import GameStatus, Bacteria, Position, id_allocator
+from datek_agar_core.universe import Universe, HALF_PI, ScratchBuffer
 from datek_agar_core.utils import run_forever, AsyncWorker, async_log_error
+from datek_agar_core.world import World
 
 REFRESH_FREQUENCY = 40
+"""Default turns per second"""
 REFRESH_INTERVAL = 1 / REFRESH_FREQUENCY
+MERGE_SECONDS = 10
+"""Time after a split until the cells can merge again"""
+FOOD_RESPAWN_SECONDS = 5
+"""Time after the nutrient of a decayed organism is placed again"""
+
+GRID_CELL_RADII = 2
+"""Size of the cells of the neighbour search grid in typical radii"""
 
 
 class Game(AsyncWorker):
@@ -18,43 +33,161 @@ class Game(AsyncWorker):
         *,
         game_status_queue: Queue,
         universe: Universe,
+        profiler: Optional[TurnProfiler] = None,
+        food_lifetime_seconds: float = 0,
+        tick_rate: float = REFRESH_FREQUENCY,
+        broadcast_every: int = 1,
+        overload_controller: Optional[OverloadController] = None,
+        ring_publisher: Optional[WorldRingPublisher] = None,
     ):
+        """
+        :param food_lifetime_seconds: food organisms decay after 1-2 times of
+            this, 0 means they never decay
+        :param tick_rate: turns per second
+        :param broadcast_every: the world is put to the game status queue
+            in every `broadcast_every` turns
+        :param overload_controller: observes the turn times, on higher levels
+            the world is put to the queue half as often and food is placed
+            less often
+        :param ring_publisher: the world is published to it in every turn
+        """
         self._universe = universe
-        self._game_status = GameStatus()
+        self._profiler = profiler
+        self._world = World()
         self._game_status_queue = game_status_queue
-        self._simulation = Simulation(universe=universe, game_status=self._game_status)
+        self._tick_rate = tick_rate
+        self._tick_interval = 1 / tick_rate
+        self._broadcast_every = max(broadcast_every, 1)
+        self._next_turn_time = 0.0
+        self._overload_controller = overload_controller
+        self._overload_level = OverloadLevel.NORMAL
+        self._simulation = Simulation(
+            universe=universe,
+            world=self._world,
+            lifecycle=create_food_lifecycle(food_lifetime_seconds, tick_rate=tick_rate)
+            if food_lifetime_seconds
+            else None,
+            tick_rate=tick_rate,
+        )
         self._lock = Lock()
+        self._phases = (
+            ("move_bacterias", self._simulation.move_bacterias),
+            ("merge_cells", self._simulation.merge_cells),
+            ("age_food", self._simulation.age_food),
+            ("place_food", self._place_food),
+            (
+                "feed_bacterias_to_other_bacterias",
+                self._simulation.feed_bacterias_to_other_bacterias,
+            ),
+            (
+                "feed_organisms_to_bacterias",
+                self._simulation.feed_organisms_to_bacterias,
+            ),
+        )
+        if ring_publisher:
+            self._phases += (
+                ("publish_ring", lambda: ring_publisher.publish(self._world)),
+            )
 
         self._task: Task = ...
 
+    @property
+    def tick_rate(self) -> float:
+        return self._tick_rate
+
+    @property
+    def broadcast_every(self) -> int:
+        return self._broadcast_every
+
     async def change_bacteria_speed(
         self,
         id_: int,
         speed_polar_coordinates: Union[Position, tuple[float, float], list[float]],
     ):
-        bacteria = self._game_status.get_bacteria_by_id(id_)
-        current_speed = bacteria.max_speed * speed_polar_coordinates[0]
+        """
+        Sets the speed of every cell of the player. `id_` is the player's id.
+        """
+        bacterias = self._world.bacterias
+        rows = bacterias.rows_of_owner(id_)
+        current_speeds = bacterias.max_speeds[rows] * speed_polar_coordinates[0]
+
+        bacterias.speeds[rows] = np.outer(
+            current_speeds,
+            (cos(speed_polar_coordinates[1]), sin(speed_polar_coordinates[1])),
+        )
+
+    async def create_snapshot(self, sessions: dict[str, int] = None) -> Snapshot:
+        async with self._lock:
+            return Snapshot(
+                SnapshotHeader(
+                    world_size=self._universe.world_size,
+                    total_nutrient=self._universe.total_nutrient,
+                    turn=self._world.turn,
+                    current_id=id_allocator.current_id,
+                    random_state=self._simulation.random_state,
+                    sessions=sessions or {},
+                ),
+                self._world.copy(),
+                self._simulation.lifecycle_state,
+            )
 
-        bacteria.current_speed = np.array(
-            [
-                cos(speed_polar_coordinates[1]) * current_speed,
-                sin(speed_polar_coordinates[1]) * current_speed,
-            ],
-            np.float32,
+    def restore_snapshot(self, snapshot: Snapshot):
+        """
+        Has to be called before `start`
+        """
+        validate_header(snapshot.header, self._universe)
+        id_allocator.current_id = snapshot.header.current_id
+        self._simulation.restore(
+            snapshot.world, snapshot.header.random_state, snapshot.lifecycle
         )
 
+    async def has_player(self, id_: int) -> bool:
+        async with self._lock:
+            return bool(len(self._world.bacterias.rows_of_owner(id_)))
+
+    async def remove_player(self, id_: int):
+        """
+        Removes every cell of the player
+        """
+        async with self._lock:
+            bacterias = self._world.bacterias
+            bacterias.remove_rows(bacterias.rows_of_owner(id_))
+
+    async def split_bacteria(self, id_: int):
+        async with self._lock:
+            self._simulation.split_cells(id_)
+
+    async def eject(self, id_: int):
+        async with self._lock:
+            self._simulation.eject(id_)
+
     @async_log_error("Game")
     async def calculate_turn(self):
         async with self._lock:
-            if not self._game_status.bacterias:
+            if not self._world.bacterias:
                 return
 
-            self._simulation.move_bacterias()
-            self._simulation.place_food()
-            self._simulation.feed_bacterias_to_other_bacterias()
-            self._simulation.feed_organisms_to_bacterias()
+            turn_start = phase_start = perf_counter()
+            for name, phase in self._phases:
+                phase()
+                phase_end = perf_counter()
+                _phase_seconds.observe(phase_end - phase_start, name)
+                phase_start = phase_end
+
+            self._world.turn += 1
+            turn_seconds = phase_start - turn_start
+            _turn_seconds.observe(turn_seconds)
+            if turn_seconds > self._tick_interval:
+                _turn_overruns.inc()
 
-            await self._game_status_queue.put(self._game_status)
+            _entities.set(len(self._world.bacterias), "bacteria")
+            _entities.set(len(self._world.organisms), "organism")
+
+            if self._overload_controller:
+                self._overload_level = self._overload_controller.observe_turn()
+
+            if self._world.turn % self._broadcast_every == 0:
+                await self._game_status_queue.put(self._world.copy())
 
     async def add_bacteria(
         self, name: str, position: Iterable[float] = None
@@ -63,176 +196,458 @@ class Game(AsyncWorker):
             Universe.BACTERIA_STARTING_RADIUS
         )
         async with self._lock:
-            bacteria = Bacteria(
-                name=name,
-                hue=random(),
-                radius=Universe.BACTERIA_STARTING_RADIUS,
-                position=position
-                if position
-                else self._simulation.create_random_position(),
-                current_speed=[0, 0],
-                max_speed=max_speed,
+            (id_,) = self._world.bacterias.add(
+                np.array(
+                    [
+                        position
+                        if position
+                        else self._simulation.create_random_position()
+                    ]
+                ),
+                Universe.BACTERIA_STARTING_RADIUS,
+                max_speeds=max_speed,
+                names=[name],
+                hues=self._simulation.create_random_hue(),
             )
-            self._game_status.bacterias.append(bacteria)
 
-        return bacteria
+            return self._world.get_bacteria_by_id(int(id_))
+
+    def _place_food(self):
+        if (
+            self._overload_level < OverloadLevel.DEFERRED_FOOD
+            or self._world.turn % FOOD_DEFER_TURNS == 0
+        ):
+            self._simulation.place_food()
 
     async def _run(self):
+        self._next_turn_time = get_running_loop().time()
         self._started.set_result(1)
         await self._run_in_loop()
 
     @run_forever
     async def _run_in_loop(self):
+        if self._profiler:
+            self._profiler.on_turn()
+
         await self.calculate_turn()
-        await sleep(REFRESH_INTERVAL)
+
+        # Turns start at a fixed rate, a late turn doesn't make the next ones
+        # run faster to catch up
+        self._next_turn_time += self._tick_interval
+        delay = self._next_turn_time - get_running_loop().time()
+        if delay < 0:
+            self._next_turn_time -= delay
+
+        await sleep(max(delay, 0))
 
 
 class Simulation:
-    def __init__(self, *, universe: Universe, game_status: GameStatus):
+    def __init__(
+        self,
+        *,
+        universe: Universe,
+        world: World,
+        seed: int = None,
+        lifecycle: Optional[FoodLifecycle] = None,
+        tick_rate: float = REFRESH_FREQUENCY,
+    ):
         self._universe = universe
-        self._game_status = game_status
+        self._world = world
+        self._tick_rate = tick_rate
+        self._merge_turns = round(MERGE_SECONDS * tick_rate)
+        self._random = np.random.default_rng(seed)
+        self._lifecycle = lifecycle
+        self._distances = ScratchBuffer()
+        self._work = ScratchBuffer()
+        self._mask = ScratchBuffer(bool)
+
+    @property
+    def random_state(self) -> dict:
+        return self._random.bit_generator.state
+
+    @property
+    def lifecycle_state(self) -> Optional[FoodLifecycleState]:
+        return self._lifecycle.get_state() if self._lifecycle else None
+
+    def restore(
+        self,
+        world: World,
+        random_state: dict,
+        lifecycle_state: Optional[FoodLifecycleState] = None,
+    ):
+        """
+        Replaces the content of the world. Without `lifecycle_state` the
+        restored food gets new lifetimes.
+        """
+        self._world.organisms = world.organisms
+        self._world.bacterias = world.bacterias
+        self._world.turn = world.turn
+        self._random.bit_generator.state = random_state
+
+        if not self._lifecycle:
+            return
+
+        if lifecycle_state:
+            self._lifecycle.restore(lifecycle_state)
+        else:
+            self._lifecycle.on_spawn(world.organisms.ids)
 
     @property
     def total_in_game_organics_size(self) -> float:
-        return sum((organism.size for organism in self._game_status.organisms)) + sum(
-            (bacteria.size for bacteria in self._game_status.bacterias)
-        )
+        return self._world.organisms.total_size + self._world.bacterias.total_size
 
     def move_bacterias(self) -> None:
-        for bacteria in self._game_status.bacterias:
-            bacteria.position += bacteria.current_speed / REFRESH_FREQUENCY
-            bacteria.position %= self._universe.world_size
+        bacterias = self._world.bacterias
+        positions = bacterias.positions
+        positions += bacterias.speeds / self._tick_rate
+        np.mod(positions, self._universe.world_size, out=positions)
 
     def feed_bacterias_to_other_bacterias(self):
-        self._game_status.bacterias.sort(key=lambda item: item.size, reverse=True)
-        bacteria_ids = [bacteria.id for bacteria in self._game_status.bacterias]
+        """
+        Bacterias eat the ones whose center they reach if they are big enough.
+        Cells of the same player don't eat each other.
+        """
+        bacterias = self._world.bacterias
 
-        for id_ in bacteria_ids:
-            bacteria = self._game_status.get_bacteria_by_id(id_)
-            if not bacteria:
-                continue
-
-            bacterias = self.get_bacterias_to_eat(bacteria)
+        if len(bacterias) < 2:
+            return
 
-            if not bacterias:
-                continue
+        radii = bacterias.radii
+        owners = bacterias.owners
+        left, right, distances = self._find_pairs_within(
+            bacterias.positions, radii, bacterias.positions
+        )
 
-            self._modify_bacteria_size_and_speed(bacteria, bacterias)
-            self.remove_bacterias(set(bacterias))
+        edible = np.less(distances, radii[left] ** 2, out=self._mask.get(left.shape))
+        edible &= radii[left] / radii[right] >= Universe.MINIMAL_RADIUS_MODIFIER_TO_EAT
+        edible &= owners[left] != owners[right]
+
+        self._absorb(left[edible], right[edible])
+
+    def merge_cells(self):
+        """
+        Counts down the merge timers. Cells of a player whose timer is over
+        merge into the bigger one if its center is within the other.
+        Only the cell pairs of the same player are checked.
+        """
+        bacterias = self._world.bacterias
+        countdowns = bacterias.merge_countdowns
+        np.subtract(countdowns, 1, out=countdowns, where=countdowns > 0)
+
+        rows = np.flatnonzero(countdowns == 0)
+        rows = rows[np.argsort(bacterias.owners[rows], kind="stable")]
+        _, group_starts, group_sizes = np.unique(
+            bacterias.owners[rows], return_index=True, return_counts=True
+        )
+        left, right = _get_group_pairs(group_starts, group_sizes)
 
-    def feed_organisms_to_bacterias(self):
-        for bacteria in self._game_status.bacterias:
-            organisms = self.get_organisms_to_eat(bacteria)
+        if not len(left):
+            return
 
-            if not organisms:
-                continue
+        left = rows[left]
+        right = rows[right]
+        distances = self._universe.calculate_pair_squared_distances(
+            bacterias.positions[left],
+            bacterias.positions[right],
+            self._distances.get(left.shape),
+            self._work.get(left.shape),
+        )
+        merging = np.less(
+            distances,
+            np.maximum(bacterias.radii[left], bacterias.radii[right]) ** 2,
+            out=self._mask.get(left.shape),
+        )
 
-            self._modify_bacteria_size_and_speed(bacteria, organisms)
-            self.remove_organisms(set(organisms))
+        self._absorb(left[merging], right[merging])
+
+    def split_cells(self, owner_id: int):
+        """
+        The cells of the player which are big enough split into two halves,
+        the new half is placed in the direction of the movement.
+        The biggest cells split first, up to `Universe.MAX_CELL_COUNT` cells.
+        """
+        bacterias = self._world.bacterias
+        owner_rows = bacterias.rows_of_owner(owner_id)
+        sizes = bacterias.radii[owner_rows].astype(np.float64) ** 2 * HALF_PI
+        splitting = sizes >= Universe.MIN_SPLIT_SIZE
+        rows = owner_rows[splitting][
+            np.argsort(-sizes[splitting], kind="stable")[
+                : max(Universe.MAX_CELL_COUNT - len(owner_rows), 0)
+            ]
+        ]
 
-    def _modify_bacteria_size_and_speed(
-        self, bacteria: Bacteria, organisms_to_eat: list[Organism]
-    ):
-        size_increment = _calculate_size_summary(organisms_to_eat)
-        new_size = bacteria.size + size_increment
-        bacteria.radius = (new_size * 2 / pi) ** 0.5
-        previous_max_speed = bacteria.max_speed
-        max_speed = self._universe.calculate_organism_max_speed(bacteria.radius)
-        bacteria.max_speed = max_speed
-        bacteria.current_speed *= previous_max_speed / bacteria.max_speed
+        if not len(rows):
+            return
 
-    def create_random_position(self) -> tuple[float, float]:
-        return (
-            uniform(0, self._universe.world_size),
-            uniform(0, self._universe.world_size),
+        size_increments = np.zeros(len(bacterias))
+        size_increments[rows] = (
+            -(bacterias.radii[rows].astype(np.float64) ** 2) * HALF_PI / 2
+        )
+        self._grow_bacterias(size_increments)
+
+        radii = bacterias.radii[rows]
+        bacterias.merge_countdowns[rows] = self._merge_turns
+        bacterias.add(
+            self._move_forward(rows, 2 * radii),
+            radii,
+            speeds=bacterias.speeds[rows],
+            max_speeds=bacterias.max_speeds[rows],
+            names=bacterias.names[rows],
+            hues=bacterias.hues[rows],
+            owners=bacterias.owners[rows],
+            merge_countdowns=self._merge_turns,
         )
 
-    def place_food(self) -> None:
-        organism_count = floor(
-            (self._universe.total_nutrient - self.total_in_game_organics_size)
-            / Universe.FOOD_ORGANISM_SIZE
+    def eject(self, owner_id: int):
+        """
+        The cells of the player which are big enough lose an organism of
+        `Universe.EJECTED_ORGANISM_SIZE` in the direction of their movement
+        """
+        bacterias = self._world.bacterias
+        rows = bacterias.rows_of_owner(owner_id)
+        sizes = bacterias.radii[rows].astype(np.float64) ** 2 * HALF_PI
+        rows = rows[
+            sizes >= Universe.BACTERIA_STARTING_SIZE + Universe.EJECTED_ORGANISM_SIZE
+        ]
+
+        if not len(rows):
+            return
+
+        size_increments = np.zeros(len(bacterias))
+        size_increments[rows] = -Universe.EJECTED_ORGANISM_SIZE
+        self._grow_bacterias(size_increments)
+
+        self._add_organisms(
+            self._move_forward(
+                rows,
+                bacterias.radii[rows]
+                + Universe.EJECTED_ORGANISM_RADIUS
+                + Universe.EJECT_DISTANCE,
+            ),
+            Universe.EJECTED_ORGANISM_RADIUS,
         )
 
-        if organism_count < 1:
+    def _move_forward(self, rows: np.ndarray, distances: np.ndarray) -> np.ndarray:
+        """
+        Positions `distances` away from the bacterias in the direction of
+        their movement, standing bacterias look along the x-axis
+        """
+        bacterias = self._world.bacterias
+        speeds = bacterias.speeds[rows]
+        lengths = np.hypot(speeds[:, 0], speeds[:, 1])
+        directions = np.zeros_like(speeds)
+        directions[:, 0] = 1
+        moving = lengths > 0
+        directions[moving] = speeds[moving] / lengths[moving, None]
+
+        return (
+            bacterias.positions[rows] + directions * distances[:, None]
+        ) % self._universe.world_size
+
+    def _absorb(self, absorbers: np.ndarray, absorbed: np.ndarray):
+        """
+        The bacterias in `absorbers` absorb the ones at the same index of
+        `absorbed` in the order of their size, the bigger first. An absorbed
+        bacteria doesn't absorb anymore. Both are rows of the store.
+        """
+        if not len(absorbers):
             return
 
-        for _ in range(organism_count):
-            self._game_status.organisms.append(
-                Organism(
-                    position=self.create_random_position(),
-                    radius=Universe.FOOD_ORGANISM_RADIUS,
-                )
-            )
+        bacterias = self._world.bacterias
+        sizes = bacterias.radii.astype(np.float64) ** 2 * HALF_PI
+        order = np.lexsort((absorbers, -sizes[absorbers]))
+        absorbers = absorbers[order]
+        absorbed = absorbed[order]
+        starts = np.flatnonzero(np.diff(absorbers, prepend=-1))
+        ends = np.append(starts[1:], len(absorbers))
 
-        self._game_status.organisms.sort(key=lambda item: item.position[0])
+        alive = np.ones(len(bacterias), bool)
+        size_increments = np.zeros(len(bacterias))
 
-    def remove_organisms(self, organisms: Set[Organism]):
-        old_organisms = set(self._game_status.organisms)
-        self._game_status.organisms = list(old_organisms - organisms)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            row = absorbers[start]
+            if not alive[row]:
+                continue
 
-    def remove_bacterias(self, bacterias: Set[Bacteria]):
-        old_bacterias = set(self._game_status.bacterias)
-        self._game_status.bacterias = list(old_bacterias - bacterias)
+            targets = absorbed[start:end]
+            targets = targets[alive[targets]]
+            size_increments[row] = np.sum(sizes[targets])
+            alive[targets] = False
 
-    def get_organisms_to_eat(self, bacteria: Bacteria) -> list[Organism]:
-        if not self._game_status.organisms:
-            return []
+        self._grow_bacterias(size_increments)
+        bacterias.remove_rows(np.flatnonzero(~alive))
 
-        organism_positions = np.array(
-            [organism.position for organism in self._game_status.organisms], np.float32
-        )
-        relative_positions = self._universe.calculate_position_vector_array(
-            bacteria.position, organism_positions
+    def feed_organisms_to_bacterias(self):
+        """
+        An organism is eaten by the first bacteria in order which reaches it
+        """
+        organisms = self._world.organisms
+        bacterias = self._world.bacterias
+
+        if not len(organisms) or not len(bacterias):
+            return
+
+        eaters = self._find_first_reaching(
+            bacterias.positions, bacterias.radii, organisms.positions
         )
-        distances = (
-            relative_positions[:, 0] ** 2 + relative_positions[:, 1] ** 2
-        ) ** 0.5
+        rows = np.flatnonzero(eaters >= 0)
 
-        distance_id_map = {distances[id_]: id_ for id_ in range(len(distances))}
+        if not len(rows):
+            return
 
-        wanted_distances = distances[bacteria.radius >= distances]
+        size_increments = (
+            np.bincount(
+                eaters[rows],
+                weights=organisms.radii[rows].astype(np.float64) ** 2,
+                minlength=len(bacterias),
+            )
+            * HALF_PI
+        )
 
-        return [
-            self._game_status.organisms[distance_id_map[distance]]
-            for distance in wanted_distances
-        ]
+        self._grow_bacterias(size_increments)
+        organisms.remove_rows(rows)
+
+    def _find_first_reaching(
+        self, origins: np.ndarray, radii: np.ndarray, points: np.ndarray
+    ) -> np.ndarray:
+        """
+        Index of the first origin within whose radius the point is, for every
+        point. -1 if no origin reaches it.
+        """
+        result = np.full(len(points), -1, np.int64)
+        left, right, _ = self._find_pairs_within(origins, radii, points)
+        reached, first = np.unique(right, return_index=True)
+        result[reached] = left[first]
+
+        return result
+
+    def _find_pairs_within(
+        self, origins: np.ndarray, radii: np.ndarray, points: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Index pairs (i, j) of the origins and the points where point j is
+        within radius i of origin i, ordered by i, and their squared distances.
+        Only the points in the neighbouring cells of a grid are compared.
+        """
+        left, right = self._universe.find_candidate_pairs(
+            origins, radii, points, _get_grid_cell_size(radii)
+        )
+        shape = (len(left),)
+        distances = self._universe.calculate_pair_squared_distances(
+            origins[left],
+            points[right],
+            self._distances.get(shape),
+            self._work.get(shape),
+        )
+        within = distances <= radii[left] ** 2
 
-    def get_bacterias_to_eat(self, bacteria: Bacteria) -> list[Bacteria]:
-        bacteria_positions = []
-        position_id_map = {}
+        return left[within], right[within], distances[within]
 
-        for bacteria_ in self._game_status.bacterias:
-            if (
-                bacteria_.id == bacteria.id
-                or (bacteria.radius / bacteria_.radius)
-                < Universe.MINIMAL_RADIUS_MODIFIER_TO_EAT
-            ):
-                continue
+    def _grow_bacterias(self, size_increments: np.ndarray):
+        """
+        Changes the size of every bacteria by its increment and rescales its
+        speed to the new max speed, keeping the ratio of speed to max speed
+        """
+        bacterias = self._world.bacterias
+        rows = np.flatnonzero(size_increments)
 
-            bacteria_positions.append(bacteria_.position)
-            position_id_map[len(bacteria_positions) - 1] = bacteria_.id
+        if not len(rows):
+            return
 
-        if not bacteria_positions:
-            return []
+        sizes = bacterias.radii[rows].astype(np.float64) ** 2 * HALF_PI
+        radii = np.sqrt((sizes + size_increments[rows]) * 2 / pi)
+        max_speeds = self._universe.calculate_organism_max_speed(radii)
 
-        bacteria_positions = np.array(bacteria_positions, np.float32)
-        relative_positions = self._universe.calculate_position_vector_array(
-            bacteria.position, bacteria_positions
+        previous_max_speeds = bacterias.max_speeds[rows]
+        speed_ratios = np.divide(
+            max_speeds,
+            previous_max_speeds,
+            out=np.ones_like(max_speeds),
+            where=previous_max_speeds > 0,
         )
-        distances = (
-            relative_positions[:, 0] ** 2 + relative_positions[:, 1] ** 2
-        ) ** 0.5
 
-        wanted_ids = [
-            i for i in range(len(distances)) if distances[i] < bacteria.radius
-        ]
+        bacterias.speeds[rows] *= speed_ratios[:, None]
+        bacterias.radii[rows] = radii
+        bacterias.max_speeds[rows] = max_speeds
 
-        return [
-            self._game_status.get_bacteria_by_id(position_id_map[id_])
-            for id_ in wanted_ids
-        ]
+    def create_random_position(self) -> tuple[float, float]:
+        x, y = self._random.uniform(0, self._universe.world_size, 2).tolist()
+        return x, y
+
+    def create_random_hue(self) -> float:
+        return float(self._random.random())
+
+    def place_food(self) -> None:
+        pending_nutrient = self._lifecycle.pending_nutrient if self._lifecycle else 0
+        organism_count = floor(
+            (
+                self._universe.total_nutrient
+                - self.total_in_game_organics_size
+                - pending_nutrient
+            )
+            / Universe.FOOD_ORGANISM_SIZE
+        )
 
+        if organism_count < 1:
+            return
 
-def _calculate_size_summary(organisms: list[Organism]):
-    radius_array = np.array([organism.radius for organism in organisms], np.float32)
-    return sum(radius_array**2 * HALF_PI)
+        positions = self._random.uniform(
+            0, self._universe.world_size, (organism_count, 2)
+        )
+        self._add_organisms(positions, Universe.FOOD_ORGANISM_RADIUS)
+
+    def age_food(self):
+        if self._lifecycle:
+            _food_decayed.inc(self._lifecycle.advance(self._world.organisms))
+
+    def _add_organisms(self, positions: np.ndarray, radius: float):
+        ids = self._world.organisms.add(positions, radius)
+        if self._lifecycle:
+            self._lifecycle.on_spawn(ids)
+
+
+def create_food_lifecycle(
+    lifetime_seconds: float,
+    seed: int = None,
+    tick_rate: float = REFRESH_FREQUENCY,
+) -> FoodLifecycle:
+    lifetime_turns = round(lifetime_seconds * tick_rate)
+    return FoodLifecycle(
+        min_lifetime_turns=lifetime_turns,
+        max_lifetime_turns=lifetime_turns * 2,
+        respawn_turns=round(FOOD_RESPAWN_SECONDS * tick_rate),
+        seed=seed,
+    )
+
+
+def _get_grid_cell_size(radii: np.ndarray) -> float:
+    return GRID_CELL_RADII * float(np.median(radii))
+
+
+def _get_group_pairs(
+    starts: np.ndarray, sizes: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Index pairs (i, j), i != j of every group, the groups are runs of
+    consecutive indexes given by their starts and sizes
+    """
+    partner_counts = np.repeat(sizes, sizes)
+    left = np.repeat(np.arange(len(partner_counts)), partner_counts)
+    offsets = np.arange(len(left)) - np.repeat(
+        np.cumsum(partner_counts) - partner_counts, partner_counts
+    )
+    right = np.repeat(np.repeat(starts, sizes), partner_counts) + offsets
+    different = left != right
+
+    return left[different], right[different]
+
+
+_phase_seconds = metrics.histogram(
+    "turn_phase_seconds", "Duration of the simulation phases", ("phase",)
+)
+_turn_seconds = metrics.histogram("turn_seconds", "Duration of the simulation turns")
+_turn_overruns = metrics.counter(
+    "turn_overruns_total", "Turns which took longer than the refresh interval"
+)
+_entities = metrics.gauge("entities", "Entities in the world", ("type",))
+_food_decayed = metrics.counter("food_decayed_total", "Decayed food organisms")
@@ -0,0 +1,196 @@
+from collections import deque
+from typing import Any, Union
+
+import numpy as np
+from datek_agar_core.universe import HALF_PI
+from datek_agar_core.world import OrganismStore
+
+
+class ExpiryQueue:
+    """
+    Ids in buckets keyed by the tick on which they expire.
+    Scheduling and expiring cost depends on the number of ids concerned,
+    not on the number of ids waiting in the queue.
+    """
+
+    def __init__(self):
+        self._buckets: dict[int, list[np.ndarray]] = {}
+        self._tick = 0
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    def schedule(self, ids: np.ndarray, delays: Union[int, np.ndarray]):
+        """
+        `ids` expire `delays` ticks from now, at least in the next tick
+        """
+        if not len(ids):
+            return
+
+        ticks = self._tick + np.maximum(np.broadcast_to(delays, len(ids)), 1)
+        order = np.argsort(ticks, kind="stable")
+        unique_ticks, starts = np.unique(ticks[order], return_index=True)
+
+        for tick, bucket in zip(
+            unique_ticks.tolist(), np.split(ids[order], starts[1:])
+        ):
+            self._buckets.setdefault(tick, []).append(bucket)
+
+        self._length += len(ids)
+
+    def advance(self) -> np.ndarray:
+        """
+        Steps to the next tick and returns the ids which expire on it
+        """
+        self._tick += 1
+        buckets = self._buckets.pop(self._tick, None)
+
+        if not buckets:
+            return np.empty(0, np.int64)
+
+        ids = np.concatenate(buckets)
+        self._length -= len(ids)
+        return ids
+
+    def get_scheduled(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Ids waiting in the queue and the ticks on which they expire
+        """
+        buckets = [
+            (tick, bucket)
+            for tick, tick_buckets in self._buckets.items()
+            for bucket in tick_buckets
+        ]
+        if not buckets:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+
+        ids = np.concatenate([bucket for _, bucket in buckets]).astype(np.int64)
+        ticks = np.concatenate(
+            [np.full(len(bucket), tick, np.int64) for tick, bucket in buckets]
+        )
+        return ids, ticks
+
+    def restore(self, tick: int, ids: np.ndarray, ticks: np.ndarray):
+        """
+        Replaces the content of the queue with the result of `get_scheduled`
+        """
+        self._buckets = {}
+        self._tick = tick
+        self._length = 0
+        self.schedule(ids, ticks - tick)
+
+
+class FoodLifecycleState:
+    """
+    Decay and respawn schedule of a `FoodLifecycle`, for the snapshots
+    """
+
+    __slots__ = ("tick", "decay_ids", "decay_ticks", "respawn_queue", "random_state")
+
+    def __init__(
+        self,
+        *,
+        tick: int,
+        decay_ids: np.ndarray,
+        decay_ticks: np.ndarray,
+        respawn_queue: list[tuple[int, float]],
+        random_state: dict[str, Any],
+    ):
+        self.tick = tick
+        self.decay_ids = decay_ids
+        self.decay_ticks = decay_ticks
+        self.respawn_queue = respawn_queue
+        self.random_state = random_state
+
+
+class FoodLifecycle:
+    """
+    Food organisms decay after a random lifetime between `min_lifetime_turns`
+    and `max_lifetime_turns`. The nutrient of the decayed organisms is held
+    back for `respawn_turns` turns, then `Simulation.place_food` respawns it.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_lifetime_turns: int,
+        max_lifetime_turns: int,
+        respawn_turns: int,
+        seed: int = None,
+    ):
+        self._min_lifetime_turns = min_lifetime_turns
+        self._max_lifetime_turns = max(max_lifetime_turns, min_lifetime_turns)
+        self._respawn_turns = respawn_turns
+        self._random = np.random.default_rng(seed)
+        self._decay_queue = ExpiryQueue()
+        self._respawn_queue: deque[tuple[int, float]] = deque()
+        self._pending_nutrient = 0.0
+
+    @property
+    def pending_nutrient(self) -> float:
+        """Nutrient of the decayed organisms waiting for respawn"""
+        return self._pending_nutrient
+
+    @property
+    def scheduled_count(self) -> int:
+        return len(self._decay_queue)
+
+    def get_state(self) -> FoodLifecycleState:
+        decay_ids, decay_ticks = self._decay_queue.get_scheduled()
+        return FoodLifecycleState(
+            tick=self._decay_queue.tick,
+            decay_ids=decay_ids,
+            decay_ticks=decay_ticks,
+            respawn_queue=list(self._respawn_queue),
+            random_state=self._random.bit_generator.state,
+        )
+
+    def restore(self, state: FoodLifecycleState):
+        self._decay_queue.restore(state.tick, state.decay_ids, state.decay_ticks)
+        self._respawn_queue = deque(
+            (tick, nutrient) for tick, nutrient in state.respawn_queue
+        )
+        self._pending_nutrient = sum(nutrient for _, nutrient in self._respawn_queue)
+        self._random.bit_generator.state = state.random_state
+
+    def on_spawn(self, ids: np.ndarray):
+        self._decay_queue.schedule(
+            ids,
+            self._random.integers(
+                self._min_lifetime_turns, self._max_lifetime_turns + 1, len(ids)
+            ),
+        )
+
+    def advance(self, organisms: OrganismStore) -> int:
+        """
+        Removes the organisms which decay in this tick and releases the
+        nutrient which is due for respawn. Returns the number of decayed
+        organisms.
+        """
+        tick = self._decay_queue.tick + 1
+
+        while self._respawn_queue and self._respawn_queue[0][0] <= tick:
+            self._pending_nutrient -= self._respawn_queue.popleft()[1]
+
+        if not self._respawn_queue:
+            self._pending_nutrient = 0.0
+
+        rows = [organisms.row_of(id_) for id_ in self._decay_queue.advance().tolist()]
+        rows = np.array([row for row in rows if row is not None], np.int64)
+
+        if not len(rows):
+            return 0
+
+        nutrient = (
+            float(np.sum(organisms.radii[rows].astype(np.float64) ** 2)) * HALF_PI
+        )
+        organisms.remove_rows(rows)
+        self._respawn_queue.append((tick + self._respawn_turns, nutrient))
+        self._pending_nutrient += nutrient
+
+        return len(rows)
@@ -0,0 +1,307 @@
+import json
+from asyncio import open_connection, run, sleep, gather
+from concurrent.futures import ProcessPoolExecutor
+from math import pi
+from pathlib import Path
+from random import Random
+from time import perf_counter
+from typing import Callable, Optional
+
+import click
+import numpy as np
+from datek_agar_core.network.client import UDPClient
+from datek_agar_core.network.message import Message, MessageType
+from datek_agar_core.utils import create_logger
+from pydantic import BaseModel
+
+Pattern = Callable[[int, float, Random], Optional[tuple[float, float]]]
+"""Returns the polar speed coordinates of a bot at a given time or `None`"""
+
+
+def _still(index: int, elapsed: float, random: Random) -> None:
+    return None
+
+
+def _line(index: int, elapsed: float, random: Random) -> tuple[float, float]:
+    return 1, (index * 0.618 * 2 * pi) % (2 * pi)
+
+
+def _circle(index: int, elapsed: float, random: Random) -> tuple[float, float]:
+    return 1, (elapsed + index) % (2 * pi)
+
+
+def _random(index: int, elapsed: float, random: Random) -> tuple[float, float]:
+    return random.random(), random.uniform(0, 2 * pi)
+
+
+PATTERNS: dict[str, Pattern] = {
+    "still": _still,
+    "line": _line,
+    "circle": _circle,
+    "random": _random,
+}
+
+
+class BotStats(BaseModel):
+    connect_seconds: Optional[float] = None
+    connected_seconds: float = 0
+    frame_rate: float = 0
+    """Game status updates per second announced in the connect response"""
+    frames_received: int = 0
+    inter_arrival_seconds: list[float] = []
+
+
+class LoadTestReport(BaseModel):
+    bots: int
+    connected_bots: int
+    duration_seconds: float
+    connect_seconds_p50: Optional[float]
+    connect_seconds_p99: Optional[float]
+    inter_arrival_seconds_p50: Optional[float]
+    inter_arrival_seconds_p99: Optional[float]
+    jitter_seconds: Optional[float]
+    """Standard deviation of the state update inter-arrival times"""
+    frames_received: int
+    frames_expected: int
+    frames_lost: int
+    turn_overruns: Optional[float]
+    """Server side turn overruns during the test, requires the admin port"""
+
+
+class Bot:
+    def __init__(
+        self,
+        *,
+        index: int,
+        host: str,
+        port: int,
+        pattern: Pattern,
+        ping_interval_sec: float,
+        change_interval_sec: float,
+        seed: int,
+    ):
+        self._index = index
+        self._host = host
+        self._port = port
+        self._pattern = pattern
+        self._ping_interval_sec = ping_interval_sec
+        self._change_interval_sec = change_interval_sec
+        self._random = Random(seed + index)
+        self._stats = BotStats()
+        self._start = 0.0
+        self._connected_at: Optional[float] = None
+        self._last_arrival: Optional[float] = None
+
+    async def run(self, duration_seconds: float) -> BotStats:
+        client = UDPClient(
+            host=self._host,
+            port=self._port,
+            handle_message=self._handle_message,
+            player_name=f"bot-{self._index}",
+            ping_interval_sec=self._ping_interval_sec,
+        )
+        self._start = perf_counter()
+        end = self._start + duration_seconds
+        client.start()
+
+        while (now := perf_counter()) < end:
+            await sleep(min(self._change_interval_sec, end - now))
+            speed = self._pattern(self._index, now - self._start, self._random)
+            if speed is not None:
+                client.change_speed(speed)
+
+        client.stop()
+        await client.task
+
+        if self._connected_at is not None:
+            self._stats.connected_seconds = perf_counter() - self._connected_at
+
+        return self._stats
+
+    async def _handle_message(self, message: Message):
+        now = perf_counter()
+
+        if message.type == MessageType.CONNECT:
+            self._connected_at = now
+            self._stats.connect_seconds = now - self._start
+            if message.tick_rate and message.update_every:
+                self._stats.frame_rate = message.tick_rate / message.update_every
+        elif message.type == MessageType.GAME_STATUS_UPDATE:
+            self._stats.frames_received += 1
+            if self._last_arrival is not None:
+                self._stats.inter_arrival_seconds.append(now - self._last_arrival)
+
+            self._last_arrival = now
+
+
+async def run_bots(
+    *,
+    host: str,
+    port: int,
+    bots: int,
+    duration_seconds: float,
+    pattern: str = "random",
+    ping_interval_sec: float = 0.5,
+    change_interval_sec: float = 0.25,
+    first_index: int = 0,
+    seed: int = 0,
+) -> list[BotStats]:
+    return await gather(
+        *(
+            Bot(
+                index=index,
+                host=host,
+                port=port,
+                pattern=PATTERNS[pattern],
+                ping_interval_sec=ping_interval_sec,
+                change_interval_sec=change_interval_sec,
+                seed=seed,
+            ).run(duration_seconds)
+            for index in range(first_index, first_index + bots)
+        )
+    )
+
+
+def create_report(
+    stats: list[BotStats],
+    duration_seconds: float,
+    turn_overruns: Optional[float] = None,
+) -> LoadTestReport:
+    connect_seconds = [
+        item.connect_seconds for item in stats if item.connect_seconds is not None
+    ]
+    inter_arrivals = np.array(
+        [value for item in stats for value in item.inter_arrival_seconds]
+    )
+    frames_received = sum(item.frames_received for item in stats)
+    frames_expected = int(
+        sum(item.connected_seconds * item.frame_rate for item in stats)
+    )
+
+    return LoadTestReport(
+        bots=len(stats),
+        connected_bots=len(connect_seconds),
+        duration_seconds=duration_seconds,
+        connect_seconds_p50=_percentile(connect_seconds, 50),
+        connect_seconds_p99=_percentile(connect_seconds, 99),
+        inter_arrival_seconds_p50=_percentile(inter_arrivals, 50),
+        inter_arrival_seconds_p99=_percentile(inter_arrivals, 99),
+        jitter_seconds=float(np.std(inter_arrivals)) if len(inter_arrivals) else None,
+        frames_received=frames_received,
+        frames_expected=frames_expected,
+        frames_lost=max(frames_expected - frames_received, 0),
+        turn_overruns=turn_overruns,
+    )
+
+
+async def fetch_metric(host: str, port: int, name: str) -> Optional[float]:
+    """
+    Reads an unlabeled metric from the admin server of `run-server`
+    """
+    reader, writer = await open_connection(host, port)
+    writer.write(b"GET /metrics HTTP/1.1\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    for line in response.decode().splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] == name:
+            return float(parts[1])
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", help="Server host")
+@click.option("--port", default=9582, help="Server port")
+@click.option("--bots", default=10, help="Number of bots")
+@click.option("--processes", default=1, help="Number of processes running the bots")
+@click.option("--duration", default=10.0, help="Duration of the test in seconds")
+@click.option(
+    "--pattern",
+    default="random",
+    type=click.Choice(list(PATTERNS)),
+    help="Movement pattern of the bots",
+)
+@click.option("--ping-interval", default=0.5, help="Ping interval of the bots")
+@click.option(
+    "--change-interval", default=0.25, help="Interval of the bots' speed changes"
+)
+@click.option(
+    "--admin-port",
+    type=int,
+    default=None,
+    help="Admin port of the server, used to read the turn overruns",
+)
+@click.option("--seed", default=0, help="Random seed")
+@click.option("--report", type=click.Path(path_type=Path), help="Report JSON path")
+def run_load_test(
+    *,
+    host: str,
+    port: int,
+    bots: int,
+    processes: int,
+    duration: float,
+    pattern: str,
+    ping_interval: float,
+    change_interval: float,
+    admin_port: Optional[int],
+    seed: int,
+    report: Optional[Path],
+):
+    overruns_before = _fetch_overruns(host, admin_port)
+
+    bot_kwargs = dict(
+        host=host,
+        port=port,
+        duration_seconds=duration,
+        pattern=pattern,
+        ping_interval_sec=ping_interval,
+        change_interval_sec=change_interval,
+        seed=seed,
+    )
+    chunks = []
+    first_index = 0
+    for process_index in range(min(processes, bots)):
+        count = len(range(process_index, bots, processes))
+        chunks.append((first_index, count))
+        first_index += count
+
+    _logger.info(f"Starting {bots} bots in {len(chunks)} process(es)")
+    with ProcessPoolExecutor(len(chunks)) as executor:
+        futures = [
+            executor.submit(_run_bots_in_process, first_index, count, bot_kwargs)
+            for first_index, count in chunks
+        ]
+        stats = [item for future in futures for item in future.result()]
+
+    overruns_after = _fetch_overruns(host, admin_port)
+    turn_overruns = (
+        overruns_after - overruns_before
+        if overruns_before is not None and overruns_after is not None
+        else None
+    )
+
+    result = create_report(stats, duration, turn_overruns)
+    for key, value in result.dict().items():
+        _logger.info(f"{key}: {value}")
+
+    if report:
+        report.write_text(json.dumps(result.dict(), indent=2))
+
+
+def _run_bots_in_process(first_index: int, bots: int, kwargs: dict) -> list[BotStats]:
+    return run(run_bots(bots=bots, first_index=first_index, **kwargs))
+
+
+def _fetch_overruns(host: str, admin_port: Optional[int]) -> Optional[float]:
+    if admin_port is None:
+        return None
+
+    return run(fetch_metric(host, admin_port, "agar_turn_overruns_total"))
+
+
+def _percentile(values, percentile: float) -> Optional[float]:
+    return float(np.percentile(values, percentile)) if len(values) else None
+
+
+_logger = create_logger(__name__)
@@ -0,0 +1,242 @@
+from asyncio import StreamReader, StreamWriter, start_server, AbstractServer, Task
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from datek_agar_core.utils import AsyncWorker, create_logger
+
+DEFAULT_SECONDS_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+)
+
+LabelValues = tuple[str, ...]
+
+
+class _Metric:
+    TYPE = ""
+
+    __slots__ = ("name", "help", "label_names")
+
+    def __init__(self, name: str, help_: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help = help_
+        self.label_names = tuple(label_names)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.TYPE}"
+        yield from self._render_samples()
+
+    def _render_samples(self) -> Iterable[str]:
+        ...
+
+    def _format_labels(self, label_values: LabelValues, extra: str = "") -> str:
+        labels = [
+            f'{name}="{value}"' for name, value in zip(self.label_names, label_values)
+        ]
+        if extra:
+            labels.append(extra)
+
+        return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    __slots__ = ("_values",)
+
+    def __init__(self, name: str, help_: str, label_names: Iterable[str] = ()):
+        super().__init__(name, help_, label_names)
+        self._values: dict[LabelValues, float] = {} if self.label_names else {(): 0}
+
+    def inc(self, value: float = 1, *label_values: str):
+        self._values[label_values] = self._values.get(label_values, 0) + value
+
+    def get(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def _render_samples(self) -> Iterable[str]:
+        for label_values, value in self._values.items():
+            yield f"{self.name}{self._format_labels(label_values)} {value}"
+
+
+class Gauge(Counter):
+    TYPE = "gauge"
+
+    __slots__ = ()
+
+    def set(self, value: float, *label_values: str):
+        self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    __slots__ = ("_buckets", "_values")
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        label_names: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_SECONDS_BUCKETS,
+    ):
+        super().__init__(name, help_, label_names)
+        self._buckets = buckets
+        self._values: dict[LabelValues, _HistogramValue] = {}
+
+    def observe(self, value: float, *label_values: str):
+        if (histogram_value := self._values.get(label_values)) is None:
+            histogram_value = self._values[label_values] = _HistogramValue(
+                len(self._buckets)
+            )
+
+        histogram_value.bucket_counts[bisect_left(self._buckets, value)] += 1
+        histogram_value.sum += value
+        histogram_value.count += 1
+
+    def count(self, *label_values: str) -> int:
+        histogram_value = self._values.get(label_values)
+        return histogram_value.count if histogram_value else 0
+
+    def sum(self, *label_values: str) -> float:
+        histogram_value = self._values.get(label_values)
+        return histogram_value.sum if histogram_value else 0
+
+    def _render_samples(self) -> Iterable[str]:
+        bounds = [str(bucket) for bucket in self._buckets] + ["+Inf"]
+        for label_values, value in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, value.bucket_counts):
+                cumulative += bucket_count
+                labels = self._format_labels(label_values, f'le="{bound}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+
+            labels = self._format_labels(label_values)
+            yield f"{self.name}_sum{labels} {value.sum}"
+            yield f"{self.name}_count{labels} {value.count}"
+
+
+class _HistogramValue:
+    __slots__ = ("bucket_counts", "sum", "count")
+
+    def __init__(self, bucket_count: int):
+        self.bucket_counts = [0] * (bucket_count + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "agar"):
+        self._prefix = prefix
+        self._metrics: dict[str, _Metric] = {}
+
+    def counter(self, name: str, help_: str, label_names: Iterable[str] = ()):
+        return self._register(Counter(self._full_name(name), help_, label_names))
+
+    def gauge(self, name: str, help_: str, label_names: Iterable[str] = ()):
+        return self._register(Gauge(self._full_name(name), help_, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help_: str,
+        label_names: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_SECONDS_BUCKETS,
+    ):
+        return self._register(
+            Histogram(self._full_name(name), help_, label_names, buckets)
+        )
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(self._full_name(name))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+    def _full_name(self, name: str) -> str:
+        return f"{self._prefix}_{name}"
+
+    def _register(self, metric: _Metric):
+        if existing := self._metrics.get(metric.name):
+            return existing
+
+        self._metrics[metric.name] = metric
+        return metric
+
+
+class AdminServer(AsyncWorker):
+    """
+    Minimal HTTP server which exposes the metrics in Prometheus text format
+    on `/metrics`
+    """
+
+    def __init__(self, *, host: str, port: int, registry: "MetricsRegistry" = None):
+        self._host = host
+        self._port = port
+        self._registry = registry or metrics
+        self._server: AbstractServer = ...
+        self._task: Task = ...
+
+    async def _run(self):
+        try:
+            self._server = await start_server(self._handle, self._host, self._port)
+        except Exception as error:
+            self._started.set_exception(error)
+            raise error
+
+        self._started.set_result(1)
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle(self, reader: StreamReader, writer: StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1] == "/metrics":
+                _write_response(
+                    writer, "200 OK", self._registry.render().encode(), _CONTENT_TYPE
+                )
+            else:
+                _write_response(writer, "404 Not Found", b"Not Found\n", "text/plain")
+
+            await writer.drain()
+        except ConnectionError as error:
+            _logger.warning(f"Admin request failed: {error}")
+        finally:
+            writer.close()
+
+
+def _write_response(writer: StreamWriter, status: str, body: bytes, content_type: str):
+    writer.write(
+        (
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode()
+        + body
+    )
+
+
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics = MetricsRegistry()
+
+_logger = create_logger(__name__)
@@ -2,11 +2,21 @@ from asyncio import DatagramTransport, get_running_loop, Queue, CancelledError,
 from typing import Callable, Coroutine, Optional, Iterable
 
 from datek_agar_core.network.protocol import Protocol, AddressTuple
+from datek_agar_core.network.interpolation import SnapshotBuffer
 from datek_agar_core.network.message import Message, MessageType
 from datek_agar_core.utils import AsyncWorker, run_forever, async_log_error
 
 
 class UDPClient(AsyncWorker):
+    """
+    Game status updates are handed to `handle_message` one at a time.
+    Updates which are older than the last received one are dropped, and
+    while `handle_message` is busy, only the newest update is kept.
+    The optional `snapshot_buffer` receives every update and the sent speed
+    changes, the application renders `snapshot_buffer.sample()`.
+    A spectator client watches the game without a bacteria.
+    """
+
     def __init__(
         self,
         *,
@@ -15,7 +25,18 @@ class UDPClient(AsyncWorker):
         handle_message: Callable[[Message], Coroutine],
         player_name: str,
         ping_interval_sec: float,
+        snapshot_buffer: Optional[SnapshotBuffer] = None,
+        update_every: Optional[int] = None,
+        spectate: bool = False,
+        spectate_position: Optional[Iterable[float]] = None,
     ):
+        """
+        :param update_every: the server sends only every `update_every`th
+            game status update to the client
+        :param spectate: connects as a spectator
+        :param spectate_position: the spectator watches the region around it
+            instead of the whole world
+        """
         self._host = host
         self._port = port
         self._loop = get_running_loop()
@@ -24,7 +45,18 @@ class UDPClient(AsyncWorker):
         self._handle_message = handle_message
         self._receive_queue = Queue()
         self._ping_interval_sec = ping_interval_sec
+        self._snapshot_buffer = snapshot_buffer
+        self._update_every = update_every
+        self._spectate = spectate
+        self._spectate_position = spectate_position
+        self._is_connected = False
         self._player_id = None
+        self._session_token: Optional[str] = None
+        self._last_sequence = -1
+        self._pending_game_status: Optional[Message] = None
+        self._is_handling_game_status = False
+        self._dropped_frames = 0
+        self._coalesced_frames = 0
         self._protocol: Protocol = ...
         self._transport: TransportProxy = ...
 
@@ -32,6 +64,16 @@ class UDPClient(AsyncWorker):
     def player_id(self) -> Optional[int]:
         return self._player_id
 
+    @property
+    def dropped_frames(self) -> int:
+        """Game status updates dropped because a newer one was received before"""
+        return self._dropped_frames
+
+    @property
+    def coalesced_frames(self) -> int:
+        """Game status updates replaced by a newer one before being handled"""
+        return self._coalesced_frames
+
     def start(self):
         super().start()
         self._loop.create_task(self._connect())
@@ -40,6 +82,9 @@ class UDPClient(AsyncWorker):
         if not self.player_id:
             return
 
+        if self._snapshot_buffer is not None:
+            self._snapshot_buffer.record_input(speed_polar_coordinates)
+
         self._send_message(
             Message(
                 type=MessageType.CHANGE_SPEED,
@@ -48,6 +93,16 @@ class UDPClient(AsyncWorker):
             )
         )
 
+    def split(self):
+        self._send_player_message(MessageType.SPLIT)
+
+    def eject(self):
+        self._send_player_message(MessageType.EJECT)
+
+    def _send_player_message(self, type_: MessageType):
+        if self.player_id:
+            self._send_message(Message(type=type_, bacteria_id=self.player_id))
+
     async def _run(self):
         transport, self._protocol = await self._loop.create_datagram_endpoint(
             lambda: Protocol(self._receive_queue, self._loop),
@@ -67,22 +122,80 @@ class UDPClient(AsyncWorker):
 
     async def _connect(self):
         await self.wait_started()
-        self._send_message(Message(type=MessageType.CONNECT, name=self._player_name))
+        if self._spectate:
+            self._send_message(
+                Message(
+                    type=MessageType.SPECTATE,
+                    spectate_position=self._spectate_position,
+                )
+            )
+            return
+
+        self._send_message(
+            Message(
+                type=MessageType.CONNECT,
+                name=self._player_name,
+                update_every=self._update_every,
+                session_token=self._session_token,
+            )
+        )
 
     @run_forever
     @async_log_error("UDPClient")
     async def _run_handle_queue(self):
         data, _ = await self._receive_queue.get()
         message = Message.unpack(data)
-        if message.type == MessageType.CONNECT:
+        if self._snapshot_buffer is not None:
+            self._snapshot_buffer.add(message)
+
+        if message.type == MessageType.GAME_STATUS_UPDATE:
+            self._receive_game_status(message)
+            return
+
+        if message.type in (MessageType.CONNECT, MessageType.SPECTATE):
             self._player_id = message.bacteria_id
-            self._loop.create_task(self._run_keep_connection())
+            self._session_token = message.session_token
+            self._last_sequence = -1
+            if not self._is_connected:
+                self._is_connected = True
+                self._loop.create_task(self._run_keep_connection())
 
         self._loop.create_task(self._handle_message(message))
 
+    def _receive_game_status(self, message: Message):
+        if message.sequence is not None:
+            if message.sequence <= self._last_sequence:
+                self._dropped_frames += 1
+                return
+
+            self._last_sequence = message.sequence
+
+        if self._pending_game_status is not None:
+            self._coalesced_frames += 1
+
+        self._pending_game_status = message
+
+        if not self._is_handling_game_status:
+            self._is_handling_game_status = True
+            self._loop.create_task(self._run_handle_game_statuses())
+
+    async def _run_handle_game_statuses(self):
+        try:
+            while (message := self._pending_game_status) is not None:
+                self._pending_game_status = None
+                await self._handle_game_status(message)
+        finally:
+            self._is_handling_game_status = False
+
+    @async_log_error("UDPClient")
+    async def _handle_game_status(self, message: Message):
+        await self._handle_message(message)
+
     @run_forever
     async def _run_keep_connection(self):
-        self._send_message(Message(type=MessageType.PING))
+        self._send_message(
+            Message(type=MessageType.PING, session_token=self._session_token)
+        )
         await sleep(self._ping_interval_sec)
 
     def _send_message(self, message: Message):
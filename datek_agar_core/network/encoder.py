@@ -0,0 +1,73 @@
+from asyncio import Semaphore, Task, get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Optional
+
+from datek_agar_core.metrics import metrics
+from datek_agar_core.network.message import Message
+
+
+class MessageEncoder:
+    """
+    Packs messages on a thread pool, so the compression doesn't block the
+    event loop. LZMA releases the GIL, so the workers use the spare cores.
+    At most `max_in_flight` messages are encoded at the same time, `submit`
+    waits for a free slot. With 0 `workers` messages are packed inline.
+    """
+
+    def __init__(self, workers: int = 0, max_in_flight: int = 64):
+        self._loop = get_running_loop()
+        self._executor: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(workers, thread_name_prefix="encoder")
+            if workers
+            else None
+        )
+        self._slots = Semaphore(max(max_in_flight, 1))
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def submit(self, message: Message) -> Task:
+        """
+        Returns a task which results in the packed message
+        """
+        await self._slots.acquire()
+        self._in_flight += 1
+        _encodes_in_flight.set(self._in_flight)
+        return self._loop.create_task(self._encode(message))
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _encode(self, message: Message) -> bytes:
+        try:
+            if self._executor is None:
+                data, seconds = _pack(message)
+            else:
+                data, seconds = await self._loop.run_in_executor(
+                    self._executor, _pack, message
+                )
+        finally:
+            self._in_flight -= 1
+            _encodes_in_flight.set(self._in_flight)
+            self._slots.release()
+
+        _encode_seconds.observe(seconds)
+        return data
+
+
+def _pack(message: Message) -> tuple[bytes, float]:
+    start = perf_counter()
+    data = message.pack()
+    return data, perf_counter() - start
+
+
+_encode_seconds = metrics.histogram(
+    "encode_seconds", "Duration of packing a game status message for a client"
+)
+_encodes_in_flight = metrics.gauge(
+    "encodes_in_flight", "Messages being packed by the encoder pool"
+)
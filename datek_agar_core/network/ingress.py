@@ -0,0 +1,384 @@
+from asyncio import (
+    AbstractEventLoop,
+    CancelledError,
+    DatagramProtocol,
+    Queue,
+    get_running_loop,
+)
+from multiprocessing import get_context
+from os import umask
+from pathlib import Path
+from socket import (
+    AF_INET,
+    AF_INET6,
+    AF_UNIX,
+    SOCK_DGRAM,
+    SOL_SOCKET,
+    SO_REUSEPORT,
+    inet_ntop,
+    inet_pton,
+    socket,
+    timeout,
+)
+from struct import Struct
+from time import monotonic
+from typing import Union
+
+import numpy as np
+from datek_agar_core.metrics import metrics
+from datek_agar_core.network.message import Message, MessageType
+from datek_agar_core.network.protocol import AddressTuple
+from datek_agar_core.network.rate_limit import RateLimiter
+from datek_agar_core.utils import AsyncWorker, LogRateLimiter, create_logger
+
+MAX_DATAGRAM_SIZE = 65535
+
+RAW_RECORD = 0
+"""Type of the records which carry the original datagram after the header"""
+
+INPUT_RECORD = Struct("<BB16sHq2f16s")
+"""
+Message type, address family, address, port, bacteria id (-1 if missing),
+speed polar coordinates, session token (zeros if missing)
+"""
+
+RATE_LIMIT_RECORD_TYPE = 255
+"""Type of the records which carry the rate limiter counters of a worker"""
+
+RATE_LIMIT_RECORD = Struct("<B3Q")
+"""
+Record type, datagrams dropped for exceeding the rate, datagrams dropped
+from blocked addresses, addresses blocked, since the previous record
+"""
+
+_DECODED_TYPES = frozenset(
+    (
+        MessageType.PING,
+        MessageType.CHANGE_SPEED,
+        MessageType.SPLIT,
+        MessageType.EJECT,
+    )
+)
+"""Sent as fixed size records, the rest of the messages are sent raw"""
+
+_FAMILIES = {4: AF_INET, 6: AF_INET6}
+
+_SESSION_TOKEN_SIZE = 16
+
+
+def pack_input_record(message: Message, data: bytes, address: AddressTuple) -> bytes:
+    """
+    :param data: the datagram of `message`, appended if the message can't
+        be described by a fixed size record
+    """
+    host, port = address[:2]
+    family = 6 if ":" in host else 4
+    packed_host = inet_pton(_FAMILIES[family], host)
+
+    if message.type not in _DECODED_TYPES:
+        return (
+            INPUT_RECORD.pack(RAW_RECORD, family, packed_host, port, -1, 0, 0, b"")
+            + data
+        )
+
+    session_token = b""
+    if message.session_token:
+        session_token = bytes.fromhex(message.session_token)
+        if len(session_token) != _SESSION_TOKEN_SIZE:
+            raise ValueError(f"Invalid session token: {message.session_token}")
+
+    speed = message.speed_polar_coordinates
+    return INPUT_RECORD.pack(
+        message.type.value,
+        family,
+        packed_host,
+        port,
+        -1 if message.bacteria_id is None else message.bacteria_id,
+        *((0, 0) if speed is None else speed),
+        session_token,
+    )
+
+
+def pack_rate_limit_record(
+    rate_limited: int, blocked: int, blocked_addresses: int
+) -> bytes:
+    return RATE_LIMIT_RECORD.pack(
+        RATE_LIMIT_RECORD_TYPE, rate_limited, blocked, blocked_addresses
+    )
+
+
+def create_ingress_socket(path: Path) -> socket:
+    """
+    Unix socket bound to `path` which only the owner can connect to.
+    The permissions are set by the umask of the bind, so the socket is never
+    open to the other users.
+    """
+    ingress_socket = socket(AF_UNIX, SOCK_DGRAM)
+    previous_umask = umask(0o177)
+    try:
+        ingress_socket.bind(str(path))
+    except Exception as error:
+        ingress_socket.close()
+        raise error
+    finally:
+        umask(previous_umask)
+
+    return ingress_socket
+
+
+def unpack_input_record(record: bytes) -> tuple[Union[Message, bytes], AddressTuple]:
+    """
+    Returns the message of a fixed size record or the datagram of a raw one,
+    and the address of the client
+    """
+    (
+        type_,
+        family,
+        packed_host,
+        port,
+        bacteria_id,
+        length,
+        angle,
+        session_token,
+    ) = INPUT_RECORD.unpack_from(record)
+
+    host_size = 4 if family == 4 else 16
+    address = inet_ntop(_FAMILIES[family], packed_host[:host_size]), port
+
+    if type_ == RAW_RECORD:
+        return record[INPUT_RECORD.size :], address
+
+    message_type = MessageType(type_)
+    message = Message.construct(
+        type=message_type,
+        bacteria_id=None if bacteria_id < 0 else bacteria_id,
+        speed_polar_coordinates=np.array((length, angle), np.float32)
+        if message_type == MessageType.CHANGE_SPEED
+        else None,
+        session_token=session_token.hex() if any(session_token) else None,
+    )
+    return message, address
+
+
+class IngressProtocol(DatagramProtocol):
+    """
+    Receives the records of the ingress workers and puts the messages in the
+    receive queue of the server. The rate limiter counters of the workers
+    are added to the metrics of the server.
+    """
+
+    def __init__(self, receive_queue: Queue, loop: AbstractEventLoop):
+        self._receive_queue = receive_queue
+        self._loop = loop
+
+    def datagram_received(self, data: bytes, addr):
+        if data[0] == RATE_LIMIT_RECORD_TYPE:
+            _add_rate_limit_record(data)
+            return
+
+        _ingress_records.inc()
+        self._loop.create_task(self._receive_queue.put(unpack_input_record(data)))
+
+
+class IngressWorkers(AsyncWorker):
+    """
+    Processes bound to the port of the server with `SO_REUSEPORT`, the
+    kernel spreads the clients among them and the server's own socket.
+    They rate limit, decode and validate the datagrams, then forward them as
+    `INPUT_RECORD`s to the server's Unix socket at `socket_path`.
+    The server has to be bound with `reuse_port` and listen on `socket_path`
+    before the workers start. It still sends the responses itself.
+    The workers report their rate limiter counters to the server in every
+    `rate_limit_report_seconds`.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        socket_path: Path,
+        workers: int = 2,
+        input_rate: float = 0,
+        input_burst: float = 0,
+        rate_limit_report_seconds: float = 1,
+    ):
+        """
+        :param input_rate: datagrams per second accepted from one address by
+            a worker, 0 disables the limit
+        """
+        self._host = host
+        self._port = port
+        self._socket_path = socket_path
+        self._worker_count = workers
+        self._input_rate = input_rate
+        self._input_burst = input_burst
+        self._rate_limit_report_seconds = rate_limit_report_seconds
+        self._processes = []
+
+    async def _run(self):
+        loop = get_running_loop()
+        context = get_context("spawn")
+        ready = [context.Event() for _ in range(self._worker_count)]
+        self._processes = [
+            context.Process(
+                target=run_ingress_worker,
+                args=(
+                    self._host,
+                    self._port,
+                    str(self._socket_path),
+                    self._input_rate,
+                    self._input_burst,
+                    self._rate_limit_report_seconds,
+                    event,
+                ),
+                name=f"ingress-{index}",
+                daemon=True,
+            )
+            for index, event in enumerate(ready)
+        ]
+
+        try:
+            for process in self._processes:
+                process.start()
+
+            for process, event in zip(self._processes, ready):
+                while not await loop.run_in_executor(None, event.wait, 0.1):
+                    if not process.is_alive():
+                        raise RuntimeError(
+                            f"Ingress worker {process.name} exited: {process.exitcode}"
+                        )
+
+        except Exception as error:
+            self._terminate()
+            self._started.set_exception(error)
+            raise error
+
+        _ingress_workers.set(len(self._processes))
+        self._started.set_result(1)
+
+        try:
+            await loop.create_future()
+        except CancelledError:
+            pass
+        finally:
+            self._terminate()
+
+    def _terminate(self):
+        for process in self._processes:
+            process.terminate()
+
+        for process in self._processes:
+            process.join()
+
+        _ingress_workers.set(0)
+
+
+def run_ingress_worker(
+    host: str,
+    port: int,
+    socket_path: str,
+    input_rate: float,
+    input_burst: float,
+    rate_limit_report_seconds: float = 1,
+    ready=None,
+):
+    udp_socket = socket(AF_INET6 if ":" in host else AF_INET, SOCK_DGRAM)
+    udp_socket.setsockopt(SOL_SOCKET, SO_REUSEPORT, 1)
+    udp_socket.bind((host, port))
+
+    forward_socket = socket(AF_UNIX, SOCK_DGRAM)
+    forward_socket.connect(socket_path)
+    forward_socket.setblocking(False)
+
+    rate_limiter = (
+        RateLimiter(rate=input_rate, burst=input_burst) if input_rate else None
+    )
+    log = LogRateLimiter(_logger)
+    reported_counts = (0, 0, 0)
+    reported_at = monotonic()
+    if rate_limiter is not None:
+        udp_socket.settimeout(rate_limit_report_seconds)
+
+    if ready is not None:
+        ready.set()
+
+    try:
+        while True:
+            if (
+                rate_limiter is not None
+                and monotonic() - reported_at >= rate_limit_report_seconds
+            ):
+                reported_at = monotonic()
+                reported_counts = _report_rate_limits(forward_socket, reported_counts)
+
+            try:
+                data, address = udp_socket.recvfrom(MAX_DATAGRAM_SIZE)
+            except timeout:
+                continue
+
+            address = address[:2]
+            if rate_limiter is not None and not rate_limiter.allow(address):
+                continue
+
+            try:
+                record = pack_input_record(Message.unpack(data), data, address)
+            except Exception as error:
+                log.log(
+                    error.__class__,
+                    f"Invalid datagram from {address[0]}:{address[1]}: "
+                    f"{error.__class__}: {error}",
+                )
+                continue
+
+            try:
+                forward_socket.send(record)
+            except BlockingIOError:
+                log.log(BlockingIOError, "The server is behind, input dropped")
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        udp_socket.close()
+        forward_socket.close()
+
+
+def _report_rate_limits(
+    forward_socket: socket, reported_counts: tuple[int, int, int]
+) -> tuple[int, int, int]:
+    """
+    Sends the rate limiter counters of the worker process grown since
+    `reported_counts` to the server. Returns the counters known by the server.
+    """
+    dropped_datagrams = metrics.get("rate_limited_datagrams_total")
+    counts = (
+        int(dropped_datagrams.get("rate")),
+        int(dropped_datagrams.get("blocked")),
+        int(metrics.get("blocked_addresses_total").get()),
+    )
+    increments = [count - reported for count, reported in zip(counts, reported_counts)]
+    if not any(increments):
+        return reported_counts
+
+    try:
+        forward_socket.send(pack_rate_limit_record(*increments))
+    except BlockingIOError:
+        return reported_counts
+
+    return counts
+
+
+def _add_rate_limit_record(record: bytes):
+    _, rate_limited, blocked, blocked_addresses = RATE_LIMIT_RECORD.unpack_from(record)
+    dropped_datagrams = metrics.get("rate_limited_datagrams_total")
+    dropped_datagrams.inc(rate_limited, "rate")
+    dropped_datagrams.inc(blocked, "blocked")
+    metrics.get("blocked_addresses_total").inc(blocked_addresses)
+
+
+_logger = create_logger(__name__)
+
+_ingress_records = metrics.counter(
+    "ingress_records_total", "Input records received from the ingress workers"
+)
+_ingress_workers = metrics.gauge("ingress_workers", "Running ingress workers")
@@ -0,0 +1,205 @@
+from collections import deque
+from math import cos, sin
+from time import perf_counter
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+from datek_agar_core.game import REFRESH_INTERVAL
+from datek_agar_core.network.message import Message, MessageType
+from datek_agar_core.types import Bacteria, GameStatus
+from datek_agar_core.universe import Universe
+
+INTERPOLATION_DELAY_SECONDS = 0.1
+"""Time the other entities are rendered behind the newest snapshot"""
+
+
+class _Snapshot:
+    __slots__ = ("server_time", "received_at", "game_status", "ids", "positions")
+
+    def __init__(self, server_time: float, received_at: float, game_status: GameStatus):
+        self.server_time = server_time
+        self.received_at = received_at
+        self.game_status = game_status
+        self.ids = np.array([item.id for item in game_status.bacterias], np.int64)
+        self.positions = np.array(
+            [item.position for item in game_status.bacterias], np.float64
+        ).reshape(-1, 2)
+
+
+class SnapshotBuffer:
+    """
+    Jitter buffer of game statuses, so the server can send less than one
+    update per turn and the motion still looks smooth.
+    Snapshots are timed by their sequence, which is the server turn.
+    Bacterias are rendered `delay_seconds` behind the newest snapshot,
+    interpolated by id between the two snapshots around that time.
+    The cells of the player are predicted from the newest snapshot and the
+    speed changes sent since it, so they follow the input without delay.
+    """
+
+    def __init__(
+        self,
+        *,
+        delay_seconds: float = INTERPOLATION_DELAY_SECONDS,
+        max_snapshots: int = 32,
+        clock: Callable[[], float] = perf_counter,
+    ):
+        self._delay_seconds = delay_seconds
+        self._clock = clock
+        self._snapshots: deque[_Snapshot] = deque(maxlen=max(max_snapshots, 2))
+        self._inputs: deque[tuple[float, float, float]] = deque()
+        self._universe: Optional[Universe] = None
+        self._player_id: Optional[int] = None
+        self._tick_interval = REFRESH_INTERVAL
+
+    @property
+    def player_id(self) -> Optional[int]:
+        return self._player_id
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def add(self, message: Message) -> bool:
+        """
+        Takes the connect, spectate and game status messages,
+        returns False if the message was ignored
+        """
+        if message.type in (MessageType.CONNECT, MessageType.SPECTATE):
+            self._player_id = message.bacteria_id
+            self._universe = Universe(
+                total_nutrient=message.total_nutrient, world_size=message.world_size
+            )
+            if message.tick_rate:
+                self._tick_interval = 1 / message.tick_rate
+
+            self._snapshots.clear()
+            self._inputs.clear()
+            return True
+
+        if (
+            message.type != MessageType.GAME_STATUS_UPDATE
+            or message.game_status is None
+            or message.sequence is None
+        ):
+            return False
+
+        server_time = message.sequence * self._tick_interval
+        if self._snapshots and server_time <= self._snapshots[-1].server_time:
+            return False
+
+        received_at = self._clock()
+        self._snapshots.append(_Snapshot(server_time, received_at, message.game_status))
+
+        while self._inputs and self._inputs[0][0] <= received_at:
+            self._inputs.popleft()
+
+        return True
+
+    def record_input(self, speed_polar_coordinates: Iterable[float]):
+        """
+        Has to be called with every sent speed change of the player
+        """
+        length, angle = speed_polar_coordinates
+        self._inputs.append((self._clock(), float(length), float(angle)))
+
+    def sample(self) -> Optional[GameStatus]:
+        """
+        Game status to render now
+        """
+        if not self._snapshots or self._universe is None:
+            return
+
+        now = self._clock()
+        clock_offset = min(
+            item.received_at - item.server_time for item in self._snapshots
+        )
+        render_time = now - clock_offset - self._delay_seconds
+        previous, next_ = self._find_snapshots(render_time)
+
+        positions = (
+            next_.positions
+            if previous is next_
+            else self._interpolate(
+                previous,
+                next_,
+                (render_time - previous.server_time)
+                / (next_.server_time - previous.server_time),
+            )
+        )
+
+        bacterias = [
+            item.copy(update={"position": position.astype(np.float32)})
+            for item, position in zip(next_.game_status.bacterias, positions)
+            if self._player_id is None or item.owner_id != self._player_id
+        ]
+        bacterias.extend(self._predict_player_cells(self._snapshots[-1], now))
+
+        return GameStatus.construct(
+            bacterias=bacterias,
+            organisms=next_.game_status.organisms,
+            omitted_organisms=next_.game_status.omitted_organisms,
+            density_grid=next_.game_status.density_grid,
+        )
+
+    def _find_snapshots(self, render_time: float) -> tuple[_Snapshot, _Snapshot]:
+        while (
+            len(self._snapshots) > 2 and self._snapshots[1].server_time <= render_time
+        ):
+            self._snapshots.popleft()
+
+        first = self._snapshots[0]
+        if render_time <= first.server_time or len(self._snapshots) == 1:
+            return first, first
+
+        second = self._snapshots[1]
+        if render_time >= second.server_time:
+            return second, second
+
+        return first, second
+
+    def _interpolate(
+        self, previous: _Snapshot, next_: _Snapshot, ratio: float
+    ) -> np.ndarray:
+        positions = next_.positions.copy()
+        _, next_rows, previous_rows = np.intersect1d(
+            next_.ids, previous.ids, assume_unique=True, return_indices=True
+        )
+        moves = self._universe.apply_minimal_image(
+            positions[next_rows] - previous.positions[previous_rows]
+        )
+        positions[next_rows] = previous.positions[previous_rows] + moves * ratio
+
+        return np.mod(positions, self._universe.world_size)
+
+    def _predict_player_cells(self, snapshot: _Snapshot, now: float) -> list[Bacteria]:
+        if self._player_id is None:
+            return []
+
+        return [
+            item.copy(
+                update={
+                    "position": self._predict_position(
+                        item, snapshot.received_at, now
+                    ).astype(np.float32)
+                }
+            )
+            for item in snapshot.game_status.bacterias
+            if item.owner_id == self._player_id
+        ]
+
+    def _predict_position(
+        self, bacteria: Bacteria, since: float, now: float
+    ) -> np.ndarray:
+        position = np.array(bacteria.position, np.float64)
+        speed = np.array(bacteria.current_speed, np.float64)
+
+        for time, length, angle in self._inputs:
+            if time >= now:
+                break
+
+            position += speed * (time - since)
+            since = time
+            speed = bacteria.max_speed * length * np.array((cos(angle), sin(angle)))
+
+        position += speed * (now - since)
+        return np.mod(position, self._universe.world_size)
@@ -14,6 +14,10 @@ class MessageType(Enum):
     PING = auto()
     CHANGE_SPEED = auto()
     GAME_STATUS_UPDATE = auto()
+    SPLIT = auto()
+    EJECT = auto()
+    SERVER_FULL = auto()
+    SPECTATE = auto()
 
 
 class Message(BaseModel):
@@ -24,6 +28,26 @@ class Message(BaseModel):
     game_status: GameStatus = None
     world_size: float = None
     total_nutrient: float = None
+    sequence: int = None
+    """Turn of the game status, newer game statuses have bigger sequence"""
+    tick_rate: float = None
+    """Turns per second of the server, sent in the connect response"""
+    update_every: int = None
+    """
+    Sent in the connect request, the client gets only every `update_every`th
+    game status update. The connect and spectate responses carry the number
+    of turns between the game status updates of the client.
+    """
+    session_token: str = None
+    """
+    Issued in the connect response, the client sends it in the pings and
+    in the connect request to re-attach to its bacteria from a new address
+    """
+    spectate_position: Optional[Position]
+    """
+    Sent in the spectate request, the spectator watches the region around
+    it, or the whole world without it
+    """
 
     @classmethod
     def unpack(cls, packed: bytes):
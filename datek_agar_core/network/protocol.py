@@ -1,12 +1,26 @@
 from asyncio import DatagramProtocol, Queue, AbstractEventLoop
+from typing import Callable, Optional
 
 AddressTuple = tuple[str, int]
 
 
 class Protocol(DatagramProtocol):
-    def __init__(self, receive_queue: Queue, loop: AbstractEventLoop):
+    def __init__(
+        self,
+        receive_queue: Queue,
+        loop: AbstractEventLoop,
+        allow: Optional[Callable[[AddressTuple], bool]] = None,
+    ):
+        """
+        :param allow: datagrams of the addresses for which it returns False
+            are dropped without queueing them
+        """
         self._receive_queue = receive_queue
         self._loop = loop
+        self._allow = allow
 
     def datagram_received(self, data: bytes, addr: AddressTuple):
+        if self._allow and not self._allow(addr):
+            return
+
         self._loop.create_task(self._receive_queue.put((data, addr)))
@@ -0,0 +1,165 @@
+from asyncio import (
+    AbstractEventLoop,
+    DatagramProtocol,
+    DatagramTransport,
+    get_running_loop,
+    CancelledError,
+    Event,
+    Task,
+)
+from random import Random
+from typing import Callable, Optional
+
+from datek_agar_core.network.protocol import AddressTuple
+from datek_agar_core.utils import AsyncWorker
+from pydantic import BaseModel, confloat
+
+
+class LinkConfig(BaseModel):
+    """
+    Impairments of one direction of the link
+    """
+
+    latency_seconds: confloat(ge=0) = 0
+    jitter_seconds: confloat(ge=0) = 0
+    loss: confloat(ge=0, le=1) = 0
+    """Probability of dropping a datagram"""
+    reorder: confloat(ge=0, le=1) = 0
+    """Probability of holding back a datagram by `reorder_delay_seconds`"""
+    reorder_delay_seconds: confloat(ge=0) = 0.01
+    bandwidth_bytes_per_second: Optional[confloat(gt=0)] = None
+    max_queue_seconds: confloat(ge=0) = 1
+    """Datagrams which would wait longer for the bandwidth are dropped"""
+
+
+class Link:
+    def __init__(self, config: LinkConfig, random: Random, loop: AbstractEventLoop):
+        self._config = config
+        self._random = random
+        self._loop = loop
+        self._busy_until = 0.0
+        self.sent_count = 0
+        self.dropped_count = 0
+
+    def send(self, data: bytes, send: Callable[[bytes], None]):
+        config = self._config
+
+        if config.loss and self._random.random() < config.loss:
+            self.dropped_count += 1
+            return
+
+        now = self._loop.time()
+        delay = config.latency_seconds
+
+        if config.jitter_seconds:
+            delay += self._random.uniform(-config.jitter_seconds, config.jitter_seconds)
+
+        if config.reorder and self._random.random() < config.reorder:
+            delay += config.reorder_delay_seconds
+
+        if config.bandwidth_bytes_per_second:
+            start = max(now, self._busy_until)
+            if start - now > config.max_queue_seconds:
+                self.dropped_count += 1
+                return
+
+            self._busy_until = start + len(data) / config.bandwidth_bytes_per_second
+            delay += self._busy_until - now
+
+        self.sent_count += 1
+        self._loop.call_later(max(delay, 0), send, data)
+
+
+class UDPProxy(AsyncWorker):
+    """
+    UDP relay between clients and a server which impairs the traffic like a
+    lossy network link. Every client gets its own upstream socket, so the
+    server sees distinct addresses.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        target_host: str,
+        target_port: int,
+        upstream: LinkConfig = LinkConfig(),
+        downstream: LinkConfig = None,
+        seed: int = 0,
+    ):
+        self._host = host
+        self._port = port
+        self._target_address: AddressTuple = (target_host, target_port)
+        self._loop = get_running_loop()
+        self._upstream = Link(upstream, Random(seed), self._loop)
+        self._downstream = Link(downstream or upstream, Random(seed + 1), self._loop)
+        self._upstream_transports: dict[AddressTuple, DatagramTransport] = {}
+        self._pending_datagrams: dict[AddressTuple, list[bytes]] = {}
+        self._transport: DatagramTransport = ...
+        self._task: Task = ...
+
+    @property
+    def upstream(self) -> Link:
+        return self._upstream
+
+    @property
+    def downstream(self) -> Link:
+        return self._downstream
+
+    async def _run(self):
+        try:
+            self._transport, _ = await self._loop.create_datagram_endpoint(
+                lambda: _ProxyProtocol(self._handle_client_datagram),
+                local_addr=(self._host, self._port),
+            )  # type: DatagramTransport, _ProxyProtocol
+        except Exception as error:
+            self._started.set_exception(error)
+            raise error
+
+        self._started.set_result(1)
+        try:
+            await Event().wait()
+        except CancelledError:
+            pass
+
+        for transport in self._upstream_transports.values():
+            transport.close()
+
+        self._transport.close()
+
+    def _handle_client_datagram(self, data: bytes, address: AddressTuple):
+        if transport := self._upstream_transports.get(address):
+            self._upstream.send(data, lambda item: _send(transport, item))
+        elif (pending := self._pending_datagrams.get(address)) is not None:
+            pending.append(data)
+        else:
+            self._pending_datagrams[address] = [data]
+            self._loop.create_task(self._connect_client(address))
+
+    async def _connect_client(self, address: AddressTuple):
+        transport, _ = await self._loop.create_datagram_endpoint(
+            lambda: _ProxyProtocol(
+                lambda data, _: self._downstream.send(
+                    data, lambda item: _send(self._transport, item, address)
+                )
+            ),
+            remote_addr=self._target_address,
+        )  # type: DatagramTransport, _ProxyProtocol
+        self._upstream_transports[address] = transport
+
+        for data in self._pending_datagrams.pop(address):
+            self._upstream.send(data, lambda item: _send(transport, item))
+
+
+class _ProxyProtocol(DatagramProtocol):
+    def __init__(self, handle_datagram: Callable[[bytes, AddressTuple], None]):
+        self._handle_datagram = handle_datagram
+
+    def datagram_received(self, data: bytes, addr: AddressTuple):
+        self._handle_datagram(data, addr)
+
+
+def _send(transport: DatagramTransport, data: bytes, address: AddressTuple = None):
+    if not transport.is_closing():
+        transport.sendto(data, address)
@@ -0,0 +1,110 @@
+from time import monotonic
+from typing import Callable
+
+from datek_agar_core.metrics import metrics
+from datek_agar_core.network.protocol import AddressTuple
+from datek_agar_core.utils import create_logger
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at", "strikes", "blocked_until")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+        self.strikes = 0
+        self.blocked_until = 0.0
+
+
+class RateLimiter:
+    """
+    Token bucket per source address, checked before a datagram is decoded.
+    Every address gets `rate` datagrams per second with bursts up to `burst`.
+    An address whose datagrams were dropped `block_after` times before its
+    bucket could refill is blocked for `block_seconds`.
+    Buckets of the idle addresses are forgotten in every `sweep_seconds`.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = 100,
+        burst: float = 200,
+        block_after: int = 500,
+        block_seconds: float = 30,
+        sweep_seconds: float = 10,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self._rate = rate
+        self._burst = max(burst, 1)
+        self._block_after = block_after
+        self._block_seconds = block_seconds
+        self._sweep_seconds = sweep_seconds
+        self._clock = clock
+        self._buckets: dict[AddressTuple, _Bucket] = {}
+        self._swept_at = clock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def is_blocked(self, address: AddressTuple) -> bool:
+        bucket = self._buckets.get(address)
+        return bucket is not None and bucket.blocked_until > self._clock()
+
+    def allow(self, address: AddressTuple) -> bool:
+        now = self._clock()
+        if now - self._swept_at > self._sweep_seconds:
+            self._sweep(now)
+
+        bucket = self._buckets.get(address)
+        if bucket is None:
+            bucket = self._buckets[address] = _Bucket(self._burst, now)
+
+        if bucket.blocked_until > now:
+            _dropped_datagrams.inc(1, "blocked")
+            return False
+
+        bucket.tokens = min(
+            bucket.tokens + (now - bucket.updated_at) * self._rate, self._burst
+        )
+        bucket.updated_at = now
+
+        if bucket.tokens >= self._burst:
+            bucket.strikes = 0
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True
+
+        _dropped_datagrams.inc(1, "rate")
+        bucket.strikes += 1
+        if bucket.strikes >= self._block_after:
+            bucket.strikes = 0
+            bucket.blocked_until = now + self._block_seconds
+            _blocked_addresses.inc()
+            _logger.warning(
+                f"Blocked for {self._block_seconds}s: {address[0]}:{address[1]}"
+            )
+
+        return False
+
+    def _sweep(self, now: float):
+        self._swept_at = now
+        self._buckets = {
+            address: bucket
+            for address, bucket in self._buckets.items()
+            if bucket.blocked_until > now
+            or bucket.tokens + (now - bucket.updated_at) * self._rate < self._burst
+        }
+
+
+_logger = create_logger(__name__)
+
+_dropped_datagrams = metrics.counter(
+    "rate_limited_datagrams_total",
+    "Datagrams dropped before decoding by the rate limiter",
+    ("reason",),
+)
+_blocked_addresses = metrics.counter(
+    "blocked_addresses_total", "Addresses blocked for flooding"
+)
@@ -5,23 +5,65 @@ from asyncio import (
     Lock,
     sleep,
     CancelledError,
+    Task,
     gather,
 )
 from datetime import datetime, timedelta
-from typing import Callable, Coroutine, Generator, Optional
+from functools import partial
+from logging import INFO
+from pathlib import Path
+from secrets import token_hex
+from socket import SOL_SOCKET, SO_RCVBUF, SO_SNDBUF
+from time import perf_counter
+from math import pi
+from typing import Callable, Coroutine, Generator, Iterable, Optional
 
 import numpy as np
-from datek_agar_core.game import Game
+from datek_agar_core.game import Game, REFRESH_FREQUENCY
+from datek_agar_core.metrics import metrics
 from datek_agar_core.network.protocol import Protocol, AddressTuple
+from datek_agar_core.network.encoder import MessageEncoder
+from datek_agar_core.network.ingress import IngressProtocol, create_ingress_socket
 from datek_agar_core.network.message import Message, MessageType
-from datek_agar_core.types import GameStatus, Organism, Bacteria
-from datek_agar_core.universe import Universe
+from datek_agar_core.network.rate_limit import RateLimiter
+from datek_agar_core.overload import OverloadController, OverloadLevel
+from datek_agar_core.persistence import read_snapshot, write_snapshot
+from datek_agar_core.profiler import TurnProfiler
+from datek_agar_core.shared_ring import WorldRingPublisher
+from datek_agar_core.types import GameStatus, DensityGrid
+from datek_agar_core.universe import Universe, ScratchBuffer
 from datek_agar_core.utils import (
     run_forever,
     AsyncWorker,
     async_log_error,
     create_logger,
+    LogRateLimiter,
 )
+from datek_agar_core.world import World
+
+
+MAX_VISIBLE_ENTITIES = 512
+"""Maximal number of entities sent to a player in one game status"""
+
+OMITTED_ORGANISM_SECTORS = 8
+
+PELLET_VIEW_RATIO = 0.5
+"""Part of the view distance within which organisms are sent one by one"""
+
+DENSITY_GRID_VIEW_DISTANCES = 2
+"""Half side of the density grid in view distances"""
+
+SPECTATOR_REGIONS_PER_SIDE = 4
+"""Spectators of a region watch a cell of such a grid over the world"""
+
+WHOLE_WORLD = -1
+"""Region of the spectators watching the whole world"""
+
+WHOLE_WORLD_DENSITY_GRID_CELLS = 64
+"""
+Density grid of the whole world view when the spectators don't get the food
+as a density grid otherwise
+"""
 
 
 class UDPServer(AsyncWorker):
@@ -33,7 +75,43 @@ class UDPServer(AsyncWorker):
         world_size: int,
         total_nutrient: int,
         client_expiration_seconds: float = 2,
+        session_timeout_seconds: float = 30,
+        max_visible_entities: int = MAX_VISIBLE_ENTITIES,
+        density_grid_cells: int = 0,
+        food_lifetime_seconds: float = 0,
+        encode_workers: int = 0,
+        max_encodes_in_flight: int = 64,
+        receive_buffer_bytes: int = 0,
+        send_buffer_bytes: int = 0,
+        reuse_port: bool = False,
+        ingress_socket_path: Optional[Path] = None,
+        tick_rate: float = REFRESH_FREQUENCY,
+        broadcast_every: int = 1,
+        spectator_update_every: int = 4,
+        spectator_density_grid_cells: int = 0,
+        overload_controller: Optional[OverloadController] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        snapshot_path: Optional[Path] = None,
+        snapshot_interval_seconds: float = 60,
+        restore: bool = False,
+        ring_publisher: Optional[WorldRingPublisher] = None,
+        profiler: Optional[TurnProfiler] = None,
     ):
+        """
+        :param receive_buffer_bytes: `SO_RCVBUF` of the socket, 0 keeps the
+            system default
+        :param send_buffer_bytes: `SO_SNDBUF` of the socket, 0 keeps the
+            system default
+        :param reuse_port: binds with `SO_REUSEPORT`
+        :param ingress_socket_path: Unix socket on which the server receives
+            the datagrams decoded by `IngressWorkers`
+        :param spectator_update_every: spectators get every
+            `spectator_update_every`th game status update
+        :param spectator_density_grid_cells: spectators get the food as a
+            density grid of the watched region instead of one by one
+        :param snapshot_path: the world is saved to it periodically and on stop
+        :param restore: the world is restored from `snapshot_path` on start
+        """
         self._host = host
         self._port = port
         self._is_running = False
@@ -44,6 +122,24 @@ class UDPServer(AsyncWorker):
         self._loop = get_running_loop()
 
         self._address_registry = AddressRegistry(client_expiration_seconds)
+        self._sessions = SessionRegistry(session_timeout_seconds, self._reap_session)
+        self._update_every: dict[str, int] = {}
+        self._spectators = AddressRegistry(client_expiration_seconds)
+        self._spectator_regions: dict[str, int] = {}
+        self._spectator_update_every = max(spectator_update_every, 1)
+        self._max_visible_entities = max_visible_entities
+        self._overload_controller = overload_controller
+        self._rate_limiter = rate_limiter
+        self._snapshot_path = snapshot_path
+        self._snapshot_interval_seconds = snapshot_interval_seconds
+        self._restore = restore
+        self._buffer_sizes = {
+            SO_RCVBUF: receive_buffer_bytes,
+            SO_SNDBUF: send_buffer_bytes,
+        }
+        self._reuse_port = reuse_port
+        self._ingress_socket_path = ingress_socket_path
+        self._join_log = LogRateLimiter(_logger, level=INFO)
 
         self._actions: dict[
             MessageType, Callable[[Message, AddressTuple], Coroutine]
@@ -51,6 +147,9 @@ class UDPServer(AsyncWorker):
             MessageType.CONNECT: self._handle_connect,
             MessageType.PING: self._handle_ping,
             MessageType.CHANGE_SPEED: self._handle_move,
+            MessageType.SPLIT: self._handle_split,
+            MessageType.EJECT: self._handle_eject,
+            MessageType.SPECTATE: self._handle_spectate,
         }
 
         self._universe = Universe(
@@ -58,99 +157,528 @@ class UDPServer(AsyncWorker):
             world_size=world_size,
         )
 
-        self._game_status_filter = GameStatusFilter(self._universe)
+        self._game_status_filter = GameStatusFilter(
+            self._universe, max_visible_entities, density_grid_cells
+        )
+        self._spectator_view = SpectatorView(
+            self._universe,
+            density_grid_cells=spectator_density_grid_cells,
+            max_visible_entities=max_visible_entities,
+        )
 
         self._game = Game(
             game_status_queue=self._game_status_queue,
             universe=self._universe,
+            profiler=profiler,
+            food_lifetime_seconds=food_lifetime_seconds,
+            tick_rate=tick_rate,
+            broadcast_every=broadcast_every,
+            overload_controller=overload_controller,
+            ring_publisher=ring_publisher,
         )
 
+        self._encoder = MessageEncoder(encode_workers, max_encodes_in_flight)
+
         self._transport: DatagramTransport = ...
         self._protocol: Protocol = ...
+        self._ingress_transport: Optional[DatagramTransport] = None
+
+    @property
+    def _overload_level(self) -> OverloadLevel:
+        return (
+            self._overload_controller.level
+            if self._overload_controller
+            else OverloadLevel.NORMAL
+        )
 
     async def _run(self):
         try:
             self._transport, self._protocol = await self._loop.create_datagram_endpoint(
-                lambda: Protocol(self._receive_queue, self._loop),
+                lambda: ServerProtocol(
+                    self._receive_queue,
+                    self._loop,
+                    self._rate_limiter.allow
+                    if self._rate_limiter is not None
+                    else None,
+                ),
                 local_addr=(self._host, self._port),
+                reuse_port=self._reuse_port or None,
             )  # type: DatagramTransport, Protocol
+
+            if self._ingress_socket_path:
+                self._ingress_transport, _ = await self._loop.create_datagram_endpoint(
+                    lambda: IngressProtocol(self._receive_queue, self._loop),
+                    sock=create_ingress_socket(self._ingress_socket_path),
+                )
+
+            if self._restore:
+                self._restore_snapshot()
         except Exception as error:
+            if self._transport is not ...:
+                self._transport.close()
+
+            if self._ingress_transport:
+                self._ingress_transport.close()
+                self._ingress_socket_path.unlink(missing_ok=True)
+
             self._started.set_exception(error)
             raise error
 
+        self._set_buffer_sizes()
+
         self._game.start()
         self._address_registry.start()
+        self._spectators.start()
+        self._sessions.start()
         self._started.set_result(1)
+        workers = [
+            self._run_handle_receive(),
+            self._run_handle_game_status_queue(),
+        ]
+        if self._snapshot_path:
+            workers.append(self._run_save_snapshot())
+
         try:
-            await gather(
-                self._run_handle_receive(),
-                self._run_handle_game_status_queue(),
-            )
+            await gather(*workers)
         except (CancelledError, KeyboardInterrupt):
             pass
 
+        if self._snapshot_path:
+            await self._save_snapshot()
+
         self._address_registry.stop()
+        self._spectators.stop()
+        self._sessions.stop()
         self._game.stop()
+        self._encoder.stop()
         self._transport.close()
 
+        if self._ingress_transport:
+            self._ingress_transport.close()
+            self._ingress_socket_path.unlink(missing_ok=True)
+
+    def _set_buffer_sizes(self):
+        socket_ = self._transport.get_extra_info("socket")
+        for option, size in self._buffer_sizes.items():
+            name = _BUFFER_NAMES[option]
+            if size:
+                socket_.setsockopt(SOL_SOCKET, option, size)
+
+            actual_size = socket_.getsockopt(SOL_SOCKET, option)
+            _socket_buffer_bytes.set(actual_size, name)
+
+            # Linux reports the double of the set size for its bookkeeping
+            if actual_size < size:
+                _logger.warning(
+                    f"{name} buffer is {actual_size} bytes instead of {size}, "
+                    f"the kernel limits it (net.core.{name[0]}mem_max)"
+                )
+
     @run_forever
     @async_log_error("UDPServer")
     async def _run_handle_receive(self):
         data, addr = await self._receive_queue.get()  # type: bytes, AddressTuple
-        message = Message.unpack(data)
+        _queue_depth.set(self._receive_queue.qsize(), "receive")
+        # the inputs of the ingress workers are decoded already
+        message = data if isinstance(data, Message) else Message.unpack(data)
+        self._sessions.touch(_create_address_string(addr))
         action = self._actions[message.type]
         self._loop.create_task(action(message, addr))
 
     @run_forever
     @async_log_error("UDPServer")
     async def _run_handle_game_status_queue(self):
-        game_status = await self._game_status_queue.get()
-        await self._game_status_filter.set_game_status(game_status)
+        world = await self._game_status_queue.get()
+        queue_depth = self._game_status_queue.qsize()
+        _queue_depth.set(queue_depth, "game_status")
+        if self._overload_controller:
+            self._overload_controller.observe_queue_depth(queue_depth)
 
-        message = Message(type=MessageType.GAME_STATUS_UPDATE)
+        await self._game_status_filter.set_world(world)
+        self._game_status_filter.max_visible_entities = (
+            self._max_visible_entities // 2
+            if self._overload_level >= OverloadLevel.REDUCED_VIEW
+            else self._max_visible_entities
+        )
+
+        encodings = []
+        broadcast = world.turn // self._game.broadcast_every
 
         async for address in self._address_registry.get_addresses():
-            message.game_status = (
-                await self._game_status_filter.get_filtered_game_status(address)
+            if not self._is_sent(broadcast, self._update_every.get(address, 1)):
+                continue
+
+            game_status = await self._game_status_filter.get_filtered_game_status(
+                address
             )
 
-            if message.game_status is None:
+            if game_status is None:
                 continue
 
-            self._transport.sendto(message.pack(), _create_address_tuple(address))
+            message = Message.construct(
+                type=MessageType.GAME_STATUS_UPDATE,
+                game_status=game_status,
+                sequence=world.turn,
+            )
+            encoding = await self._encoder.submit(message)
+            encoding.add_done_callback(
+                partial(self._send_encoded, _create_address_tuple(address))
+            )
+            encodings.append(encoding)
+
+        if self._is_sent(broadcast, self._spectator_update_every):
+            encodings.extend(await self._broadcast_to_spectators(world))
+
+        await gather(*encodings, return_exceptions=True)
+
+    def _is_sent(self, broadcast: int, update_every: int) -> bool:
+        """
+        Every `update_every`th broadcast is sent, with reduced broadcast only
+        every second one of those
+        """
+        if broadcast % update_every:
+            return False
+
+        return (
+            self._overload_level < OverloadLevel.REDUCED_BROADCAST
+            or not broadcast // update_every % 2
+        )
+
+    async def _broadcast_to_spectators(self, world: World) -> list[Task]:
+        """
+        Encodes the game status of every watched region once and sends the
+        same datagram to all of its spectators
+        """
+        addresses = [address async for address in self._spectators.get_addresses()]
+        _spectators.set(len(addresses))
+        # forget the regions of the expired spectators
+        for address in self._spectator_regions.keys() - set(addresses):
+            del self._spectator_regions[address]
+
+        streams: dict[int, list[AddressTuple]] = {}
+        for address in addresses:
+            region = self._spectator_regions.get(address, WHOLE_WORLD)
+            streams.setdefault(region, []).append(_create_address_tuple(address))
+
+        if not streams:
+            return []
+
+        self._spectator_view.set_world(world)
+        encodings = []
+        for region, addresses in streams.items():
+            message = Message.construct(
+                type=MessageType.GAME_STATUS_UPDATE,
+                game_status=self._spectator_view.get_game_status(region),
+                sequence=world.turn,
+            )
+            encoding = await self._encoder.submit(message)
+            encoding.add_done_callback(partial(self._send_encoded_to_all, addresses))
+            encodings.append(encoding)
+
+        return encodings
+
+    @run_forever
+    async def _run_save_snapshot(self):
+        await sleep(self._snapshot_interval_seconds)
+        await self._save_snapshot()
 
     @async_log_error("UDPServer")
-    async def _handle_connect(self, message: Message, address: AddressTuple):
-        await self._address_registry.update_address(address)
-        _logger.info(f"Connect: {message.name} - {address[0]}:{address[1]}")
-        bacteria = await self._game.add_bacteria(name=message.name, position=[0, 0])
+    async def _save_snapshot(self):
+        snapshot = await self._game.create_snapshot(self._sessions.get_player_ids())
+        start = perf_counter()
+        await self._loop.run_in_executor(
+            None, write_snapshot, self._snapshot_path, snapshot
+        )
+        _snapshot_seconds.observe(perf_counter() - start)
+
+    def _restore_snapshot(self):
+        if not self._snapshot_path or not self._snapshot_path.exists():
+            _logger.warning(f"No snapshot to restore: {self._snapshot_path}")
+            return
 
-        await self._game_status_filter.register_player(
-            player_id=bacteria.id, address=_create_address_string(address)
+        snapshot = read_snapshot(self._snapshot_path, self._universe)
+        self._game.restore_snapshot(snapshot)
+        for token, player_id in snapshot.header.sessions.items():
+            self._sessions.restore(token, player_id)
+
+        _logger.info(
+            f"Restored turn {snapshot.header.turn} from {self._snapshot_path}: "
+            f"{len(snapshot.world.bacterias)} bacterias, "
+            f"{len(snapshot.world.organisms)} organisms"
         )
 
-        self._transport.sendto(
+    @async_log_error("UDPServer")
+    async def _handle_connect(self, message: Message, address: AddressTuple):
+        address_string = _create_address_string(address)
+        session = self._sessions.get(message.session_token)
+
+        if session and await self._game.has_player(session.player_id):
+            await self._rebind_session(session, address_string)
+            self._join_log.log(
+                "reconnect", f"Reconnect: {message.name} - {address_string}"
+            )
+        elif self._overload_level >= OverloadLevel.FULL:
+            self._join_log.log("refused", f"Server full, refused: {address_string}")
+            _refused_connects.inc()
+            self._send(Message(type=MessageType.SERVER_FULL).pack(), address)
+            return
+        else:
+            self._join_log.log("connect", f"Connect: {message.name} - {address_string}")
+            bacteria = await self._game.add_bacteria(name=message.name, position=[0, 0])
+            session = self._sessions.create(bacteria.id, address_string)
+            await self._game_status_filter.register_player(
+                player_id=bacteria.id, address=address_string
+            )
+
+        await self._address_registry.update_address(address)
+        self._update_every[address_string] = max(message.update_every or 1, 1)
+
+        self._send(
             Message(
                 type=MessageType.CONNECT,
-                bacteria_id=bacteria.id,
+                bacteria_id=session.player_id,
+                session_token=session.token,
                 name=message.name,
                 world_size=self._universe.world_size,
                 total_nutrient=self._universe.total_nutrient,
+                tick_rate=self._game.tick_rate,
+                update_every=self._game.broadcast_every
+                * self._update_every[address_string],
+            ).pack(),
+            address,
+        )
+
+    @async_log_error("UDPServer")
+    async def _handle_spectate(self, message: Message, address: AddressTuple):
+        address_string = _create_address_string(address)
+        region = self._spectator_view.get_region(message.spectate_position)
+        if self._spectator_regions.get(address_string) != region:
+            self._join_log.log(
+                "spectate", f"Spectate region {region}: {address_string}"
+            )
+
+        await self._spectators.update_address(address)
+        self._spectator_regions[address_string] = region
+
+        self._send(
+            Message(
+                type=MessageType.SPECTATE,
+                world_size=self._universe.world_size,
+                total_nutrient=self._universe.total_nutrient,
+                tick_rate=self._game.tick_rate,
+                update_every=self._game.broadcast_every * self._spectator_update_every,
             ).pack(),
             address,
         )
 
     @async_log_error("UDPServer")
     async def _handle_ping(self, message: Message, address: AddressTuple):
+        address_string = _create_address_string(address)
+        if address_string in self._spectator_regions:
+            await self._spectators.update_address(address)
+            return
+
         await self._address_registry.update_address(address)
+        await self._get_session(message, address_string)
+
+    async def _get_session(self, message: Message, address: str) -> Optional["Session"]:
+        """
+        Session of the sender: the one of its token, re-attached to `address`
+        if the address changed, otherwise the one of `address`
+        """
+        session = self._sessions.get(message.session_token)
+
+        if session and session.address != address:
+            await self._rebind_session(session, address)
+            self._join_log.log(
+                "rebind", f"Rebound player {session.player_id} to {address}"
+            )
+
+        return session or self._sessions.get_by_address(address)
+
+    async def _rebind_session(self, session: "Session", address: str):
+        old_address = self._sessions.rebind(session, address)
+        await self._game_status_filter.register_player(session.player_id, address)
+
+        if old_address and old_address != address:
+            await self._game_status_filter.unregister_player(old_address)
+            if (update_every := self._update_every.pop(old_address, None)) is not None:
+                self._update_every[address] = update_every
+
+    async def _reap_session(self, session: "Session"):
+        self._join_log.log(
+            "expire", f"Session expired, removing player {session.player_id}"
+        )
+        await self._game.remove_player(session.player_id)
+
+        if session.address:
+            await self._game_status_filter.unregister_player(session.address)
+            self._update_every.pop(session.address, None)
 
     @async_log_error("UDPServer")
     async def _handle_move(self, message: Message, address: AddressTuple):
+        if player_id := await self._get_player_id(message, address):
+            await self._game.change_bacteria_speed(
+                id_=player_id,
+                speed_polar_coordinates=message.speed_polar_coordinates,
+            )
+
+    @async_log_error("UDPServer")
+    async def _handle_split(self, message: Message, address: AddressTuple):
+        if player_id := await self._get_player_id(message, address):
+            await self._game.split_bacteria(player_id)
+
+    @async_log_error("UDPServer")
+    async def _handle_eject(self, message: Message, address: AddressTuple):
+        if player_id := await self._get_player_id(message, address):
+            await self._game.eject(player_id)
+
+    async def _get_player_id(
+        self, message: Message, address: AddressTuple
+    ) -> Optional[int]:
+        """
+        The player of the sender's session, `message.bacteria_id` is not
+        trusted
+        """
         await self._address_registry.update_address(address)
-        await self._game.change_bacteria_speed(
-            id_=message.bacteria_id,
-            speed_polar_coordinates=message.speed_polar_coordinates,
-        )
+        session = await self._get_session(message, _create_address_string(address))
+        return session.player_id if session else None
+
+    def _send_encoded(self, address: AddressTuple, encoding: Task):
+        self._send_encoded_to_all((address,), encoding)
+
+    def _send_encoded_to_all(self, addresses: Iterable[AddressTuple], encoding: Task):
+        if encoding.cancelled():
+            return
+
+        if error := encoding.exception():
+            _logger.error(f"Encoding failed: {error.__class__}: {error}")
+            return
+
+        data = encoding.result()
+        for address in addresses:
+            self._send(data, address)
+
+    def _send(self, data: bytes, address: AddressTuple):
+        self._transport.sendto(data, address)
+        _packets_sent.inc()
+        _bytes_sent.inc(len(data))
+
+
+class ServerProtocol(Protocol):
+    """
+    Counts the traffic received by the server
+    """
+
+    def datagram_received(self, data: bytes, addr: AddressTuple):
+        _packets_received.inc()
+        _bytes_received.inc(len(data))
+        super().datagram_received(data, addr)
+
+
+class Session:
+    __slots__ = ("token", "player_id", "address", "last_seen")
+
+    def __init__(self, token: str, player_id: int, address: str):
+        self.token = token
+        self.player_id = player_id
+        self.address: Optional[str] = address
+        self.last_seen = datetime.now()
+
+
+class SessionRegistry(AsyncWorker):
+    """
+    Sessions are issued on connect. A client whose address changed sends
+    its token to re-attach to its bacteria instead of creating a new one.
+    Sessions which got no message for `timeout_seconds` are passed to `reap`.
+    """
+
+    def __init__(self, timeout_seconds: float, reap: Callable[[Session], Coroutine]):
+        self._sessions: dict[str, Session] = {}
+        self._tokens_by_address: dict[str, str] = {}
+        self._timeout_seconds_timedelta = timedelta(seconds=timeout_seconds)
+        self._check_interval_seconds = min(timeout_seconds, 1)
+        self._reap = reap
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, player_id: int, address: str) -> Session:
+        if old_token := self._tokens_by_address.pop(address, None):
+            # the old player of the address is abandoned, it will expire
+            self._sessions[old_token].address = None
+
+        session = Session(token_hex(16), player_id, address)
+        self._sessions[session.token] = session
+        self._tokens_by_address[address] = session.token
+        return session
+
+    def restore(self, token: str, player_id: int):
+        """
+        Restores a session without address, the client re-attaches with its
+        token or the session expires
+        """
+        session = Session(token, player_id, None)
+        self._sessions[token] = session
+
+    def get_player_ids(self) -> dict[str, int]:
+        """
+        Token -> player id
+        """
+        return {token: session.player_id for token, session in self._sessions.items()}
+
+    def get(self, token: Optional[str]) -> Optional[Session]:
+        return self._sessions.get(token) if token else None
+
+    def get_by_address(self, address: str) -> Optional[Session]:
+        token = self._tokens_by_address.get(address)
+        return self._sessions.get(token) if token else None
+
+    def touch(self, address: str):
+        if token := self._tokens_by_address.get(address):
+            self._sessions[token].last_seen = datetime.now()
+
+    def rebind(self, session: Session, address: str) -> Optional[str]:
+        """
+        Returns the previous address of the session
+        """
+        old_address = session.address
+        if old_address:
+            self._tokens_by_address.pop(old_address, None)
+
+        if old_token := self._tokens_by_address.get(address):
+            if old_token != session.token:
+                self._sessions[old_token].address = None
+
+        self._tokens_by_address[address] = session.token
+        session.address = address
+        session.last_seen = datetime.now()
+        return old_address
+
+    async def _run(self):
+        self._started.set_result(1)
+        await self._run_in_loop()
+
+    @run_forever
+    async def _run_in_loop(self):
+        await self._reap_expired_sessions()
+        await sleep(self._check_interval_seconds)
+
+    @async_log_error("SessionRegistry")
+    async def _reap_expired_sessions(self):
+        now = datetime.now()
+        expired = [
+            session
+            for session in self._sessions.values()
+            if now - session.last_seen > self._timeout_seconds_timedelta
+        ]
+
+        for session in expired:
+            del self._sessions[session.token]
+            if session.address:
+                self._tokens_by_address.pop(session.address, None)
+
+            await self._reap(session)
 
 
 class AddressRegistry(AsyncWorker):
@@ -193,14 +721,41 @@ class AddressRegistry(AsyncWorker):
 
 
 class GameStatusFilter:
-    def __init__(self, universe: Universe):
+    """
+    Selects the entities which a player sees from its biggest cell.
+    The view distance grows with the radius of that cell. If more than
+    `max_visible_entities` are in view, the nearest and biggest ones are
+    sent, and the left out organisms are only counted per direction.
+    With `density_grid_cells`, organisms are sent one by one only within
+    `PELLET_VIEW_RATIO` of the view distance, farther food is described by
+    a `DensityGrid` spanning `DENSITY_GRID_VIEW_DISTANCES` view distances
+    in every direction.
+    """
+
+    def __init__(
+        self,
+        universe: Universe,
+        max_visible_entities: int = MAX_VISIBLE_ENTITIES,
+        density_grid_cells: int = 0,
+    ):
         self._universe = universe
+        self._max_visible_entities = max_visible_entities
+        self._density_grid_cells = density_grid_cells
         self._address_player_id_map: dict[str, int] = {}
-        self._player_id_view_distance_map: dict[str, float] = {}
         self._lock = Lock()
-        self._game_status: GameStatus = ...
+        self._world: World = ...
         self._positions: np.ndarray = ...
-        self._position_index_organism_map: dict[int, Organism] = {}
+        self._inverse_squared_radii: np.ndarray = ...
+        self._distances = ScratchBuffer()
+        self._work = ScratchBuffer()
+
+    @property
+    def max_visible_entities(self) -> int:
+        return self._max_visible_entities
+
+    @max_visible_entities.setter
+    def max_visible_entities(self, value: int):
+        self._max_visible_entities = max(value, 1)
 
     @property
     def address_player_id_map(self) -> dict:
@@ -210,16 +765,19 @@ class GameStatusFilter:
         async with self._lock:
             self._address_player_id_map[address] = player_id
 
-    async def set_game_status(self, game_status: GameStatus):
+    async def unregister_player(self, address: str):
         async with self._lock:
-            self._game_status = game_status
+            self._address_player_id_map.pop(address, None)
 
-        positions = []
-        for item in self._game_status.organisms + self._game_status.bacterias:
-            positions.append(item.position)
-            self._position_index_organism_map[len(positions) - 1] = item
-
-        self._positions = np.array(positions, np.float32)
+    async def set_world(self, world: World):
+        async with self._lock:
+            self._world = world
+            self._positions = np.concatenate(
+                (world.organisms.positions, world.bacterias.positions)
+            )
+            self._inverse_squared_radii = 1 / (
+                np.concatenate((world.organisms.radii, world.bacterias.radii)) ** 2
+            )
 
     async def get_filtered_game_status(self, address: str) -> Optional[GameStatus]:
         async with self._lock:
@@ -228,37 +786,259 @@ class GameStatusFilter:
             if not player_id:
                 return
 
-            bacteria = self._game_status.get_bacteria_by_id(player_id)
+            bacterias = self._world.bacterias
+            player_rows = bacterias.rows_of_owner(player_id)
 
-            if not bacteria:
+            if not len(player_rows):
                 del self._address_player_id_map[address]
                 return
 
-            relative_positions = self._universe.calculate_position_vector_array(
-                bacteria.position, self._positions
+            bacteria_row = player_rows[np.argmax(bacterias.radii[player_rows])]
+
+            origin = bacterias.positions[bacteria_row, None]
+            shape = (1, len(self._positions))
+            distances = self._universe.calculate_squared_distances(
+                origin,
+                self._positions,
+                self._distances.get(shape),
+                self._work.get(shape),
+            )[0]
+            view_distance = self._universe.calculate_view_distance(
+                bacterias.radii[bacteria_row]
             )
-            distances = (
-                relative_positions[:, 0] ** 2 + relative_positions[:, 1] ** 2
-            ) ** 0.5
+            indexes = np.flatnonzero(distances < view_distance**2)
+            organism_count = len(self._world.organisms)
+            omitted_organisms = None
+            density_grid = None
 
-            index_distance_map = {distances[i]: i for i in range(len(distances))}
+            if self._density_grid_cells:
+                density_grid = self._create_density_grid(
+                    origin, distances[:organism_count], view_distance
+                )
+                indexes = indexes[
+                    (indexes >= organism_count)
+                    | (distances[indexes] < (view_distance * PELLET_VIEW_RATIO) ** 2)
+                ]
 
-            game_status = GameStatus()
+            if len(indexes) > self._max_visible_entities:
+                indexes, omitted_indexes = self._select_by_priority(
+                    indexes, distances[indexes]
+                )
+                omitted_organisms = self._count_by_sector(
+                    origin, omitted_indexes[omitted_indexes < organism_count]
+                )
 
-            type_list_map = {
-                Organism: game_status.organisms,
-                Bacteria: game_status.bacterias,
-            }
+            organism_indexes = indexes[indexes < organism_count]
+            bacteria_indexes = indexes[indexes >= organism_count] - organism_count
 
-            indexes = (
-                index_distance_map[distance]
-                for distance in distances[distances < Universe.VIEW_DISTANCE]
+            return GameStatus.construct(
+                organisms=self._world.organisms.to_organisms(organism_indexes),
+                bacterias=bacterias.to_bacterias(bacteria_indexes),
+                omitted_organisms=omitted_organisms,
+                density_grid=density_grid,
             )
-            for index in indexes:
-                organism = self._position_index_organism_map[index]
-                type_list_map[organism.__class__].append(organism)
 
-            return game_status
+    def _select_by_priority(
+        self, indexes: np.ndarray, squared_distances: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Splits the indexes to the `max_visible_entities` most important ones
+        and the rest. Near and big entities are the important ones.
+        """
+        priorities = squared_distances * self._inverse_squared_radii[indexes]
+        selected = _select_lowest(priorities, self._max_visible_entities)
+
+        return indexes[selected], indexes[~selected]
+
+    def _create_density_grid(
+        self,
+        origin: np.ndarray,
+        organism_squared_distances: np.ndarray,
+        view_distance: float,
+    ) -> DensityGrid:
+        cells_per_side = self._density_grid_cells
+        half_size = min(
+            view_distance * DENSITY_GRID_VIEW_DISTANCES, self._universe.world_size / 2
+        )
+        cell_size = 2 * half_size / cells_per_side
+        rows = np.flatnonzero(organism_squared_distances < 2 * half_size**2)
+        vectors = self._universe.calculate_position_vector_array(
+            origin, self._positions[rows]
+        )
+        cells = np.floor((vectors + half_size) / cell_size).astype(np.int64)
+        cells = cells[np.all((cells >= 0) & (cells < cells_per_side), axis=1)]
+        counts = np.bincount(
+            cells[:, 0] * cells_per_side + cells[:, 1],
+            minlength=cells_per_side**2,
+        )
+
+        return DensityGrid.construct(
+            position=origin[0].copy(),
+            cell_size=float(cell_size),
+            counts=np.minimum(counts, 255)
+            .astype(np.uint8)
+            .reshape(cells_per_side, cells_per_side),
+        )
+
+    def _count_by_sector(self, origin: np.ndarray, indexes: np.ndarray) -> list[int]:
+        vectors = self._universe.calculate_position_vector_array(
+            origin, self._positions[indexes]
+        )
+        angles = np.arctan2(vectors[:, 1], vectors[:, 0]) % (2 * pi)
+        sectors = (angles * (OMITTED_ORGANISM_SECTORS / (2 * pi))).astype(np.int64)
+
+        return np.bincount(
+            sectors % OMITTED_ORGANISM_SECTORS, minlength=OMITTED_ORGANISM_SECTORS
+        ).tolist()
+
+
+class SpectatorView:
+    """
+    Game statuses of the spectators, one per watched region, shared by all
+    spectators of the region. A region is a cell of a `regions_per_side` x
+    `regions_per_side` grid over the world, or `WHOLE_WORLD`.
+    With `density_grid_cells`, the organisms of the region are described by
+    a `DensityGrid` covering the region instead of one by one, the organisms
+    of the whole world are always described by one.
+    If more than `max_visible_entities` entities are left, the ones nearest
+    to the center of the region and the biggest ones are sent.
+    """
+
+    def __init__(
+        self,
+        universe: Universe,
+        regions_per_side: int = SPECTATOR_REGIONS_PER_SIDE,
+        density_grid_cells: int = 0,
+        max_visible_entities: int = MAX_VISIBLE_ENTITIES,
+    ):
+        self._universe = universe
+        self._regions_per_side = regions_per_side
+        self._region_size = universe.world_size / regions_per_side
+        self._density_grid_cells = density_grid_cells
+        self._max_visible_entities = max(max_visible_entities, 1)
+        self._world: World = ...
+        self._organism_regions: Optional[np.ndarray] = None
+        self._bacteria_regions: Optional[np.ndarray] = None
+
+    def get_region(self, position: Optional[np.ndarray]) -> int:
+        if position is None:
+            return WHOLE_WORLD
+
+        x, y = self._get_cells(np.asarray(position, np.float32).reshape(1, 2))[0]
+        return int(x * self._regions_per_side + y)
+
+    def set_world(self, world: World):
+        self._world = world
+        self._organism_regions = None
+        self._bacteria_regions = None
+
+    def get_game_status(self, region: int) -> GameStatus:
+        organisms = self._world.organisms
+        bacterias = self._world.bacterias
+
+        if region == WHOLE_WORLD:
+            organism_rows = np.arange(len(organisms))
+            bacteria_rows = np.arange(len(bacterias))
+            size = self._universe.world_size
+            center = np.full(2, size / 2, np.float32)
+            density_grid_cells = (
+                self._density_grid_cells or WHOLE_WORLD_DENSITY_GRID_CELLS
+            )
+        else:
+            if self._organism_regions is None:
+                self._organism_regions = self._get_regions(organisms.positions)
+                self._bacteria_regions = self._get_regions(bacterias.positions)
+
+            organism_rows = np.flatnonzero(self._organism_regions == region)
+            bacteria_rows = np.flatnonzero(self._bacteria_regions == region)
+            size = self._region_size
+            center = (
+                np.array(divmod(region, self._regions_per_side), np.float32) + 0.5
+            ) * size
+            density_grid_cells = self._density_grid_cells
+
+        density_grid = None
+        if density_grid_cells:
+            density_grid = self._create_density_grid(
+                organisms.positions[organism_rows], center, size, density_grid_cells
+            )
+            organism_rows = organism_rows[:0]
+
+        if len(organism_rows) + len(bacteria_rows) > self._max_visible_entities:
+            organism_rows, bacteria_rows = self._select_by_priority(
+                organism_rows, bacteria_rows, center
+            )
+
+        return GameStatus.construct(
+            organisms=organisms.to_organisms(organism_rows),
+            bacterias=bacterias.to_bacterias(bacteria_rows),
+            density_grid=density_grid,
+        )
+
+    def _get_cells(self, positions: np.ndarray) -> np.ndarray:
+        cells = np.floor(
+            np.mod(positions, self._universe.world_size) / self._region_size
+        ).astype(np.int64)
+        return np.minimum(cells, self._regions_per_side - 1)
+
+    def _get_regions(self, positions: np.ndarray) -> np.ndarray:
+        cells = self._get_cells(positions)
+        return cells[:, 0] * self._regions_per_side + cells[:, 1]
+
+    def _select_by_priority(
+        self, organism_rows: np.ndarray, bacteria_rows: np.ndarray, center: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        organisms = self._world.organisms
+        bacterias = self._world.bacterias
+        positions = np.concatenate(
+            (organisms.positions[organism_rows], bacterias.positions[bacteria_rows])
+        )
+        radii = np.concatenate(
+            (organisms.radii[organism_rows], bacterias.radii[bacteria_rows])
+        )
+        priorities = (
+            self._universe.calculate_squared_distances(center[None], positions)[0]
+            / radii**2
+        )
+        selected = _select_lowest(priorities, self._max_visible_entities)
+
+        return (
+            organism_rows[selected[: len(organism_rows)]],
+            bacteria_rows[selected[len(organism_rows) :]],
+        )
+
+    def _create_density_grid(
+        self,
+        positions: np.ndarray,
+        center: np.ndarray,
+        size: float,
+        cells_per_side: int,
+    ) -> DensityGrid:
+        cell_size = size / cells_per_side
+        cells = np.floor((positions - (center - size / 2)) / cell_size).astype(np.int64)
+        cells = np.clip(cells, 0, cells_per_side - 1)
+        counts = np.bincount(
+            cells[:, 0] * cells_per_side + cells[:, 1],
+            minlength=cells_per_side**2,
+        )
+
+        return DensityGrid.construct(
+            position=center,
+            cell_size=float(cell_size),
+            counts=np.minimum(counts, 255)
+            .astype(np.uint8)
+            .reshape(cells_per_side, cells_per_side),
+        )
+
+
+def _select_lowest(priorities: np.ndarray, count: int) -> np.ndarray:
+    """
+    Mask of the `count` lowest priorities
+    """
+    selected = np.zeros(len(priorities), bool)
+    selected[np.argpartition(priorities, count - 1)[:count]] = True
+
+    return selected
 
 
 def _create_address_string(address: AddressTuple) -> str:
@@ -270,4 +1050,22 @@ def _create_address_tuple(address: str) -> AddressTuple:
     return host, int(port)
 
 
+_BUFFER_NAMES = {SO_RCVBUF: "receive", SO_SNDBUF: "send"}
+
 _logger = create_logger(__name__)
+
+_packets_received = metrics.counter("packets_received_total", "Received datagrams")
+_bytes_received = metrics.counter("bytes_received_total", "Received bytes")
+_packets_sent = metrics.counter("packets_sent_total", "Sent datagrams")
+_bytes_sent = metrics.counter("bytes_sent_total", "Sent bytes")
+_queue_depth = metrics.gauge("queue_depth", "Items waiting in the queues", ("queue",))
+_snapshot_seconds = metrics.histogram(
+    "snapshot_write_seconds", "Duration of writing a world snapshot"
+)
+_socket_buffer_bytes = metrics.gauge(
+    "socket_buffer_bytes", "Buffer sizes of the server socket", ("direction",)
+)
+_spectators = metrics.gauge("spectators", "Connected spectators")
+_refused_connects = metrics.counter(
+    "refused_connects_total", "Connect requests refused because of overload"
+)
@@ -0,0 +1,79 @@
+from asyncio import sleep
+from pathlib import Path
+
+from datek_agar_core.metrics import metrics
+from datek_agar_core.utils import AsyncWorker, create_logger, run_forever
+
+SNMP_PATH = Path("/proc/net/snmp")
+
+DROP_COUNTERS = ("InErrors", "RcvbufErrors", "SndbufErrors", "MemErrors")
+"""Counters of the datagrams dropped by the kernel"""
+
+
+def read_udp_stats(path: Path = SNMP_PATH) -> dict[str, int]:
+    """
+    Host wide UDP counters of the kernel, empty if they are not available
+    """
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+
+    rows = [line.split()[1:] for line in lines if line.startswith("Udp:")]
+    if len(rows) < 2:
+        return {}
+
+    names, values = rows[:2]
+    return {name: int(value) for name, value in zip(names, values)}
+
+
+class UdpStatsSampler(AsyncWorker):
+    """
+    Copies the kernel's UDP counters into the metrics in every
+    `interval_seconds` and warns when datagrams were dropped since the
+    previous sample. The counters are host wide, not per socket.
+    """
+
+    def __init__(self, interval_seconds: float = 5, path: Path = SNMP_PATH):
+        self._interval_seconds = interval_seconds
+        self._path = path
+        self._previous: dict[str, int] = {}
+
+    async def _run(self):
+        if not read_udp_stats(self._path):
+            _logger.warning(f"Kernel UDP counters are not available: {self._path}")
+            self._started.set_result(1)
+            return
+
+        self._started.set_result(1)
+        await self._run_in_loop()
+
+    @run_forever
+    async def _run_in_loop(self):
+        self.sample()
+        await sleep(self._interval_seconds)
+
+    def sample(self):
+        stats = read_udp_stats(self._path)
+        for name, value in stats.items():
+            _kernel_udp.set(value, name)
+
+        drops = {
+            name: stats[name] - self._previous[name]
+            for name in DROP_COUNTERS
+            if stats.get(name, 0) > self._previous.get(name, stats.get(name, 0))
+        }
+        if drops:
+            _logger.warning(
+                "Kernel dropped UDP datagrams: "
+                + ", ".join(f"{name} +{value}" for name, value in drops.items())
+            )
+
+        self._previous = stats
+
+
+_logger = create_logger(__name__)
+
+_kernel_udp = metrics.gauge(
+    "kernel_udp", "Host wide UDP counters of the kernel", ("counter",)
+)
@@ -0,0 +1,129 @@
+from enum import IntEnum
+from time import thread_time
+from typing import Callable
+
+from datek_agar_core.metrics import metrics
+from datek_agar_core.utils import create_logger
+
+
+class OverloadLevel(IntEnum):
+    """
+    Every level keeps the degradations of the lower levels
+    """
+
+    NORMAL = 0
+    REDUCED_BROADCAST = 1
+    """Every client gets only every second of its game status updates"""
+    REDUCED_VIEW = 2
+    """Players get half as many entities"""
+    DEFERRED_FOOD = 3
+    """Food is placed once in `FOOD_DEFER_TURNS` turns"""
+    FULL = 4
+    """New players are refused"""
+
+
+FOOD_DEFER_TURNS = 20
+
+
+class OverloadController:
+    """
+    Measures the load as the CPU time of the event loop's thread between two
+    turns relative to the turn interval (`budget_seconds`), which counts the
+    turn, the broadcasts and the handling of the inputs once, even if they
+    interleave. Encoding on worker threads is not counted.
+    The level steps up after the smoothed load was above `high_load`
+    (or the game status queue was longer than `max_queue_depth`) for
+    `escalate_turns` turns in a row, and steps down after it was below
+    `low_load` with an empty queue for `recover_turns` turns in a row.
+    """
+
+    def __init__(
+        self,
+        *,
+        budget_seconds: float,
+        high_load: float = 0.9,
+        low_load: float = 0.6,
+        max_queue_depth: int = 2,
+        escalate_turns: int = 20,
+        recover_turns: int = 200,
+        smoothing: float = 0.1,
+        clock: Callable[[], float] = thread_time,
+    ):
+        self._budget_seconds = budget_seconds
+        self._high_load = high_load
+        self._low_load = min(low_load, high_load)
+        self._max_queue_depth = max_queue_depth
+        self._escalate_turns = escalate_turns
+        self._recover_turns = recover_turns
+        self._smoothing = smoothing
+        self._clock = clock
+        self._level = OverloadLevel.NORMAL
+        self._load = 0.0
+        self._last_observed = clock()
+        self._queue_depth = 0
+        self._hot_turns = 0
+        self._calm_turns = 0
+
+    @property
+    def level(self) -> OverloadLevel:
+        return self._level
+
+    @property
+    def load(self) -> float:
+        """Smoothed ratio of the work per turn and the turn interval"""
+        return self._load
+
+    def observe_queue_depth(self, queue_depth: int):
+        """
+        Game statuses waiting for the broadcast
+        """
+        self._queue_depth = queue_depth
+
+    def observe_turn(self) -> OverloadLevel:
+        """
+        Has to be called after every turn
+        """
+        now = self._clock()
+        load = (now - self._last_observed) / self._budget_seconds
+        self._last_observed = now
+        self._load += self._smoothing * (load - self._load)
+        _overload_load.set(self._load)
+
+        if self._load > self._high_load or self._queue_depth > self._max_queue_depth:
+            self._calm_turns = 0
+            self._hot_turns += 1
+            if self._hot_turns >= self._escalate_turns:
+                self._hot_turns = 0
+                self._set_level(min(self._level + 1, OverloadLevel.FULL))
+
+        elif self._load < self._low_load and not self._queue_depth:
+            self._hot_turns = 0
+            self._calm_turns += 1
+            if self._calm_turns >= self._recover_turns:
+                self._calm_turns = 0
+                self._set_level(max(self._level - 1, OverloadLevel.NORMAL))
+
+        else:
+            self._hot_turns = 0
+            self._calm_turns = 0
+
+        return self._level
+
+    def _set_level(self, level: int):
+        if level == self._level:
+            return
+
+        _logger.warning(
+            f"Overload level {self._level.name} -> {OverloadLevel(level).name}, "
+            f"load: {self._load:.2f}"
+        )
+        self._level = OverloadLevel(level)
+        _overload_level.set(self._level)
+
+
+_logger = create_logger(__name__)
+
+_overload_level = metrics.gauge("overload_level", "Degradation level of the server")
+_overload_load = metrics.gauge(
+    "overload_load", "Smoothed work per turn relative to the turn interval"
+)
@@ -0,0 +1,225 @@
+from mmap import mmap, ACCESS_READ
+from os import fsync, replace
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from datek_agar_core.lifecycle import FoodLifecycleState
+from datek_agar_core.universe import Universe
+from datek_agar_core.world import BacteriaStore, OrganismStore, World
+from pydantic import BaseModel
+
+SNAPSHOT_MAGIC = b"AGARSNAP"
+SNAPSHOT_VERSION = 1
+
+_ALIGNMENT = 64
+_HEADER_LENGTH_SIZE = 8
+
+
+class ColumnHeader(BaseModel):
+    store: str
+    name: str
+    dtype: str
+    shape: tuple[int, ...]
+    offset: int
+
+
+class LifecycleHeader(BaseModel):
+    tick: int
+    respawn_queue: list[tuple[int, float]]
+    """Tick of the respawn -> nutrient"""
+    random_state: dict[str, Any]
+    """State of the lifecycle's numpy bit generator"""
+
+
+class SnapshotHeader(BaseModel):
+    version: int = SNAPSHOT_VERSION
+    world_size: float
+    total_nutrient: float
+    turn: int
+    current_id: int
+    """State of the id allocator"""
+    random_state: dict[str, Any]
+    """State of the simulation's numpy bit generator"""
+    sessions: dict[str, int] = {}
+    """Session token -> player id"""
+    names: list[str] = []
+    """Names of the bacterias, the other columns are stored as arrays"""
+    lifecycle: Optional[LifecycleHeader] = None
+    """State of the food lifecycle, the decay queue is stored as arrays"""
+    columns: list[ColumnHeader] = []
+
+
+class Snapshot:
+    __slots__ = ("header", "world", "lifecycle")
+
+    def __init__(
+        self,
+        header: SnapshotHeader,
+        world: World,
+        lifecycle: Optional[FoodLifecycleState] = None,
+    ):
+        self.header = header
+        self.world = world
+        self.lifecycle = lifecycle
+
+
+def validate_header(header: SnapshotHeader, universe: Universe):
+    """
+    Raises `ValueError` if the snapshot was taken in a different universe
+    """
+    if header.world_size != universe.world_size:
+        raise ValueError(
+            f"Snapshot world size {header.world_size} != {universe.world_size}"
+        )
+
+    if header.total_nutrient != universe.total_nutrient:
+        raise ValueError(
+            f"Snapshot total nutrient {header.total_nutrient} "
+            f"!= {universe.total_nutrient}"
+        )
+
+
+def write_snapshot(path: Path, snapshot: Snapshot):
+    """
+    Writes `MAGIC | header length | JSON header | aligned raw columns` to a
+    temporary file, then renames it to `path`, so a crash leaves either the
+    old or the new snapshot
+    """
+    lifecycle = snapshot.lifecycle
+    header = snapshot.header.copy(
+        update={
+            "names": snapshot.world.bacterias.names.tolist(),
+            "lifecycle": LifecycleHeader(
+                tick=lifecycle.tick,
+                respawn_queue=lifecycle.respawn_queue,
+                random_state=lifecycle.random_state,
+            )
+            if lifecycle
+            else None,
+            "columns": [],
+        }
+    )
+    arrays = []
+    for store_name, columns in _get_columns(snapshot):
+        for name, column in columns.items():
+            if column.dtype == object:
+                continue
+
+            arrays.append(column)
+            header.columns.append(
+                ColumnHeader(
+                    store=store_name,
+                    name=name,
+                    dtype=column.dtype.str,
+                    shape=column.shape,
+                    offset=0,
+                )
+            )
+
+    # the offsets depend on the length of the header, which contains them
+    data_start = 0
+    while True:
+        offset = data_start
+        for column_header, array in zip(header.columns, arrays):
+            column_header.offset = offset
+            offset = _align(offset + array.nbytes)
+
+        encoded_header = header.json().encode()
+        header_end = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH_SIZE + len(encoded_header)
+        if _align(header_end) == data_start:
+            break
+
+        data_start = _align(header_end)
+
+    temporary_path = path.with_name(path.name + ".tmp")
+    with temporary_path.open("wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        file.write(len(encoded_header).to_bytes(_HEADER_LENGTH_SIZE, "little"))
+        file.write(encoded_header)
+        for column_header, array in zip(header.columns, arrays):
+            file.seek(column_header.offset)
+            file.write(np.ascontiguousarray(array).tobytes())
+
+        file.flush()
+        fsync(file.fileno())
+
+    replace(temporary_path, path)
+
+
+def read_snapshot(path: Path, universe: Universe = None) -> Snapshot:
+    """
+    :param universe: if given, the snapshot is validated against it before
+        the columns are read
+    """
+    with path.open("rb") as file, mmap(file.fileno(), 0, access=ACCESS_READ) as data:
+        if data[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a world snapshot: {path}")
+
+        header_start = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH_SIZE
+        header_length = int.from_bytes(
+            data[len(SNAPSHOT_MAGIC) : header_start], "little"
+        )
+        header = SnapshotHeader.parse_raw(
+            data[header_start : header_start + header_length]
+        )
+
+        if header.version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {header.version}")
+
+        if universe is not None:
+            validate_header(header, universe)
+
+        columns: dict[str, dict[str, np.ndarray]] = {
+            "organisms": {},
+            "bacterias": {},
+            "lifecycle": {},
+        }
+        for column in header.columns:
+            count = int(np.prod(column.shape))
+            columns[column.store][column.name] = (
+                np.frombuffer(data, column.dtype, count, column.offset)
+                if count
+                else np.empty(0, column.dtype)
+            ).reshape(column.shape)
+
+        columns["bacterias"]["names"] = np.array(header.names, object)
+        world = World(
+            OrganismStore.from_columns(columns["organisms"]),
+            BacteriaStore.from_columns(columns["bacterias"]),
+            header.turn,
+        )
+        lifecycle = (
+            FoodLifecycleState(
+                tick=header.lifecycle.tick,
+                decay_ids=columns["lifecycle"]["decay_ids"].copy(),
+                decay_ticks=columns["lifecycle"]["decay_ticks"].copy(),
+                respawn_queue=header.lifecycle.respawn_queue,
+                random_state=header.lifecycle.random_state,
+            )
+            if header.lifecycle
+            else None
+        )
+        # the stores copied the columns, the views have to be released
+        # before the map is closed
+        columns.clear()
+
+    return Snapshot(
+        header.copy(update={"names": [], "lifecycle": None, "columns": []}),
+        world,
+        lifecycle,
+    )
+
+
+def _get_columns(snapshot: Snapshot) -> Iterable[tuple[str, dict[str, np.ndarray]]]:
+    yield "organisms", snapshot.world.organisms.columns()
+    yield "bacterias", snapshot.world.bacterias.columns()
+    if snapshot.lifecycle:
+        yield "lifecycle", {
+            "decay_ids": snapshot.lifecycle.decay_ids,
+            "decay_ticks": snapshot.lifecycle.decay_ticks,
+        }
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
@@ -0,0 +1,103 @@
+from cProfile import Profile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from datek_agar_core.utils import create_logger
+
+
+class TurnProfiler:
+    """
+    Profiles windows of `window_turns` consecutive turns in every `interval_turns`
+    turns with cProfile. Everything which runs on the event loop during the
+    window is captured, so it covers both the simulation and the sending of
+    the game status. Every window is dumped to a pstats file, only the newest
+    `keep_files` files are kept, 0 keeps none.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: Path,
+        window_turns: int = 200,
+        interval_turns: int = 2000,
+        keep_files: int = 10,
+        enabled: bool = False,
+    ):
+        self._directory = directory
+        self._window_turns = window_turns
+        self._interval_turns = max(interval_turns, window_turns)
+        self._keep_files = max(keep_files, 0)
+        self._enabled = enabled
+        self._turn = 0
+        self._window_start_turn = 0
+        self._next_window_turn = 0
+        self._profile: Optional[Profile] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def is_profiling(self) -> bool:
+        return self._profile is not None
+
+    def toggle(self):
+        self._enabled = not self._enabled
+        _logger.info(f"Profiling {'enabled' if self._enabled else 'disabled'}")
+
+        if self._enabled:
+            self._next_window_turn = self._turn + 1
+        else:
+            self._stop_window(self._turn)
+
+    def on_turn(self):
+        """
+        Has to be called at the beginning of every turn
+        """
+        self._turn += 1
+
+        if (
+            self._profile is not None
+            and self._turn - self._window_start_turn >= self._window_turns
+        ):
+            self._stop_window(self._turn - 1)
+
+        if (
+            self._profile is None
+            and self._enabled
+            and self._turn >= self._next_window_turn
+        ):
+            self._start_window()
+
+    def stop(self):
+        self._stop_window(self._turn)
+
+    def _start_window(self):
+        self._window_start_turn = self._turn
+        self._next_window_turn = self._turn + self._interval_turns
+        self._profile = Profile()
+        self._profile.enable()
+
+    def _stop_window(self, last_turn: int):
+        if self._profile is None:
+            return
+
+        self._profile.disable()
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._directory / (
+            f"{datetime.now():%Y%m%d-%H%M%S}"
+            f"-turns-{self._window_start_turn:09d}-{last_turn:09d}.pstats"
+        )
+        self._profile.dump_stats(path)
+        self._profile = None
+        _logger.info(f"Profile written to {path}")
+        self._rotate()
+
+    def _rotate(self):
+        files = sorted(self._directory.glob("*-turns-*.pstats"))
+        for path in files[: max(len(files) - self._keep_files, 0)]:
+            path.unlink()
+
+
+_logger = create_logger(__name__)
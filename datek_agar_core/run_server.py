@@ -1,8 +1,24 @@
-from asyncio import run, get_event_loop, Future
+from asyncio import run, get_event_loop, Future, AbstractEventLoop
+from pathlib import Path
+import signal
+from tempfile import gettempdir
+from typing import Optional, Callable
 
 import click
-from datek_agar_core.network.server import UDPServer
-from datek_agar_core.utils import create_logger
+from datek_agar_core.game import REFRESH_FREQUENCY
+from datek_agar_core.metrics import AdminServer
+from datek_agar_core.network.ingress import IngressWorkers
+from datek_agar_core.network.rate_limit import RateLimiter
+from datek_agar_core.network.server import UDPServer, MAX_VISIBLE_ENTITIES
+from datek_agar_core.network.udp_stats import UdpStatsSampler
+from datek_agar_core.overload import OverloadController
+from datek_agar_core.profiler import TurnProfiler
+from datek_agar_core.shared_ring import WorldRingPublisher
+from datek_agar_core.utils import (
+    create_logger,
+    start_log_listener,
+    stop_log_listener,
+)
 
 
 try:
@@ -24,8 +40,154 @@ _stop_signal: Future = ...
 @click.option("--port", default=9582, help="Port")
 @click.option("--size", default=200, help="World size")
 @click.option("--livestock", default=90, help="Total livestock in the world")
+@click.option(
+    "--tick-rate",
+    type=click.FloatRange(min=0, min_open=True),
+    default=float(REFRESH_FREQUENCY),
+    help="Simulation turns per second",
+)
+@click.option(
+    "--broadcast-rate",
+    type=click.FloatRange(min=0, min_open=True),
+    default=float(REFRESH_FREQUENCY),
+    help="Game status updates per second, rounded to every Nth turn",
+)
+@click.option(
+    "--food-lifetime",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    help="Food decays after 1-2 times of this many seconds and respawns, "
+    "0 (default) disables decay",
+)
+@click.option(
+    "--max-visible-entities",
+    default=MAX_VISIBLE_ENTITIES,
+    help="Maximal number of entities sent to a player in one update",
+)
+@click.option(
+    "--density-grid-cells",
+    default=0,
+    help="Cells per side of the food density grid sent instead of far organisms, "
+    "0 disables it",
+)
+@click.option(
+    "--spectator-update-every",
+    default=4,
+    help="Spectators get every Nth game status update",
+)
+@click.option(
+    "--spectator-density-grid-cells",
+    default=0,
+    help="Cells per side of the food density grid sent to the spectators "
+    "instead of the organisms, 0 disables it",
+)
+@click.option(
+    "--encode-workers",
+    default=2,
+    help="Threads packing the game status messages, 0 packs them on the event loop",
+)
+@click.option(
+    "--max-encodes-in-flight",
+    default=64,
+    help="Maximal number of messages being packed at the same time",
+)
+@click.option(
+    "--overload-control/--no-overload-control",
+    default=True,
+    help="Degrade the service step by step when the turns take too long",
+)
+@click.option(
+    "--session-timeout",
+    default=30.0,
+    help="Seconds after the bacterias of a silent client are removed",
+)
+@click.option(
+    "--receive-buffer",
+    default=0,
+    help="SO_RCVBUF of the server socket in bytes, 0 keeps the system default",
+)
+@click.option(
+    "--send-buffer",
+    default=0,
+    help="SO_SNDBUF of the server socket in bytes, 0 keeps the system default",
+)
+@click.option(
+    "--reuse-port", is_flag=True, help="Bind the server socket with SO_REUSEPORT"
+)
+@click.option(
+    "--ingress-workers",
+    default=0,
+    help="Processes bound to the port with SO_REUSEPORT which decode the inputs "
+    "for the server, 0 disables them",
+)
+@click.option(
+    "--ingress-socket",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Unix socket of the ingress workers, a temporary file by default",
+)
+@click.option(
+    "--kernel-stats-interval",
+    default=5.0,
+    help="Seconds between samples of the kernel UDP counters, 0 disables them",
+)
+@click.option(
+    "--input-rate",
+    default=100.0,
+    help="Datagrams per second accepted from one address, 0 disables the limit",
+)
+@click.option("--input-burst", default=200.0, help="Burst of datagrams per address")
+@click.option(
+    "--snapshot",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="World snapshot file, written periodically and on shutdown",
+)
+@click.option("--snapshot-interval", default=60.0, help="Seconds between snapshots")
+@click.option(
+    "--restore", is_flag=True, help="Restore the world from the --snapshot file"
+)
+@click.option(
+    "--shared-memory",
+    default=None,
+    help="Name of the shared memory ring which every turn is published to, "
+    "for local observers",
+)
+@click.option(
+    "--admin-port",
+    type=int,
+    default=None,
+    help="Port of the HTTP server which exposes the metrics on /metrics",
+)
+@click.option("--admin-host", default="127.0.0.1", help="Host of the admin server")
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Profile the turns from the start. SIGUSR1 toggles profiling at runtime",
+)
+@click.option(
+    "--profile-dir",
+    default="profiles",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="Directory of the pstats files",
+)
+@click.option("--profile-window", default=200, help="Profiled turns per file")
+@click.option("--profile-interval", default=2000, help="Turns between profiles")
+@click.option(
+    "--profile-keep",
+    default=10,
+    type=click.IntRange(min=0),
+    help="Number of pstats files to keep",
+)
 def run_server(**kwargs):
+    if kwargs["broadcast_rate"] > kwargs["tick_rate"]:
+        raise click.UsageError("--broadcast-rate can't be higher than --tick-rate")
+
+    if kwargs["restore"] and not kwargs["snapshot"]:
+        raise click.UsageError("--restore requires --snapshot")
+
     uvloop.install()
+    start_log_listener()
     _logger.info("Configuration:")
     for key, value in kwargs.items():
         _logger.info(f"{key}: {value}")
@@ -34,6 +196,8 @@ def run_server(**kwargs):
         run(_main(**kwargs))
     except KeyboardInterrupt:
         pass
+    finally:
+        stop_log_listener()
 
 
 def stop_server():
@@ -41,21 +205,151 @@ def stop_server():
     _stop_signal.set_result(1)
 
 
-async def _main(*, host: str, port: int, size: int, livestock: int):
+async def _main(
+    *,
+    host: str,
+    port: int,
+    size: int,
+    livestock: int,
+    tick_rate: float,
+    broadcast_rate: float,
+    food_lifetime: float,
+    max_visible_entities: int,
+    density_grid_cells: int,
+    spectator_update_every: int,
+    spectator_density_grid_cells: int,
+    encode_workers: int,
+    max_encodes_in_flight: int,
+    overload_control: bool,
+    session_timeout: float,
+    receive_buffer: int,
+    send_buffer: int,
+    reuse_port: bool,
+    ingress_workers: int,
+    ingress_socket: Optional[Path],
+    kernel_stats_interval: float,
+    input_rate: float,
+    input_burst: float,
+    snapshot: Optional[Path],
+    snapshot_interval: float,
+    restore: bool,
+    shared_memory: Optional[str],
+    admin_port: Optional[int],
+    admin_host: str,
+    profile: bool,
+    profile_dir: Path,
+    profile_window: int,
+    profile_interval: int,
+    profile_keep: int,
+):
     global _stop_signal
     _stop_signal = Future()
     _logger.info("Starting server")
     loop = get_event_loop()
     loop.shutdown_default_executor = _handle_shutdown
-    server = UDPServer(host=host, port=port, world_size=size, total_nutrient=livestock)
+    profiler = TurnProfiler(
+        directory=profile_dir,
+        window_turns=profile_window,
+        interval_turns=profile_interval,
+        keep_files=profile_keep,
+        enabled=profile,
+    )
+    _add_signal_handler(loop, profiler.toggle)
+    ring_publisher = WorldRingPublisher(shared_memory) if shared_memory else None
+    if ingress_workers:
+        ingress_socket = ingress_socket or Path(gettempdir()) / f"agar-{port}.sock"
+
+    server = UDPServer(
+        host=host,
+        port=port,
+        world_size=size,
+        total_nutrient=livestock,
+        session_timeout_seconds=session_timeout,
+        food_lifetime_seconds=food_lifetime,
+        tick_rate=tick_rate,
+        broadcast_every=max(round(tick_rate / broadcast_rate), 1),
+        max_visible_entities=max_visible_entities,
+        density_grid_cells=density_grid_cells,
+        spectator_update_every=spectator_update_every,
+        spectator_density_grid_cells=spectator_density_grid_cells,
+        encode_workers=encode_workers,
+        max_encodes_in_flight=max_encodes_in_flight,
+        receive_buffer_bytes=receive_buffer,
+        send_buffer_bytes=send_buffer,
+        reuse_port=reuse_port or bool(ingress_workers),
+        ingress_socket_path=ingress_socket if ingress_workers else None,
+        overload_controller=OverloadController(budget_seconds=1 / tick_rate)
+        if overload_control
+        else None,
+        rate_limiter=RateLimiter(rate=input_rate, burst=input_burst)
+        if input_rate
+        else None,
+        snapshot_path=snapshot,
+        snapshot_interval_seconds=snapshot_interval,
+        restore=restore,
+        ring_publisher=ring_publisher,
+        profiler=profiler,
+    )
+    admin_server = AdminServer(host=admin_host, port=admin_port) if admin_port else None
+    ingress = (
+        IngressWorkers(
+            host=host,
+            port=port,
+            socket_path=ingress_socket,
+            workers=ingress_workers,
+            input_rate=input_rate,
+            input_burst=input_burst,
+        )
+        if ingress_workers
+        else None
+    )
+    udp_stats_sampler = (
+        UdpStatsSampler(kernel_stats_interval) if kernel_stats_interval else None
+    )
 
     server.start()
     _logger.info("Server started")
 
     await server.wait_started()
+
+    if admin_server:
+        admin_server.start()
+        await admin_server.wait_started()
+        _logger.info(f"Metrics available on http://{admin_host}:{admin_port}/metrics")
+
+    if ingress:
+        ingress.start()
+        await ingress.wait_started()
+        _logger.info(f"{ingress_workers} ingress workers started")
+
+    if udp_stats_sampler:
+        udp_stats_sampler.start()
+
     await _stop_signal
+
+    if ingress:
+        ingress.stop()
+        await ingress.task
+
+    if udp_stats_sampler:
+        udp_stats_sampler.stop()
+
+    if admin_server:
+        admin_server.stop()
+
     server.stop()
     await server.task
+    profiler.stop()
+
+    if ring_publisher:
+        ring_publisher.close()
+
+
+def _add_signal_handler(loop: AbstractEventLoop, callback: Callable):
+    try:
+        loop.add_signal_handler(signal.SIGUSR1, callback)
+    except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+        _logger.warning("SIGUSR1 is not available, profiling can't be toggled")
 
 
 async def _handle_shutdown(*args, **kwargs):
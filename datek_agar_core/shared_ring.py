@@ -0,0 +1,274 @@
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+
+import numpy as np
+from datek_agar_core.metrics import metrics
+from datek_agar_core.world import World
+
+RING_MAGIC = b"AGARRING"
+RING_VERSION = 1
+
+_ALIGNMENT = 64
+
+_RING_HEADER = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("slot_count", "<u4"),
+        ("organism_capacity", "<u8"),
+        ("bacteria_capacity", "<u8"),
+        ("latest_slot", "<i8"),
+    ]
+)
+_SLOT_HEADER = np.dtype(
+    [
+        ("sequence", "<u8"),
+        ("turn", "<u8"),
+        ("organism_count", "<u8"),
+        ("bacteria_count", "<u8"),
+    ]
+)
+_COLUMNS = (
+    ("organisms", "ids", "<i8", ()),
+    ("organisms", "positions", "<f4", (2,)),
+    ("organisms", "radii", "<f4", ()),
+    ("bacterias", "ids", "<i8", ()),
+    ("bacterias", "positions", "<f4", (2,)),
+    ("bacterias", "radii", "<f4", ()),
+    ("bacterias", "owners", "<i8", ()),
+)
+
+_created_names: set[str] = set()
+"""Shared memories created by this process"""
+
+
+class _Layout:
+    """
+    Ring header, then `slot_count` slots of a slot header and the columns
+    with capacity rows, every part is aligned to 64 bytes
+    """
+
+    def __init__(self, slot_count: int, organism_capacity: int, bacteria_capacity: int):
+        self.slot_count = slot_count
+        self.capacities = {
+            "organisms": organism_capacity,
+            "bacterias": bacteria_capacity,
+        }
+        self.column_offsets = []
+        offset = _align(_SLOT_HEADER.itemsize)
+        for store, _, dtype, shape in _COLUMNS:
+            self.column_offsets.append(offset)
+            count = self.capacities[store] * int(np.prod(shape, dtype=int))
+            offset = _align(offset + np.dtype(dtype).itemsize * count)
+
+        self.slot_size = offset
+        self.slots_offset = _align(_RING_HEADER.itemsize)
+        self.size = self.slots_offset + slot_count * self.slot_size
+
+    def get_ring_header(self, buffer) -> np.ndarray:
+        return np.ndarray(1, _RING_HEADER, buffer, 0)
+
+    def get_slot_header(self, buffer, slot: int) -> np.ndarray:
+        return np.ndarray(1, _SLOT_HEADER, buffer, self._get_slot_offset(slot))
+
+    def get_columns(self, buffer, slot: int) -> dict[str, dict[str, np.ndarray]]:
+        slot_offset = self._get_slot_offset(slot)
+        columns = {"organisms": {}, "bacterias": {}}
+        for (store, name, dtype, shape), offset in zip(_COLUMNS, self.column_offsets):
+            columns[store][name] = np.ndarray(
+                (self.capacities[store], *shape), dtype, buffer, slot_offset + offset
+            )
+
+        return columns
+
+    def _get_slot_offset(self, slot: int) -> int:
+        return self.slots_offset + slot * self.slot_size
+
+
+class WorldRingPublisher:
+    """
+    Writes the entity arrays of every turn into a `SharedMemory` ring of
+    `slot_count` slots, so local processes can observe the world without
+    loading the game loop. Every slot is guarded by a seqlock: its sequence
+    is odd while it's being written. Entities above the capacities are
+    left out.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        slot_count: int = 4,
+        organism_capacity: int = 65536,
+        bacteria_capacity: int = 4096,
+    ):
+        self._layout = _Layout(max(slot_count, 2), organism_capacity, bacteria_capacity)
+        self._memory = SharedMemory(name, create=True, size=self._layout.size)
+        _created_names.add(self._memory.name)
+
+        self._ring_header = self._layout.get_ring_header(self._memory.buf)
+        self._ring_header[0] = (
+            RING_MAGIC,
+            RING_VERSION,
+            self._layout.slot_count,
+            organism_capacity,
+            bacteria_capacity,
+            -1,
+        )
+        self._slots = [
+            (
+                self._layout.get_slot_header(self._memory.buf, slot),
+                self._layout.get_columns(self._memory.buf, slot),
+            )
+            for slot in range(self._layout.slot_count)
+        ]
+        self._next_slot = 0
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def publish(self, world: World):
+        header, columns = self._slots[self._next_slot]
+        header["sequence"] += 1
+        counts = {}
+
+        for store_name, store in (
+            ("organisms", world.organisms),
+            ("bacterias", world.bacterias),
+        ):
+            store_columns = columns[store_name]
+            count = min(len(store), self._layout.capacities[store_name])
+            if count < len(store):
+                _truncated_entities.inc(len(store) - count, store_name)
+
+            for name, column in store_columns.items():
+                column[:count] = getattr(store, name)[:count]
+
+            counts[store_name] = count
+
+        header["turn"] = world.turn
+        header["organism_count"] = counts["organisms"]
+        header["bacteria_count"] = counts["bacterias"]
+        header["sequence"] += 1
+
+        self._ring_header["latest_slot"] = self._next_slot
+        self._next_slot = (self._next_slot + 1) % self._layout.slot_count
+
+    def close(self):
+        self._ring_header = None
+        self._slots = []
+        self._memory.close()
+        self._memory.unlink()
+        _created_names.discard(self._memory.name)
+
+
+class RingSnapshot:
+    """
+    Views into the ring, valid while the publisher doesn't reuse the slot
+    """
+
+    __slots__ = ("turn", "organisms", "bacterias", "_header", "_sequence")
+
+    def __init__(
+        self,
+        turn: int,
+        organisms: dict[str, np.ndarray],
+        bacterias: dict[str, np.ndarray],
+        header: np.ndarray,
+        sequence: int,
+    ):
+        self.turn = turn
+        self.organisms = organisms
+        self.bacterias = bacterias
+        self._header = header
+        self._sequence = sequence
+
+    def is_valid(self) -> bool:
+        """
+        False if the slot was overwritten since reading, has to be checked
+        after the views were used
+        """
+        return int(self._header["sequence"][0]) == self._sequence
+
+
+class WorldRingReader:
+    def __init__(self, name: str):
+        self._memory = SharedMemory(name)
+        if self._memory.name not in _created_names:
+            # The resource tracker would unlink the publisher's memory when
+            # this process exits
+            resource_tracker.unregister(self._memory._name, "shared_memory")
+
+        ring_header = np.ndarray(1, _RING_HEADER, self._memory.buf, 0)
+        if ring_header["magic"][0] != RING_MAGIC:
+            raise ValueError(f"Not a world ring: {name}")
+
+        if ring_header["version"][0] != RING_VERSION:
+            raise ValueError(f"Unsupported ring version: {ring_header['version'][0]}")
+
+        self._layout = _Layout(
+            int(ring_header["slot_count"][0]),
+            int(ring_header["organism_capacity"][0]),
+            int(ring_header["bacteria_capacity"][0]),
+        )
+        self._ring_header = self._layout.get_ring_header(self._memory.buf)
+        self._slots = [
+            (
+                self._layout.get_slot_header(self._memory.buf, slot),
+                self._layout.get_columns(self._memory.buf, slot),
+            )
+            for slot in range(self._layout.slot_count)
+        ]
+
+    def read_latest(self, retries: int = 16) -> Optional[RingSnapshot]:
+        """
+        Returns views of the newest completely written slot without copying
+        """
+        for _ in range(retries):
+            slot = int(self._ring_header["latest_slot"][0])
+            if slot < 0:
+                return
+
+            header, columns = self._slots[slot]
+            sequence = int(header["sequence"][0])
+            if sequence % 2:
+                continue
+
+            turn = int(header["turn"][0])
+            organism_count = int(header["organism_count"][0])
+            bacteria_count = int(header["bacteria_count"][0])
+
+            if int(header["sequence"][0]) != sequence:
+                continue
+
+            return RingSnapshot(
+                turn,
+                {
+                    name: column[:organism_count]
+                    for name, column in columns["organisms"].items()
+                },
+                {
+                    name: column[:bacteria_count]
+                    for name, column in columns["bacterias"].items()
+                },
+                header,
+                sequence,
+            )
+
+    def close(self):
+        self._ring_header = None
+        self._slots = []
+        self._memory.close()
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+_truncated_entities = metrics.counter(
+    "ring_truncated_entities_total",
+    "Entities left out of the shared memory ring because of its capacity",
+    ("type",),
+)
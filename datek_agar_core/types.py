@@ -1,3 +1,4 @@
+from math import isqrt
 from typing import Optional
 
 import numpy as np
@@ -5,19 +6,50 @@ from datek_agar_core.universe import HALF_PI, Universe
 from pydantic import Field
 from pydantic.main import BaseModel
 
-_ORGANISM_MAX_COUNT = 9999
-_current_id = 0
+_ORGANISM_MAX_COUNT = 2**31 - 1
+
+
+class IdAllocator:
+    def __init__(self, max_count: int = _ORGANISM_MAX_COUNT):
+        self._max_count = max_count
+        self._current_id = 0
+
+    @property
+    def current_id(self) -> int:
+        return self._current_id
+
+    @current_id.setter
+    def current_id(self, value: int):
+        self._current_id = value % self._max_count
+
+    def create(self) -> int:
+        self._current_id += 1
+        self._current_id %= self._max_count
+        return self._current_id
+
+    def create_many(self, count: int) -> np.ndarray:
+        ids = (
+            np.arange(
+                self._current_id + 1, self._current_id + count + 1, dtype=np.int64
+            )
+            % self._max_count
+        )
+        if count:
+            self._current_id = int(ids[-1])
+
+        return ids
+
+
+id_allocator = IdAllocator()
 
 
 def _create_id() -> int:
-    global _current_id
-    _current_id += 1
-    _current_id %= _ORGANISM_MAX_COUNT
-    return _current_id
+    return id_allocator.create()
 
 
 class Position(np.ndarray):
     _converters = {list: np.array, tuple: np.array, bytes: np.frombuffer}
+    _dtype = np.float32
 
     @classmethod
     def __get_validators__(cls):
@@ -30,13 +62,33 @@ class Position(np.ndarray):
             if type_ is np.ndarray:
                 return value
 
-            return cls._converters[type_](value, np.float32)
+            return cls._converters[type_](value, cls._dtype)
         except KeyError:
             raise TypeError(
                 f"Received: {value}: {type_}\nndarray or tuple or list or bytes required"
             )
 
 
+class DensityCounts(Position):
+    """
+    Square matrix of uint8 counts, flattened to bytes on the wire
+    """
+
+    _dtype = np.uint8
+
+    @classmethod
+    def validate(cls, value):
+        counts = super().validate(value)
+        if counts.ndim == 2:
+            return counts
+
+        cells_per_side = isqrt(len(counts))
+        if cells_per_side**2 != len(counts):
+            raise ValueError(f"Square number of counts required: {len(counts)}")
+
+        return counts.reshape(cells_per_side, cells_per_side)
+
+
 class Organism(BaseModel):
     position: Position = Field(default_factory=lambda: np.array([0, 0], np.float32))
     radius: float = Universe.FOOD_ORGANISM_RADIUS
@@ -60,11 +112,31 @@ class Bacteria(Organism):
     )
     max_speed: float = 1.0
     hue: float = 0.1
+    owner_id: Optional[int] = None
+    """Id of the player's first cell, which is the id of the player"""
+
+
+class DensityGrid(BaseModel):
+    """
+    Organism counts around `position` in a square grid of `cell_size` cells,
+    capped at 255. Cell [i, j] spans `position + ([i, j] - cells_per_side / 2)
+    * cell_size` to the next cell, where i is the x index.
+    """
+
+    position: Position
+    cell_size: float
+    counts: DensityCounts
 
 
 class GameStatus(BaseModel):
     bacterias: list[Bacteria] = Field(default_factory=list)
     organisms: list[Organism] = Field(default_factory=list)
+    omitted_organisms: Optional[list[int]] = None
+    """
+    Number of visible organisms left out because of the entity cap,
+    per direction sector counterclockwise from the positive x-axis
+    """
+    density_grid: Optional[DensityGrid] = None
 
     def get_bacteria_by_id(self, id_: int) -> Optional[Bacteria]:
         for bacteria in self.bacterias:
@@ -1,9 +1,12 @@
 from math import pi
+from typing import Union
 
 import numpy as np
 
 
 HALF_PI = pi / 2
+MAX_GRID_CELLS_PER_SIDE = 4096
+"""Upper limit of the resolution of the neighbour search grid"""
 
 
 class Universe:
@@ -19,6 +22,13 @@ class Universe:
     MAX_SPEED = MIN_SPEED * 5
     MINIMAL_RADIUS_MODIFIER_TO_EAT = 1.25
     VIEW_DISTANCE = 20
+    MAX_CELL_COUNT = 16
+    """Maximal number of cells of a player"""
+    MIN_SPLIT_SIZE = BACTERIA_STARTING_SIZE * 2
+    EJECTED_ORGANISM_RADIUS = 0.6
+    EJECTED_ORGANISM_SIZE = EJECTED_ORGANISM_RADIUS**2 * HALF_PI
+    EJECT_DISTANCE = 4
+    """Distance of an ejected organism from the edge of the cell"""
 
     def __init__(
         self,
@@ -46,7 +56,9 @@ class Universe:
     def world_size(self) -> float:
         return self._world_size
 
-    def calculate_organism_max_speed(self, radius: float) -> float:
+    def calculate_organism_max_speed(
+        self, radius: Union[float, np.ndarray]
+    ) -> Union[float, np.ndarray]:
         f"""
         Maximal speed of an organism.
         If an organism eats everything, it's speed becomes {self.MIN_SPEED} um/s.
@@ -59,11 +71,168 @@ class Universe:
             size - self.BACTERIA_STARTING_SIZE
         )
 
+    def calculate_view_distance(
+        self, radius: Union[float, np.ndarray]
+    ) -> Union[float, np.ndarray]:
+        f"""
+        A bacteria of the starting radius sees {self.VIEW_DISTANCE} um far,
+        view distance grows with the square root of the radius.
+        Nobody sees farther than the half of the world.
+        """
+        radius_ratio = np.maximum(radius, self.BACTERIA_STARTING_RADIUS) / (
+            self.BACTERIA_STARTING_RADIUS
+        )
+
+        return np.minimum(
+            self.VIEW_DISTANCE * np.sqrt(radius_ratio), self._half_world_size
+        )
+
     def calculate_position_vector_array(
-        self, o: np.ndarray, p: np.ndarray
+        self, o: np.ndarray, p: np.ndarray, out: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Shortest vectors from `o` to `p` in the wrapped-around world.
+        `o` and `p` are broadcast against each other.
+        """
+        return self.apply_minimal_image(np.subtract(p, o, out=out))
+
+    def apply_minimal_image(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Wraps the coordinate differences into [-world_size / 2, world_size / 2)
+        in place
+        """
+        vectors += self._half_world_size
+        np.mod(vectors, self._world_size, out=vectors)
+        vectors -= self._half_world_size
+
+        return vectors
+
+    def apply_minimal_distance(self, differences: np.ndarray) -> np.ndarray:
+        """
+        Converts coordinate differences of positions inside the world into
+        wrapped-around absolute distances in place.
+        Cheaper than `apply_minimal_image`, but drops the sign.
+        """
+        np.abs(differences, out=differences)
+        differences -= self._half_world_size
+        np.abs(differences, out=differences)
+        np.subtract(self._half_world_size, differences, out=differences)
+
+        return differences
+
+    def calculate_squared_distances(
+        self,
+        origins: np.ndarray,
+        points: np.ndarray,
+        out: np.ndarray = None,
+        work: np.ndarray = None,
     ) -> np.ndarray:
-        vector = p - o
-        vector[vector > self._half_world_size] -= self._world_size
-        vector[vector < -self._half_world_size] += self._world_size
+        """
+        Squared wrapped-around distances of every origin (M, 2) from every
+        point (N, 2) as an (M, N) array. `out` and `work` are optional
+        (M, N) float32 buffers, if both are given nothing is allocated.
+        Compare the result with squared radii instead of taking the root.
+        """
+        shape = (len(origins), len(points))
+        out = np.empty(shape, np.float32) if out is None else out
+        work = np.empty(shape, np.float32) if work is None else work
+
+        np.subtract(points[:, 0], origins[:, 0, None], out=out)
+        np.square(self.apply_minimal_distance(out), out=out)
+        np.subtract(points[:, 1], origins[:, 1, None], out=work)
+        np.square(self.apply_minimal_distance(work), out=work)
+        out += work
+
+        return out
 
-        return vector
+    def calculate_pair_squared_distances(
+        self,
+        origins: np.ndarray,
+        points: np.ndarray,
+        out: np.ndarray = None,
+        work: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Squared wrapped-around distances of the origins (N, 2) from the points
+        (N, 2) of the same index as an (N,) array. `out` and `work` are
+        optional (N,) float32 buffers.
+        """
+        out = np.empty(len(origins), np.float32) if out is None else out
+        work = np.empty(len(origins), np.float32) if work is None else work
+
+        np.subtract(points[:, 0], origins[:, 0], out=out)
+        np.square(self.apply_minimal_distance(out), out=out)
+        np.subtract(points[:, 1], origins[:, 1], out=work)
+        np.square(self.apply_minimal_distance(work), out=work)
+        out += work
+
+        return out
+
+    def find_candidate_pairs(
+        self,
+        origins: np.ndarray,
+        radii: np.ndarray,
+        points: np.ndarray,
+        cell_size: float,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Index pairs (i, j) of the origins and the points which are in a cell of
+        a uniform grid overlapped by the bounding square of the circle of
+        origin i, ordered by i. The world is divided into cells of about
+        `cell_size`. Every point within `radii` is a candidate, compare the
+        distances of the pairs to find them.
+        """
+        cells_per_side = int(
+            np.clip(self._world_size // cell_size, 1, MAX_GRID_CELLS_PER_SIDE)
+        )
+        inverse_cell_size = cells_per_side / self._world_size
+
+        point_cells = (points * inverse_cell_size).astype(np.int64)
+        np.clip(point_cells, 0, cells_per_side - 1, out=point_cells)
+        keys = point_cells[:, 0] * cells_per_side + point_cells[:, 1]
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+
+        lows = np.floor((origins - radii[:, None]) * inverse_cell_size)
+        highs = np.floor((origins + radii[:, None]) * inverse_cell_size)
+        spans = np.minimum(highs - lows + 1, cells_per_side).astype(np.int64)
+        lows = lows.astype(np.int64)
+
+        cell_counts = spans[:, 0] * spans[:, 1]
+        query_origins = np.repeat(np.arange(len(origins)), cell_counts)
+        offsets = _get_offsets_in_runs(cell_counts)
+        y_spans = spans[query_origins, 1]
+        x = (lows[query_origins, 0] + offsets // y_spans) % cells_per_side
+        y = (lows[query_origins, 1] + offsets % y_spans) % cells_per_side
+        query_keys = x * cells_per_side + y
+
+        starts = np.searchsorted(sorted_keys, query_keys, "left")
+        counts = np.searchsorted(sorted_keys, query_keys, "right") - starts
+
+        left = np.repeat(query_origins, counts)
+        right = order[np.repeat(starts, counts) + _get_offsets_in_runs(counts)]
+
+        return left, right
+
+
+class ScratchBuffer:
+    """
+    Reusable array which grows on demand, for the `out` parameters
+    """
+
+    def __init__(self, dtype=np.float32):
+        self._array = np.empty(0, dtype)
+
+    def get(self, shape: tuple[int, ...]) -> np.ndarray:
+        size = int(np.prod(shape))
+        if size > self._array.size:
+            self._array = np.empty(max(size, self._array.size * 2), self._array.dtype)
+
+        return self._array[:size].reshape(shape)
+
+
+def _get_offsets_in_runs(lengths: np.ndarray) -> np.ndarray:
+    """
+    0, 1, ..., length - 1 for every length, concatenated
+    """
+    return np.arange(np.sum(lengths)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
@@ -1,16 +1,82 @@
 from abc import ABC, abstractmethod
-from asyncio import Task, create_task, Future
+from asyncio import Task, TimerHandle, create_task, Future, get_running_loop
 from functools import wraps
-from logging import Formatter, Logger
-from typing import Optional, Callable
+from logging import ERROR, Formatter, Handler, Logger, LogRecord
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from time import monotonic
+from typing import Hashable, Optional, Callable
 
-from datek_app_utils.log import create_logger as _create_logger, LogFormatter
+from datek_app_utils.log import (
+    create_logger as _create_logger,
+    LogFormatter,
+    LogHandler,
+)
+
+LOG_BURST = 10
+"""Messages of the same kind logged in every `LOG_INTERVAL_SECONDS`"""
+
+LOG_INTERVAL_SECONDS = 10
 
 _formatter = Formatter("%(asctime)s [%(name)s] %(levelname)-8s %(message)s")
 
 LogFormatter.set(_formatter)
 
 
+class LogQueueHandler(QueueHandler):
+    """
+    While the listener runs, the records are put in a queue and `target`
+    formats and writes them on the listener's thread, so the event loop
+    doesn't wait for the I/O. Otherwise `target` handles them in place.
+    """
+
+    def __init__(self, target: Handler):
+        super().__init__(SimpleQueue())
+        self._target = target
+        self._listener: Optional[QueueListener] = None
+
+    def start(self):
+        if self._listener is None:
+            self._listener = QueueListener(
+                self.queue, self._target, respect_handler_level=True
+            )
+            self._listener.start()
+
+    def stop(self):
+        """
+        Writes the queued records and stops the listener
+        """
+        if listener := self._listener:
+            self._listener = None
+            listener.stop()
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        # formatting is left for the listener's thread
+        return record
+
+    def emit(self, record: LogRecord):
+        if self._listener is None:
+            self._target.handle(record)
+        else:
+            super().emit(record)
+
+
+_log_queue_handler = LogQueueHandler(LogHandler.get())
+
+LogHandler.set(_log_queue_handler)
+
+
+def start_log_listener():
+    """
+    Moves the formatting and writing of the logs to a background thread
+    """
+    _log_queue_handler.start()
+
+
+def stop_log_listener():
+    _log_queue_handler.stop()
+
+
 class AsyncWorker(ABC):
     _task: Task
     _started: Future
@@ -39,6 +105,84 @@ def create_logger(name: str) -> Logger:
     return _create_logger(name)
 
 
+class _LogWindow:
+    __slots__ = ("started_at", "count", "last_message", "report_handle")
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.count = 0
+        self.last_message = ""
+        self.report_handle: Optional[TimerHandle] = None
+
+
+class LogRateLimiter:
+    """
+    Logs the first `burst` messages of every key in each `interval_seconds`,
+    the rest are counted and reported in one line when the interval ends
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        *,
+        level: int = ERROR,
+        burst: int = LOG_BURST,
+        interval_seconds: float = LOG_INTERVAL_SECONDS,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self._logger = logger
+        self._level = level
+        self._burst = burst
+        self._interval_seconds = interval_seconds
+        self._clock = clock
+        self._windows: dict[Hashable, _LogWindow] = {}
+
+    def log(self, key: Hashable, message: str, exc_info=None):
+        now = self._clock()
+        window = self._windows.get(key)
+        if window is None or now - window.started_at >= self._interval_seconds:
+            if window is not None:
+                self._report(key)
+
+            window = self._windows[key] = _LogWindow(now)
+
+        window.count += 1
+        if window.count <= self._burst:
+            self._logger.log(self._level, message, exc_info=exc_info)
+            return
+
+        window.last_message = message
+        if window.report_handle is None:
+            window.report_handle = self._schedule_report(
+                key, window.started_at + self._interval_seconds - now
+            )
+
+    def _schedule_report(self, key: Hashable, delay: float) -> Optional[TimerHandle]:
+        try:
+            loop = get_running_loop()
+        except RuntimeError:
+            # reported by the next message of the key
+            return
+
+        return loop.call_later(delay, self._report, key)
+
+    def _report(self, key: Hashable):
+        window = self._windows.pop(key, None)
+        if window is None:
+            return
+
+        if window.report_handle:
+            window.report_handle.cancel()
+
+        suppressed = window.count - self._burst
+        if suppressed > 0:
+            self._logger.log(
+                self._level,
+                f"{suppressed} similar messages suppressed in "
+                f"{self._interval_seconds}s, last: {window.last_message}",
+            )
+
+
 def run_forever(func: Callable):
     @wraps(func)
     async def wrapper(*args, **kwargs):
@@ -49,15 +193,25 @@ def run_forever(func: Callable):
 
 
 def async_log_error(class_name: str):
+    """
+    Logs the exceptions of the decorated coroutine, at most `LOG_BURST` of
+    every exception class in `LOG_INTERVAL_SECONDS` with traceback
+    """
+
     def decorator(func: Callable):
         logger = create_logger(".".join([class_name, func.__name__]))
+        rate_limiter = LogRateLimiter(logger)
 
         @wraps(func)
         async def wrapper(*args, **kwargs):
             try:
                 return await func(*args, **kwargs)
             except Exception as exception:
-                logger.error(f"{exception.__class__}: {exception}", exc_info=True)
+                rate_limiter.log(
+                    exception.__class__,
+                    f"{exception.__class__}: {exception}",
+                    exc_info=exception,
+                )
 
         return wrapper
 
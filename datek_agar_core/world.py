@@ -0,0 +1,347 @@
+from typing import Optional, Iterable, Union
+
+import numpy as np
+from datek_agar_core.types import (
+    Bacteria,
+    Organism,
+    id_allocator,
+)
+from datek_agar_core.universe import HALF_PI, Universe
+
+
+class OrganismStore:
+    """
+    Food organisms stored as parallel arrays instead of one model per organism.
+    Rows are compacted on removal, so the row of an organism can change,
+    its id doesn't. The id -> row index is built on the first lookup.
+    """
+
+    __slots__ = ("_ids", "_positions", "_radii", "_length", "_rows")
+
+    _COLUMNS = ("_ids", "_positions", "_radii")
+
+    def __init__(self, capacity: int = 256):
+        self._ids = np.empty(capacity, np.int64)
+        self._positions = np.empty((capacity, 2), np.float32)
+        self._radii = np.empty(capacity, np.float32)
+        self._length = 0
+        self._rows: Optional[dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[: self._length]
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions[: self._length]
+
+    @property
+    def radii(self) -> np.ndarray:
+        return self._radii[: self._length]
+
+    @property
+    def total_size(self) -> float:
+        return float(np.sum(self.radii.astype(np.float64) ** 2)) * HALF_PI
+
+    def add(
+        self,
+        positions: np.ndarray,
+        radii: Union[float, np.ndarray] = Universe.FOOD_ORGANISM_RADIUS,
+        ids: np.ndarray = None,
+    ) -> np.ndarray:
+        return self._append(ids, _positions=positions, _radii=radii)
+
+    def _append(self, ids: Optional[np.ndarray], **columns) -> np.ndarray:
+        count = len(columns["_positions"])
+        if ids is None:
+            ids = id_allocator.create_many(count)
+
+        self._reserve(self._length + count)
+        rows = slice(self._length, self._length + count)
+        self._ids[rows] = ids
+        for name, values in columns.items():
+            getattr(self, name)[rows] = values
+
+        if self._rows is not None:
+            self._rows.update(
+                zip(ids.tolist(), range(self._length, self._length + count))
+            )
+
+        self._length += count
+
+        return ids
+
+    def remove_rows(self, rows: np.ndarray):
+        """
+        Removes the given rows by moving the last rows into their places
+        """
+        if not len(rows):
+            return
+
+        rows = np.unique(rows)
+        new_length = self._length - len(rows)
+
+        if self._rows is not None:
+            for id_ in self._ids[rows].tolist():
+                del self._rows[id_]
+
+        holes = rows[rows < new_length]
+        tail = np.arange(new_length, self._length)
+        movers = tail[np.isin(tail, rows, assume_unique=True, invert=True)]
+
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            column[holes] = column[movers]
+
+        if self._rows is not None:
+            self._rows.update(zip(self._ids[holes].tolist(), holes.tolist()))
+
+        self._length = new_length
+
+    def row_of(self, id_: int) -> Optional[int]:
+        if self._rows is None:
+            self._rows = dict(zip(self.ids.tolist(), range(self._length)))
+
+        return self._rows.get(id_)
+
+    def to_organisms(self, rows: Iterable[int] = None) -> list[Organism]:
+        """
+        Creates the API models of the given rows without validation
+        """
+        rows = range(self._length) if rows is None else rows
+        return [
+            Organism.construct(
+                id=int(self._ids[row]),
+                position=self._positions[row].copy(),
+                radius=float(self._radii[row]),
+            )
+            for row in rows
+        ]
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, np.ndarray]):
+        """
+        Creates a store from copies of the `columns()` of another store
+        """
+        length = len(columns["ids"])
+        store = cls(max(length, 1))
+        for name in cls._COLUMNS:
+            getattr(store, name)[:length] = columns[name[1:]]
+
+        store._length = length
+        return store
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """
+        Used rows of every column by name
+        """
+        return {name[1:]: getattr(self, name)[: self._length] for name in self._COLUMNS}
+
+    def copy(self) -> "OrganismStore":
+        store = type(self)(self._length)
+        for name in self._COLUMNS:
+            getattr(store, name)[:] = getattr(self, name)[: self._length]
+
+        store._length = self._length
+        return store
+
+    def _reserve(self, capacity: int):
+        if capacity <= len(self._ids):
+            return
+
+        capacity = max(capacity, len(self._ids) * 2)
+        for name in self._COLUMNS:
+            setattr(self, name, _resize(getattr(self, name), capacity))
+
+
+class BacteriaStore(OrganismStore):
+    """
+    Bacterias stored as parallel arrays, so the physics of all bacterias
+    is updated with array operations.
+    A player owns one or more bacterias (cells), the owner of the first cell
+    is its own id. The owner -> rows index is built on the first lookup
+    after a change.
+    """
+
+    __slots__ = (
+        "_speeds",
+        "_max_speeds",
+        "_names",
+        "_hues",
+        "_owners",
+        "_merge_countdowns",
+        "_owner_rows",
+    )
+
+    _COLUMNS = OrganismStore._COLUMNS + (
+        "_speeds",
+        "_max_speeds",
+        "_names",
+        "_hues",
+        "_owners",
+        "_merge_countdowns",
+    )
+
+    def __init__(self, capacity: int = 16):
+        super().__init__(capacity)
+        self._speeds = np.empty((capacity, 2), np.float32)
+        self._max_speeds = np.empty(capacity, np.float32)
+        self._names = np.empty(capacity, object)
+        self._hues = np.empty(capacity, np.float32)
+        self._owners = np.empty(capacity, np.int64)
+        self._merge_countdowns = np.empty(capacity, np.int32)
+        self._owner_rows: Optional[dict[int, np.ndarray]] = None
+
+    @classmethod
+    def from_bacterias(cls, bacterias: Iterable[Bacteria]) -> "BacteriaStore":
+        bacterias = list(bacterias)
+        store = cls(max(len(bacterias), 1))
+        if bacterias:
+            store.add(
+                np.array([item.position for item in bacterias]),
+                np.array([item.radius for item in bacterias]),
+                speeds=np.array([item.current_speed for item in bacterias]),
+                max_speeds=np.array([item.max_speed for item in bacterias]),
+                names=[item.name for item in bacterias],
+                hues=np.array([item.hue for item in bacterias]),
+                owners=np.array(
+                    [item.owner_id or item.id for item in bacterias], np.int64
+                ),
+                ids=np.array([item.id for item in bacterias], np.int64),
+            )
+
+        return store
+
+    @property
+    def speeds(self) -> np.ndarray:
+        return self._speeds[: self._length]
+
+    @property
+    def max_speeds(self) -> np.ndarray:
+        return self._max_speeds[: self._length]
+
+    @property
+    def names(self) -> np.ndarray:
+        return self._names[: self._length]
+
+    @property
+    def hues(self) -> np.ndarray:
+        return self._hues[: self._length]
+
+    @property
+    def owners(self) -> np.ndarray:
+        return self._owners[: self._length]
+
+    @property
+    def merge_countdowns(self) -> np.ndarray:
+        """Turns until the cell can merge with the other cells of its owner"""
+        return self._merge_countdowns[: self._length]
+
+    def rows_of_owner(self, owner_id: int) -> np.ndarray:
+        if self._owner_rows is None:
+            order = np.argsort(self.owners, kind="stable")
+            owners, starts = np.unique(self.owners[order], return_index=True)
+            self._owner_rows = dict(zip(owners.tolist(), np.split(order, starts[1:])))
+
+        rows = self._owner_rows.get(owner_id)
+        return rows if rows is not None else np.empty(0, np.int64)
+
+    def remove_rows(self, rows: np.ndarray):
+        if len(rows):
+            self._owner_rows = None
+
+        super().remove_rows(rows)
+
+    def _append(self, ids: Optional[np.ndarray], **columns) -> np.ndarray:
+        self._owner_rows = None
+        return super()._append(ids, **columns)
+
+    def add(
+        self,
+        positions: np.ndarray,
+        radii: Union[float, np.ndarray] = Universe.BACTERIA_STARTING_RADIUS,
+        *,
+        speeds: Union[float, np.ndarray] = 0,
+        max_speeds: Union[float, np.ndarray] = 1,
+        names: Union[str, list[str]] = "",
+        hues: Union[float, np.ndarray] = 0.1,
+        owners: np.ndarray = None,
+        merge_countdowns: Union[int, np.ndarray] = 0,
+        ids: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Cells without `owners` are owned by themselves
+        """
+        if ids is None:
+            ids = id_allocator.create_many(len(positions))
+
+        return self._append(
+            ids,
+            _owners=ids if owners is None else owners,
+            _merge_countdowns=merge_countdowns,
+            _positions=positions,
+            _radii=radii,
+            _speeds=speeds,
+            _max_speeds=max_speeds,
+            _names=names,
+            _hues=hues,
+        )
+
+    def to_bacterias(self, rows: Iterable[int] = None) -> list[Bacteria]:
+        """
+        Creates the API models of the given rows without validation
+        """
+        rows = range(self._length) if rows is None else rows
+        return [
+            Bacteria.construct(
+                id=int(self._ids[row]),
+                position=self._positions[row].copy(),
+                radius=float(self._radii[row]),
+                name=self._names[row],
+                current_speed=self._speeds[row].copy(),
+                max_speed=float(self._max_speeds[row]),
+                hue=float(self._hues[row]),
+                owner_id=int(self._owners[row]),
+            )
+            for row in rows
+        ]
+
+
+class World:
+    """
+    State of the universe, simulation works on it.
+    `GameStatus` is created only at the API boundary.
+    `turn` is the number of calculated turns, it orders the game statuses.
+    """
+
+    __slots__ = ("organisms", "bacterias", "turn")
+
+    def __init__(
+        self,
+        organisms: OrganismStore = None,
+        bacterias: BacteriaStore = None,
+        turn: int = 0,
+    ):
+        self.organisms = organisms if organisms is not None else OrganismStore()
+        self.bacterias = bacterias if bacterias is not None else BacteriaStore()
+        self.turn = turn
+
+    def get_bacteria_by_id(self, id_: int) -> Optional[Bacteria]:
+        row = self.bacterias.row_of(id_)
+        return self.bacterias.to_bacterias([row])[0] if row is not None else None
+
+    def get_organism_by_id(self, id_: int) -> Optional[Organism]:
+        row = self.organisms.row_of(id_)
+        return self.organisms.to_organisms([row])[0] if row is not None else None
+
+    def copy(self) -> "World":
+        return World(self.organisms.copy(), self.bacterias.copy(), self.turn)
+
+
+def _resize(array: np.ndarray, capacity: int) -> np.ndarray:
+    resized = np.empty((capacity, *array.shape[1:]), array.dtype)
+    resized[: len(array)] = array
+    return resized
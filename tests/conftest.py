@@ -3,21 +3,28 @@ from asyncio import DatagramTransport, get_running_loop, DatagramProtocol
 from datek_agar_core.game import REFRESH_INTERVAL
 from datek_agar_core.network.protocol import AddressTuple
 from datek_agar_core.network.message import Message, MessageType
+from datek_agar_core.network.proxy import UDPProxy, LinkConfig
 from datek_agar_core.network.server import UDPServer
 from pytest import fixture
 
 HOST = "127.0.0.1"
 PORT = 9999
+PROXY_PORT = 9996
 
 
 @fixture
-async def test_server() -> UDPServer:
+async def test_server(request) -> UDPServer:
+    """
+    Parametrize it indirectly with the number of encode workers to test the
+    encoder pool, game statuses are encoded on the loop by default
+    """
     server = UDPServer(
         host=HOST,
         port=PORT,
         client_expiration_seconds=REFRESH_INTERVAL * 2,
         world_size=100,
         total_nutrient=90,
+        encode_workers=getattr(request, "param", 0),
     )
 
     server.start()
@@ -50,6 +57,39 @@ async def connected_client(
     yield test_client
 
 
+@fixture
+async def create_proxy(test_server):
+    """
+    Creates a lossy link proxy listening on `PROXY_PORT` in front of the test server
+    """
+    proxies = []
+
+    async def create(
+        upstream: LinkConfig = LinkConfig(),
+        downstream: LinkConfig = None,
+        seed: int = 0,
+    ) -> UDPProxy:
+        proxy = UDPProxy(
+            host=HOST,
+            port=PROXY_PORT,
+            target_host=HOST,
+            target_port=PORT,
+            upstream=upstream,
+            downstream=downstream,
+            seed=seed,
+        )
+        proxy.start()
+        await proxy.wait_started()
+        proxies.append(proxy)
+        return proxy
+
+    yield create
+
+    for proxy in proxies:
+        proxy.stop()
+        await proxy.task
+
+
 @fixture
 def connect_message() -> Message:
     return Message(type=MessageType.CONNECT, name="John")
@@ -1,11 +1,12 @@
-from asyncio import sleep
-from unittest.mock import patch
+from asyncio import Event, sleep
+from unittest.mock import MagicMock, patch
 
 from datek_agar_core.game import REFRESH_INTERVAL
+from datek_agar_core.metrics import metrics
 from pytest import mark
 
 from datek_agar_core.network.client import UDPClient, TransportProxy
-from datek_agar_core.network.message import Message
+from datek_agar_core.network.message import Message, MessageType
 from datek_agar_core.network.server import AddressRegistry
 from ..conftest import HOST, PORT
 from ..utils import AsyncFunction, Function
@@ -63,6 +64,71 @@ class TestUDPClient:
         client.stop()
         await client.task
 
+    @mark.asyncio
+    async def test_spectate(self, test_server):
+        received = []
+
+        async def handle(message: Message):
+            received.append(message.type)
+
+        client = UDPClient(
+            player_name="",
+            host=HOST,
+            port=PORT,
+            handle_message=handle,
+            ping_interval_sec=0.5,
+            spectate=True,
+            spectate_position=(10, 10),
+        )
+        client.start()
+        await client.wait_started()
+        await sleep(REFRESH_INTERVAL)
+
+        assert received == [MessageType.SPECTATE]
+        assert not client.player_id
+
+        client.stop()
+        await client.task
+
+    @mark.asyncio
+    async def test_drop_stale_and_coalesce_game_statuses(self):
+        handled = []
+        release = Event()
+
+        async def handle_slowly(message: Message):
+            handled.append(message.sequence)
+            await release.wait()
+
+        client = UDPClient(
+            player_name="Jenny",
+            host=HOST,
+            port=PORT,
+            handle_message=handle_slowly,
+            ping_interval_sec=0.5,
+        )
+
+        for sequence in (1, 3, 2, 4, 5):
+            client._receive_game_status(
+                Message(type=MessageType.GAME_STATUS_UPDATE, sequence=sequence)
+            )
+            await sleep(0)
+
+        release.set()
+        await sleep(0.01)
+
+        assert handled == [1, 5]
+        assert client.dropped_frames == 1
+        assert client.coalesced_frames == 2
+
+    def test_sent_datagrams_are_not_counted_as_server_traffic(self):
+        transport = TransportProxy(MagicMock())
+        packets_sent = metrics.get("packets_sent_total")
+        count = packets_sent.get()
+
+        transport.sendto(b"data", (HOST, PORT))
+
+        assert packets_sent.get() == count
+
 
 async def handle_message(message: Message):
     pass
@@ -0,0 +1,34 @@
+from asyncio import create_task, gather, sleep
+
+from datek_agar_core.network.encoder import MessageEncoder
+from datek_agar_core.network.message import Message, MessageType
+from pytest import mark
+
+
+class TestMessageEncoder:
+    @mark.asyncio
+    @mark.parametrize("workers", [0, 2])
+    async def test_submit_packs_message(self, workers):
+        encoder = MessageEncoder(workers)
+        message = Message(type=MessageType.CONNECT, name="John")
+
+        data = await (await encoder.submit(message))
+
+        assert Message.unpack(data) == message
+        assert encoder.in_flight == 0
+        encoder.stop()
+
+    @mark.asyncio
+    async def test_submit_waits_for_free_slot(self):
+        encoder = MessageEncoder(workers=1, max_in_flight=2)
+        message = Message(type=MessageType.PING)
+
+        encodings = [await encoder.submit(message) for _ in range(2)]
+        blocked = create_task(encoder.submit(message))
+        await sleep(0)
+        assert not blocked.done()
+        assert encoder.in_flight == 2
+
+        encodings.append(await blocked)
+        assert len(set(await gather(*encodings))) == 1
+        encoder.stop()
@@ -0,0 +1,185 @@
+from asyncio import Queue, get_running_loop, sleep
+
+import numpy as np
+from datek_agar_core.metrics import metrics
+from datek_agar_core.network.ingress import (
+    INPUT_RECORD,
+    IngressProtocol,
+    IngressWorkers,
+    create_ingress_socket,
+    pack_input_record,
+    pack_rate_limit_record,
+    unpack_input_record,
+)
+from datek_agar_core.network.message import Message, MessageType
+from datek_agar_core.network.server import UDPServer
+from pytest import mark, raises
+
+from ..conftest import HOST, PORT, ClientProtocol
+
+TOKEN = "0123456789abcdef0123456789abcdef"
+
+
+def test_change_speed_record():
+    message = Message(
+        type=MessageType.CHANGE_SPEED,
+        bacteria_id=12,
+        speed_polar_coordinates=(0.5, 1.5),
+    )
+
+    record = pack_input_record(message, message.pack(), ("127.0.0.1", 9000))
+    unpacked, address = unpack_input_record(record)
+
+    assert len(record) == INPUT_RECORD.size
+    assert address == ("127.0.0.1", 9000)
+    assert unpacked.type == MessageType.CHANGE_SPEED
+    assert unpacked.bacteria_id == 12
+    assert np.array_equal(unpacked.speed_polar_coordinates, [0.5, 1.5])
+    assert unpacked.session_token is None
+
+
+def test_ping_record_with_ipv6_address():
+    message = Message(type=MessageType.PING, session_token=TOKEN)
+
+    unpacked, address = unpack_input_record(
+        pack_input_record(message, message.pack(), ("::1", 9000, 0, 0))
+    )
+
+    assert address == ("::1", 9000)
+    assert unpacked.bacteria_id is None
+    assert unpacked.session_token == TOKEN
+
+
+def test_connect_is_forwarded_raw():
+    data = Message(type=MessageType.CONNECT, name="John").pack()
+
+    unpacked, _ = unpack_input_record(
+        pack_input_record(Message.unpack(data), data, ("127.0.0.1", 9000))
+    )
+
+    assert unpacked == data
+
+
+def test_invalid_session_token():
+    message = Message(type=MessageType.PING, session_token="abcd")
+
+    with raises(ValueError):
+        pack_input_record(message, message.pack(), ("127.0.0.1", 9000))
+
+
+@mark.asyncio
+async def test_rate_limit_record_is_added_to_metrics():
+    queue = Queue()
+    protocol = IngressProtocol(queue, get_running_loop())
+    dropped = metrics.get("rate_limited_datagrams_total")
+    rate_limited_before = dropped.get("rate")
+    blocked_before = dropped.get("blocked")
+    blocked_addresses_before = metrics.get("blocked_addresses_total").get()
+
+    protocol.datagram_received(pack_rate_limit_record(5, 3, 1), "")
+
+    assert dropped.get("rate") == rate_limited_before + 5
+    assert dropped.get("blocked") == blocked_before + 3
+    assert metrics.get("blocked_addresses_total").get() == blocked_addresses_before + 1
+    assert queue.empty()
+
+
+def test_ingress_socket_is_private(tmp_path):
+    socket_path = tmp_path / "ingress.sock"
+
+    with create_ingress_socket(socket_path):
+        assert socket_path.stat().st_mode & 0o777 == 0o600
+
+
+@mark.asyncio
+async def test_workers_report_rate_limited_datagrams(tmp_path):
+    socket_path = tmp_path / "ingress.sock"
+    server = UDPServer(
+        host=HOST,
+        port=PORT,
+        world_size=100,
+        total_nutrient=90,
+        reuse_port=True,
+        ingress_socket_path=socket_path,
+    )
+    server.start()
+    await server.wait_started()
+    ingress = IngressWorkers(
+        host=HOST,
+        port=PORT,
+        socket_path=socket_path,
+        workers=1,
+        input_rate=1,
+        input_burst=1,
+        rate_limit_report_seconds=0.05,
+    )
+    ingress.start()
+    await ingress.wait_started()
+    dropped = metrics.get("rate_limited_datagrams_total")
+    rate_limited_before = dropped.get("rate")
+
+    # the kernel may pass some datagrams to the server's own socket
+    transports = []
+    for _ in range(8):
+        transport, _ = await get_running_loop().create_datagram_endpoint(
+            lambda: ClientProtocol([]), remote_addr=(HOST, PORT)
+        )
+        for _ in range(10):
+            transport.sendto(Message(type=MessageType.PING).pack())
+        transports.append(transport)
+
+    for _ in range(40):
+        await sleep(0.05)
+        if dropped.get("rate") > rate_limited_before:
+            break
+
+    ingress.stop()
+    await ingress.task
+    server.stop()
+    await server.task
+    for transport in transports:
+        transport.close()
+
+    assert dropped.get("rate") > rate_limited_before
+
+
+@mark.asyncio
+async def test_workers_forward_to_server(tmp_path):
+    socket_path = tmp_path / "ingress.sock"
+    server = UDPServer(
+        host=HOST,
+        port=PORT,
+        world_size=100,
+        total_nutrient=90,
+        reuse_port=True,
+        ingress_socket_path=socket_path,
+    )
+    server.start()
+    await server.wait_started()
+    ingress = IngressWorkers(host=HOST, port=PORT, socket_path=socket_path, workers=1)
+    ingress.start()
+    await ingress.wait_started()
+    records_before = metrics.get("ingress_records_total").get()
+
+    clients = []
+    for _ in range(16):
+        messages = []
+        transport, _ = await get_running_loop().create_datagram_endpoint(
+            lambda: ClientProtocol(messages), remote_addr=(HOST, PORT)
+        )
+        transport.sendto(Message(type=MessageType.CONNECT, name="John").pack())
+        clients.append((transport, messages))
+
+    await sleep(0.2)
+
+    ingress.stop()
+    await ingress.task
+    server.stop()
+    await server.task
+
+    for transport, messages in clients:
+        transport.close()
+        assert Message.unpack(messages[0]).type == MessageType.CONNECT
+
+    assert metrics.get("ingress_records_total").get() > records_before
+    assert not socket_path.exists()
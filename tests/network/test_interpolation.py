@@ -0,0 +1,83 @@
+from math import pi
+
+import numpy as np
+from datek_agar_core.game import REFRESH_INTERVAL
+from datek_agar_core.network.interpolation import SnapshotBuffer
+from datek_agar_core.network.message import Message, MessageType
+from datek_agar_core.types import Bacteria, GameStatus
+
+from ..utils import Clock
+
+
+class TestSnapshotBuffer:
+    def test_sample_interpolates_other_bacterias(self):
+        clock = Clock()
+        buffer = create_buffer(clock, delay_seconds=REFRESH_INTERVAL * 2)
+
+        for sequence, x in ((1, 98), (3, 2), (5, 6)):
+            clock.now = sequence * REFRESH_INTERVAL
+            buffer.add(create_update(sequence, other_x=x))
+
+        clock.now = 4 * REFRESH_INTERVAL
+        other = buffer.sample().get_bacteria_by_id(OTHER_ID)
+
+        # halfway between 98 and 2 across the edge of the world
+        assert abs((other.position[0] + 50) % 100 - 50) < 1e-4
+        assert np.isclose(other.position[1], 50)
+
+    def test_sample_predicts_player_cells_from_inputs(self):
+        clock = Clock()
+        buffer = create_buffer(clock)
+        clock.now = REFRESH_INTERVAL
+        buffer.add(create_update(1, other_x=10))
+
+        clock.now += 0.5
+        buffer.record_input((1, pi))
+        clock.now += 0.5
+        player = buffer.sample().get_bacteria_by_id(PLAYER_ID)
+
+        assert np.allclose(player.position, (50 + 0.5 * 2 - 0.5 * 4, 50), atol=1e-4)
+
+    def test_add_ignores_stale_updates(self):
+        buffer = create_buffer(Clock())
+
+        assert buffer.add(create_update(2, other_x=10))
+        assert not buffer.add(create_update(1, other_x=10))
+        assert len(buffer) == 1
+
+
+def create_buffer(clock: Clock, **kwargs) -> SnapshotBuffer:
+    buffer = SnapshotBuffer(clock=clock, **kwargs)
+    buffer.add(
+        Message(
+            type=MessageType.CONNECT,
+            name="John",
+            bacteria_id=PLAYER_ID,
+            world_size=100,
+            total_nutrient=10,
+        )
+    )
+    return buffer
+
+
+def create_update(sequence: int, other_x: float) -> Message:
+    return Message(
+        type=MessageType.GAME_STATUS_UPDATE,
+        sequence=sequence,
+        game_status=GameStatus(
+            bacterias=[
+                Bacteria(
+                    id=PLAYER_ID,
+                    owner_id=PLAYER_ID,
+                    position=[50, 50],
+                    current_speed=[2, 0],
+                    max_speed=4,
+                ),
+                Bacteria(id=OTHER_ID, owner_id=OTHER_ID, position=[other_x, 50]),
+            ]
+        ),
+    )
+
+
+PLAYER_ID = 1
+OTHER_ID = 2
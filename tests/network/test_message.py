@@ -1,6 +1,8 @@
+import numpy as np
 from lzma import decompress, compress
 
 from datek_agar_core.network.message import Message, MessageType, cast
+from datek_agar_core.types import DensityGrid, GameStatus
 from msgpack import packb, unpackb
 from pydantic import ValidationError
 from pytest import raises, mark
@@ -38,3 +40,43 @@ class TestMessage:
 
         assert unpacked_message.type == message.type
         assert unpacked_message.name == message.name
+
+    def test_game_status_round_trip(self):
+        message = Message(
+            type=MessageType.GAME_STATUS_UPDATE,
+            game_status=GameStatus.construct(
+                bacterias=[], organisms=[], omitted_organisms=[0, 2, 0, 1]
+            ),
+        )
+
+        unpacked = Message.unpack(message.pack())
+
+        assert unpacked.game_status.omitted_organisms == [0, 2, 0, 1]
+        assert (
+            Message.unpack(
+                Message(
+                    type=MessageType.GAME_STATUS_UPDATE, game_status=GameStatus()
+                ).pack()
+            ).game_status.omitted_organisms
+            is None
+        )
+
+    def test_density_grid_is_decoded_to_array(self):
+        message = Message(
+            type=MessageType.GAME_STATUS_UPDATE,
+            game_status=GameStatus.construct(
+                bacterias=[],
+                organisms=[],
+                density_grid=DensityGrid.construct(
+                    position=np.array([1, 2], np.float32),
+                    cell_size=10,
+                    counts=np.arange(9, dtype=np.uint8).reshape(3, 3),
+                ),
+            ),
+        )
+
+        density_grid = Message.unpack(message.pack()).game_status.density_grid
+
+        assert density_grid.counts.dtype == np.uint8
+        assert np.array_equal(density_grid.counts, np.arange(9).reshape(3, 3))
+        assert np.array_equal(density_grid.position, [1, 2])
@@ -0,0 +1,118 @@
+from asyncio import get_running_loop, sleep
+from random import Random
+
+from datek_agar_core.game import REFRESH_INTERVAL
+from datek_agar_core.network.client import UDPClient
+from datek_agar_core.network.message import Message, MessageType
+from datek_agar_core.network.proxy import Link, LinkConfig
+from pytest import mark
+
+from ..conftest import HOST, PROXY_PORT, ClientProtocol
+
+
+class TestUDPProxy:
+    @mark.asyncio
+    async def test_relays_traffic(self, create_proxy, connect_message):
+        proxy = await create_proxy()
+        transport, messages = await _create_client()
+
+        transport.sendto(connect_message.pack())
+        await sleep(REFRESH_INTERVAL * 2)
+        transport.close()
+
+        assert Message.unpack(messages[0]).type == MessageType.CONNECT
+        assert proxy.upstream.sent_count == 1
+        assert proxy.downstream.sent_count >= len(messages)
+
+    @mark.asyncio
+    async def test_drops_lost_datagrams(self, create_proxy, connect_message):
+        proxy = await create_proxy(upstream=LinkConfig(loss=1))
+        transport, messages = await _create_client()
+
+        transport.sendto(connect_message.pack())
+        await sleep(REFRESH_INTERVAL)
+        transport.close()
+
+        assert not messages
+        assert proxy.upstream.dropped_count == 1
+
+    @mark.asyncio
+    async def test_client_connects_through_latency(self, create_proxy):
+        await create_proxy(
+            upstream=LinkConfig(latency_seconds=0.01, jitter_seconds=0.005)
+        )
+        client = UDPClient(
+            host=HOST,
+            port=PROXY_PORT,
+            handle_message=_handle_message,
+            player_name="Jenny",
+            ping_interval_sec=0.5,
+        )
+
+        client.start()
+        await client.wait_started()
+        await sleep(REFRESH_INTERVAL * 2)
+
+        assert client.player_id
+        client.stop()
+        await client.task
+
+
+class TestLink:
+    @mark.asyncio
+    async def test_seeded_impairments_are_reproducible(self):
+        config = LinkConfig(loss=0.3, jitter_seconds=0.005, reorder=0.3)
+
+        assert await _send_through_link(config, 0) == await _send_through_link(
+            config, 0
+        )
+
+    @mark.asyncio
+    async def test_reorders_datagrams(self):
+        config = LinkConfig(reorder=0.5, reorder_delay_seconds=0.01)
+
+        received = await _send_through_link(config, 1)
+
+        assert sorted(received) == list(range(20))
+        assert received != sorted(received)
+
+    @mark.asyncio
+    async def test_bandwidth_cap_drops_over_queue_limit(self):
+        link = Link(
+            LinkConfig(bandwidth_bytes_per_second=10_000, max_queue_seconds=0.015),
+            Random(0),
+            get_running_loop(),
+        )
+        received = []
+
+        for _ in range(3):
+            link.send(bytes(100), received.append)
+
+        await sleep(0.015)
+        assert len(received) == 1
+        await sleep(0.015)
+        assert len(received) == 2
+        assert link.dropped_count == 1
+
+
+async def _send_through_link(config: LinkConfig, seed: int) -> list[int]:
+    link = Link(config, Random(seed), get_running_loop())
+    received = []
+
+    for index in range(20):
+        link.send(index, received.append)
+
+    await sleep(0.02)
+    return received
+
+
+async def _create_client():
+    messages = []
+    transport, _ = await get_running_loop().create_datagram_endpoint(
+        lambda: ClientProtocol(messages), remote_addr=(HOST, PROXY_PORT)
+    )
+    return transport, messages
+
+
+async def _handle_message(message: Message):
+    pass
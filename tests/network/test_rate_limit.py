@@ -0,0 +1,50 @@
+from datek_agar_core.metrics import metrics
+from datek_agar_core.network.rate_limit import RateLimiter
+
+from ..utils import Clock
+
+ADDRESS = ("127.0.0.1", 1000)
+OTHER_ADDRESS = ("127.0.0.1", 1001)
+
+
+class TestRateLimiter:
+    def test_allow_refills_tokens(self):
+        clock = Clock()
+        limiter = RateLimiter(rate=10, burst=3, clock=clock)
+
+        assert [limiter.allow(ADDRESS) for _ in range(4)] == [True] * 3 + [False]
+        assert limiter.allow(OTHER_ADDRESS)
+
+        clock.now += 0.1
+        assert limiter.allow(ADDRESS)
+        assert not limiter.allow(ADDRESS)
+
+    def test_block_repeat_offender(self):
+        clock = Clock()
+        limiter = RateLimiter(
+            rate=1, burst=1, block_after=3, block_seconds=5, clock=clock
+        )
+        blocked = metrics.get("blocked_addresses_total")
+        blocked_count = blocked.get()
+
+        for _ in range(4):
+            limiter.allow(ADDRESS)
+
+        assert limiter.is_blocked(ADDRESS)
+        assert blocked.get() == blocked_count + 1
+
+        clock.now += 2
+        assert not limiter.allow(ADDRESS)
+
+        clock.now += 4
+        assert limiter.allow(ADDRESS)
+
+    def test_idle_addresses_are_forgotten(self):
+        clock = Clock()
+        limiter = RateLimiter(rate=1, burst=2, sweep_seconds=10, clock=clock)
+        limiter.allow(ADDRESS)
+
+        clock.now += 11
+        limiter.allow(OTHER_ADDRESS)
+
+        assert len(limiter) == 1
@@ -1,17 +1,33 @@
-from asyncio import sleep
+import numpy as np
+from asyncio import get_running_loop, sleep
+from collections import Counter
 from logging import ERROR
+from socket import SOL_SOCKET, SO_RCVBUF, SO_SNDBUF
 from unittest.mock import patch, MagicMock
 
-from datek_agar_core.game import Game, REFRESH_INTERVAL
+from datek_agar_core.game import Game, REFRESH_FREQUENCY, REFRESH_INTERVAL
+from datek_agar_core.network.encoder import MessageEncoder
+from datek_agar_core.metrics import metrics
 from datek_agar_core.network.message import Message, MessageType
-from datek_agar_core.network.server import AddressRegistry, UDPServer, GameStatusFilter
-from datek_agar_core.types import Bacteria, GameStatus, Organism
+from datek_agar_core.network.rate_limit import RateLimiter
+from datek_agar_core.network.server import (
+    AddressRegistry,
+    UDPServer,
+    GameStatusFilter,
+    Session,
+    SessionRegistry,
+    SpectatorView,
+    WHOLE_WORLD,
+)
+from datek_agar_core.overload import OverloadController, OverloadLevel
+from datek_agar_core.types import Bacteria, Organism
 from datek_agar_core.universe import Universe
+from datek_agar_core.world import BacteriaStore, World
 from msgpack import packb
 from pytest import mark, raises
 
-from ..conftest import HOST, PORT
-from ..utils import AsyncFunction
+from ..conftest import HOST, PORT, ClientProtocol
+from ..utils import AsyncFunction, Clock
 
 
 class TestAddressRegistry:
@@ -43,6 +59,31 @@ class TestAddressRegistry:
         assert not len(addresses)
 
 
+class TestSessionRegistry:
+    @mark.asyncio
+    async def test_rebind_and_reap(self):
+        reaped = []
+
+        async def reap(session: Session):
+            reaped.append(session)
+
+        registry = SessionRegistry(0.001, reap)
+        session = registry.create(1, "a:1")
+        abandoned = registry.create(2, "b:1")
+
+        assert registry.get(session.token) is session
+        assert registry.rebind(session, "b:1") == "a:1"
+        assert session.address == "b:1"
+        assert abandoned.address is None
+
+        registry.start()
+        await sleep(0.01)
+        registry.stop()
+
+        assert {item.player_id for item in reaped} == {1, 2}
+        assert not len(registry)
+
+
 class TestUDPServer:
     @mark.asyncio
     async def test_connect(self, test_client, connect_message, caplog):
@@ -50,9 +91,9 @@ class TestUDPServer:
         transport.sendto(connect_message.pack(), (HOST, PORT))
         await sleep(REFRESH_INTERVAL)
 
-        assert len(messages) == 1
-        unpacked = Message.unpack(messages[0])
-        assert unpacked.type == connect_message.type
+        unpacked = [Message.unpack(message) for message in messages]
+        assert unpacked[0].type == connect_message.type
+        assert [message.type for message in unpacked].count(connect_message.type) == 1
 
     @mark.asyncio
     async def test_ping(self, test_client, test_server):
@@ -87,6 +128,300 @@ class TestUDPServer:
 
         assert change_bacteria_speed.called_count
 
+    @mark.asyncio
+    @mark.parametrize(
+        ["message_type", "method"],
+        [
+            (MessageType.SPLIT, Game.split_bacteria.__name__),
+            (MessageType.EJECT, Game.eject.__name__),
+        ],
+    )
+    async def test_split_and_eject(self, connected_client, message_type, method):
+        transport, messages = connected_client
+        await sleep(REFRESH_INTERVAL)
+        player_id = Message.unpack(messages[0]).bacteria_id
+        message = Message(type=message_type, bacteria_id=player_id + 1)
+
+        game_method = AsyncFunction()
+        with patch.object(Game, method, game_method):
+            transport.sendto(message.pack(), (HOST, PORT))
+            await sleep(REFRESH_INTERVAL)
+
+        assert game_method.called_args == [(player_id,)]
+
+    @mark.asyncio
+    async def test_inputs_without_session_are_ignored(self, test_client):
+        transport = test_client[0]
+
+        split_bacteria = AsyncFunction()
+        with patch.object(Game, Game.split_bacteria.__name__, split_bacteria):
+            transport.sendto(
+                Message(type=MessageType.SPLIT, bacteria_id=1).pack(), (HOST, PORT)
+            )
+            await sleep(REFRESH_INTERVAL)
+
+        assert not split_bacteria.called_count
+
+    @mark.asyncio
+    @mark.parametrize("test_server", [0, 2], indirect=True)
+    async def test_game_status_updates_have_increasing_sequence(self, connected_client):
+        messages = connected_client[1]
+        await sleep(REFRESH_INTERVAL * 4)
+
+        sequences = [
+            message.sequence
+            for message in map(Message.unpack, messages)
+            if message.type == MessageType.GAME_STATUS_UPDATE
+        ]
+        assert len(sequences) >= 2
+        assert sequences == sorted(set(sequences))
+
+    @mark.asyncio
+    async def test_update_every(self, test_client):
+        transport, messages = test_client
+        transport.sendto(
+            Message(type=MessageType.CONNECT, name="John", update_every=3).pack(),
+            (HOST, PORT),
+        )
+        await sleep(REFRESH_INTERVAL * 8)
+
+        connect, *updates = map(Message.unpack, messages)
+        assert connect.tick_rate == REFRESH_FREQUENCY
+        assert connect.update_every == 3
+        assert updates
+        assert all(message.sequence % 3 == 0 for message in updates)
+
+    @mark.asyncio
+    async def test_spectators_share_one_encoding(self, connected_client):
+        loop = get_running_loop()
+        spectators = []
+        for _ in range(2):
+            messages = []
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: ClientProtocol(messages), remote_addr=(HOST, PORT)
+            )
+            spectators.append((transport, messages))
+
+        submit = MessageEncoder.submit
+        submitted = []
+
+        async def submit_spy(encoder: MessageEncoder, message: Message):
+            submitted.append(message.sequence)
+            return await submit(encoder, message)
+
+        with patch.object(MessageEncoder, MessageEncoder.submit.__name__, submit_spy):
+            for transport, _ in spectators:
+                transport.sendto(
+                    Message(type=MessageType.SPECTATE).pack(), (HOST, PORT)
+                )
+
+            for _ in range(10):
+                await sleep(REFRESH_INTERVAL)
+                for transport, _ in spectators:
+                    transport.sendto(
+                        Message(type=MessageType.PING).pack(), (HOST, PORT)
+                    )
+
+        for transport, _ in spectators:
+            transport.close()
+
+        (_, messages), (_, other_messages) = spectators
+        reply, *updates = map(Message.unpack, messages)
+        assert reply.type == MessageType.SPECTATE
+        assert reply.world_size == 100
+        assert reply.update_every == 4
+        assert updates
+        assert all(message.sequence % 4 == 0 for message in updates)
+        assert set(messages[1:]) & set(other_messages[1:])
+        # one encoding for the player and one for all spectators per turn
+        assert max(Counter(submitted).values()) == 2
+
+    @mark.asyncio
+    async def test_reduced_broadcast_halves_every_update_rate(self):
+        clock = Clock()
+        controller = OverloadController(budget_seconds=1, escalate_turns=1, clock=clock)
+        clock.now += 10
+        controller.observe_turn()
+        server = UDPServer(
+            host=HOST,
+            port=PORT,
+            world_size=100,
+            total_nutrient=90,
+            overload_controller=controller,
+        )
+
+        assert controller.level == OverloadLevel.REDUCED_BROADCAST
+        sent = [turn for turn in range(13) if server._is_sent(turn, 1)]
+        assert sent == list(range(0, 13, 2))
+        sent = [turn for turn in range(13) if server._is_sent(turn, 3)]
+        assert sent == [0, 6, 12]
+
+    @mark.asyncio
+    async def test_refuse_connect_if_server_full(self, connect_message):
+        clock = Clock()
+        controller = OverloadController(budget_seconds=1, escalate_turns=1, clock=clock)
+        for _ in OverloadLevel:
+            clock.now += 10
+            controller.observe_turn()
+
+        server = UDPServer(
+            host=HOST,
+            port=PORT,
+            world_size=100,
+            total_nutrient=90,
+            overload_controller=controller,
+        )
+        server.start()
+        await server.wait_started()
+        messages = []
+        transport, _ = await get_running_loop().create_datagram_endpoint(
+            lambda: ClientProtocol(messages), remote_addr=(HOST, PORT)
+        )
+
+        transport.sendto(connect_message.pack(), (HOST, PORT))
+        await sleep(REFRESH_INTERVAL)
+
+        transport.close()
+        server.stop()
+        await server.task
+        assert [Message.unpack(data).type for data in messages] == [
+            MessageType.SERVER_FULL
+        ]
+
+    @mark.asyncio
+    async def test_rate_limit_inputs(self, connect_message):
+        server = UDPServer(
+            host=HOST,
+            port=PORT,
+            world_size=100,
+            total_nutrient=90,
+            rate_limiter=RateLimiter(rate=1, burst=1),
+        )
+        server.start()
+        await server.wait_started()
+        dropped = metrics.get("rate_limited_datagrams_total")
+        dropped_count = dropped.get("rate")
+        messages = []
+        transport, _ = await get_running_loop().create_datagram_endpoint(
+            lambda: ClientProtocol(messages), remote_addr=(HOST, PORT)
+        )
+
+        for _ in range(3):
+            transport.sendto(connect_message.pack(), (HOST, PORT))
+        await sleep(REFRESH_INTERVAL)
+
+        transport.close()
+        server.stop()
+        await server.task
+        assert dropped.get("rate") == dropped_count + 2
+        assert [Message.unpack(data).type for data in messages].count(
+            MessageType.CONNECT
+        ) == 1
+
+    @mark.asyncio
+    async def test_session_rebinds_new_address(self, connected_client):
+        messages = connected_client[1]
+        await sleep(REFRESH_INTERVAL)
+        connect = Message.unpack(messages[0])
+        assert connect.session_token
+
+        loop = get_running_loop()
+        new_messages = []
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: ClientProtocol(new_messages), remote_addr=(HOST, PORT)
+        )
+        transport.sendto(
+            Message(type=MessageType.PING, session_token=connect.session_token).pack(),
+            (HOST, PORT),
+        )
+        await sleep(REFRESH_INTERVAL * 3)
+        transport.close()
+
+        updates = [Message.unpack(data) for data in new_messages]
+        assert updates
+        assert updates[-1].game_status.get_bacteria_by_id(connect.bacteria_id)
+
+    @mark.asyncio
+    async def test_connect_with_session_token_reattaches(
+        self, connected_client, connect_message
+    ):
+        transport, messages = connected_client
+        await sleep(REFRESH_INTERVAL)
+        connect = Message.unpack(messages[0])
+
+        transport.sendto(
+            Message(
+                type=MessageType.CONNECT,
+                name="John",
+                session_token=connect.session_token,
+            ).pack(),
+            (HOST, PORT),
+        )
+        await sleep(REFRESH_INTERVAL)
+
+        reconnect = next(
+            message
+            for message in map(Message.unpack, messages[1:])
+            if message.type == MessageType.CONNECT
+        )
+        assert reconnect.bacteria_id == connect.bacteria_id
+        assert reconnect.session_token == connect.session_token
+
+    @mark.asyncio
+    async def test_save_snapshot_on_stop_and_restore(self, tmp_path):
+        path = tmp_path / "world.snapshot"
+        server = UDPServer(
+            host=HOST, port=PORT, world_size=100, total_nutrient=90, snapshot_path=path
+        )
+        server.start()
+        await server.wait_started()
+        await server._game.add_bacteria("John")
+        await sleep(REFRESH_INTERVAL * 2)
+        server.stop()
+        await server.task
+
+        restored = UDPServer(
+            host=HOST,
+            port=PORT,
+            world_size=100,
+            total_nutrient=90,
+            snapshot_path=path,
+            restore=True,
+        )
+        restored.start()
+        await restored.wait_started()
+        restored.stop()
+        await restored.task
+
+        assert restored._game._world.bacterias.names.tolist() == ["John"]
+        assert restored._game._world.turn > 0
+
+    @mark.asyncio
+    async def test_refuse_to_restore_snapshot_of_other_universe(self, tmp_path):
+        path = tmp_path / "world.snapshot"
+        server = UDPServer(
+            host=HOST, port=PORT, world_size=100, total_nutrient=90, snapshot_path=path
+        )
+        server.start()
+        await server.wait_started()
+        server.stop()
+        await server.task
+
+        restored = UDPServer(
+            host=HOST,
+            port=PORT,
+            world_size=100,
+            total_nutrient=91,
+            snapshot_path=path,
+            restore=True,
+        )
+        restored.start()
+        with raises(ValueError):
+            await restored.wait_started()
+
+        with raises(ValueError):
+            await restored.task
+
     @mark.asyncio
     async def test_player_was_eaten(self, connected_client):
         transport, messages = connected_client[0], connected_client[1]
@@ -110,6 +445,32 @@ class TestUDPServer:
         await sleep(REFRESH_INTERVAL)
         assert caplog.records[1].levelno == ERROR
 
+    @mark.asyncio
+    async def test_socket_options(self):
+        servers = [
+            UDPServer(
+                host=HOST,
+                port=PORT,
+                world_size=100,
+                total_nutrient=90,
+                receive_buffer_bytes=65536,
+                send_buffer_bytes=65536,
+                reuse_port=True,
+            )
+            for _ in range(2)
+        ]
+        for server in servers:
+            server.start()
+            await server.wait_started()
+
+        socket_ = servers[0]._transport.get_extra_info("socket")
+        assert socket_.getsockopt(SOL_SOCKET, SO_RCVBUF) >= 65536
+        assert socket_.getsockopt(SOL_SOCKET, SO_SNDBUF) >= 65536
+
+        for server in servers:
+            server.stop()
+            await server.task
+
     @mark.asyncio
     async def test_raise_error_if_port_is_taken(self, test_server):
         server = UDPServer(
@@ -153,28 +514,84 @@ class TestGameStatusFilter:
             position=[Universe.VIEW_DISTANCE + 5, Universe.VIEW_DISTANCE + 5]
         )
 
-        game_status = GameStatus(
-            bacterias=[bacteria1, bacteria2, bacteria3],
-            organisms=[organism1, organism2],
+        await game_status_filter.set_world(
+            _create_world(
+                bacterias=[bacteria1, bacteria2, bacteria3],
+                organisms=[organism1, organism2],
+            )
         )
 
-        await game_status_filter.set_game_status(game_status)
-
         await game_status_filter.register_player(bacteria1.id, address1)
         await game_status_filter.register_player(bacteria2.id, address2)
         await game_status_filter.register_player(bacteria3.id, address3)
 
         filtered_status = await game_status_filter.get_filtered_game_status(address1)
-        assert set(filtered_status.bacterias) == {bacteria1, bacteria2}
-        assert set(filtered_status.organisms) == {organism1}
+        assert _ids(filtered_status.bacterias) == {bacteria1.id, bacteria2.id}
+        assert _ids(filtered_status.organisms) == {organism1.id}
 
         filtered_status = await game_status_filter.get_filtered_game_status(address2)
-        assert set(filtered_status.bacterias) == {bacteria1, bacteria2}
-        assert set(filtered_status.organisms) == {organism1}
+        assert _ids(filtered_status.bacterias) == {bacteria1.id, bacteria2.id}
+        assert _ids(filtered_status.organisms) == {organism1.id}
 
         filtered_status = await game_status_filter.get_filtered_game_status(address3)
-        assert set(filtered_status.bacterias) == {bacteria3}
-        assert set(filtered_status.organisms) == {organism2}
+        assert _ids(filtered_status.bacterias) == {bacteria3.id}
+        assert _ids(filtered_status.organisms) == {organism2.id}
+
+    @mark.asyncio
+    async def test_get_filtered_game_status_caps_entities(self):
+        game_status_filter = GameStatusFilter(universe, max_visible_entities=3)
+        address = "a"
+        player = Bacteria(position=[50, 50], radius=Universe.BACTERIA_STARTING_RADIUS)
+        big_bacteria = Bacteria(position=[60, 50], radius=3)
+        near_organism = Organism(position=[51, 50])
+        far_organisms = [
+            Organism(position=[50, 55]),
+            Organism(position=[45, 50]),
+            Organism(position=[50, 44]),
+        ]
+        invisible_organism = Organism(position=[50, 50 + Universe.VIEW_DISTANCE + 1])
+
+        await game_status_filter.set_world(
+            _create_world(
+                bacterias=[player, big_bacteria],
+                organisms=[near_organism, *far_organisms, invisible_organism],
+            )
+        )
+        await game_status_filter.register_player(player.id, address)
+
+        filtered_status = await game_status_filter.get_filtered_game_status(address)
+
+        assert _ids(filtered_status.bacterias) == {player.id, big_bacteria.id}
+        assert _ids(filtered_status.organisms) == {near_organism.id}
+        assert filtered_status.omitted_organisms == [0, 0, 1, 0, 1, 0, 1, 0]
+
+    @mark.asyncio
+    async def test_get_filtered_game_status_with_density_grid(self):
+        game_status_filter = GameStatusFilter(universe, density_grid_cells=4)
+        address = "a"
+        player = Bacteria(position=[100, 100], radius=Universe.BACTERIA_STARTING_RADIUS)
+        near_organism = Organism(position=[101, 100])
+        far_organisms = [
+            Organism(position=[85, 100]),
+            Organism(position=[125, 125]),
+            Organism(position=[61, 61]),
+        ]
+
+        await game_status_filter.set_world(
+            _create_world(bacterias=[player], organisms=[near_organism, *far_organisms])
+        )
+        await game_status_filter.register_player(player.id, address)
+
+        filtered_status = await game_status_filter.get_filtered_game_status(address)
+
+        density_grid = filtered_status.density_grid
+        assert _ids(filtered_status.organisms) == {near_organism.id}
+        assert density_grid.cell_size == Universe.VIEW_DISTANCE
+        assert np.array_equal(density_grid.position, [100, 100])
+        assert np.array_equal(
+            density_grid.counts,
+            [[1, 0, 0, 0], [0, 0, 1, 0], [0, 0, 1, 0], [0, 0, 0, 1]],
+        )
 
     @mark.asyncio
     async def test_get_filtered_game_status_returns_none_if_player_not_exists(self):
@@ -186,13 +603,117 @@ class TestGameStatusFilter:
         address = "a"
         game_status_filter = GameStatusFilter(universe)
         await game_status_filter.register_player(1, address)
-        await game_status_filter.set_game_status(GameStatus())
+        await game_status_filter.set_world(World())
 
         assert await game_status_filter.get_filtered_game_status(address) is None
         address_player_id_map = game_status_filter.address_player_id_map
         assert address_player_id_map.get(address) is None
 
 
+class TestSpectatorView:
+    def test_get_region(self):
+        view = SpectatorView(universe)
+
+        assert view.get_region(None) == WHOLE_WORLD
+        assert view.get_region([10, 10]) == 0
+        assert view.get_region([300, 10]) == 4
+        assert view.get_region([10, 999]) == 3
+        assert view.get_region([-10, 10]) == 12
+
+    def test_get_game_status(self):
+        view = SpectatorView(universe)
+        bacteria1 = Bacteria(position=[10, 10])
+        bacteria2 = Bacteria(position=[300, 10])
+        organism = Organism(position=[20, 20])
+        view.set_world(
+            _create_world(bacterias=[bacteria1, bacteria2], organisms=[organism])
+        )
+
+        whole_world = view.get_game_status(WHOLE_WORLD)
+        region = view.get_game_status(0)
+
+        assert _ids(whole_world.bacterias) == {bacteria1.id, bacteria2.id}
+        assert _ids(region.bacterias) == {bacteria1.id}
+        assert _ids(region.organisms) == {organism.id}
+        assert region.density_grid is None
+
+    def test_get_game_status_with_density_grid(self):
+        view = SpectatorView(universe, density_grid_cells=2)
+        organisms = [
+            Organism(position=[10, 10]),
+            Organism(position=[20, 200]),
+            Organism(position=[900, 900]),
+        ]
+        view.set_world(_create_world(organisms=organisms))
+
+        region = view.get_game_status(0)
+        whole_world = view.get_game_status(WHOLE_WORLD)
+
+        assert not region.organisms
+        assert region.density_grid.cell_size == 125
+        assert np.array_equal(region.density_grid.position, [125, 125])
+        assert np.array_equal(region.density_grid.counts, [[1, 1], [0, 0]])
+        assert np.array_equal(whole_world.density_grid.counts, [[2, 0], [0, 1]])
+
+    def test_get_game_status_caps_entities(self):
+        view = SpectatorView(universe, max_visible_entities=2)
+        world = World()
+        world.organisms.add(np.array([[120, 120], [10, 10]]))
+        near, _, big = world.bacterias.add(
+            np.array([[130, 130], [5, 5], [200, 200]]), np.array([0.5, 0.5, 20])
+        )
+        view.set_world(world)
+
+        region = view.get_game_status(0)
+        whole_world = view.get_game_status(WHOLE_WORLD)
+
+        assert not region.organisms
+        assert _ids(region.bacterias) == {near, big}
+        assert not whole_world.organisms
+        assert whole_world.density_grid.counts.sum() == 2
+        assert _ids(whole_world.bacterias) == {near, big}
+
+    def test_whole_world_fits_in_a_datagram(self):
+        universe = Universe(total_nutrient=2250, world_size=1000)
+        rng = np.random.default_rng(0)
+        world = World()
+        world.organisms.add(
+            rng.uniform(0, 1000, (int(2250 / Universe.FOOD_ORGANISM_SIZE), 2))
+        )
+        world.bacterias.add(
+            rng.uniform(0, 1000, (2000, 2)),
+            rng.uniform(0.5, 4, 2000),
+            names=[f"Player {index}" for index in range(2000)],
+        )
+        view = SpectatorView(universe)
+        view.set_world(world)
+
+        message = Message(
+            type=MessageType.GAME_STATUS_UPDATE,
+            game_status=view.get_game_status(WHOLE_WORLD),
+        )
+
+        assert len(message.pack()) <= 65507
+
+
+def _ids(organisms: list[Organism]) -> set[int]:
+    return {organism.id for organism in organisms}
+
+
+def _create_world(
+    bacterias: list[Bacteria] = (), organisms: list[Organism] = ()
+) -> World:
+    world = World(bacterias=BacteriaStore.from_bacterias(bacterias))
+    if organisms:
+        world.organisms.add(
+            np.array([organism.position for organism in organisms]),
+            np.array([organism.radius for organism in organisms]),
+            np.array([organism.id for organism in organisms], np.int64),
+        )
+
+    return world
+
+
 universe = Universe(
     total_nutrient=10,
     world_size=1000,
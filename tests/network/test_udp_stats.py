@@ -0,0 +1,49 @@
+from logging import WARNING
+
+from datek_agar_core.metrics import metrics
+from datek_agar_core.network.udp_stats import UdpStatsSampler, read_udp_stats
+from pytest import mark
+
+SNMP = """Ip: Forwarding DefaultTTL
+Ip: 1 64
+Udp: InDatagrams NoPorts InErrors OutDatagrams RcvbufErrors SndbufErrors
+Udp: {} 1 0 20 {} 0
+UdpLite: InDatagrams NoPorts InErrors OutDatagrams RcvbufErrors SndbufErrors
+UdpLite: 0 0 0 0 0 0
+"""
+
+
+def test_read_udp_stats(tmp_path):
+    path = tmp_path / "snmp"
+    path.write_text(SNMP.format(10, 3))
+
+    stats = read_udp_stats(path)
+
+    assert stats["InDatagrams"] == 10
+    assert stats["RcvbufErrors"] == 3
+    assert len(stats) == 6
+    assert read_udp_stats(tmp_path / "missing") == {}
+
+
+def test_sample_sets_metrics_and_warns_about_drops(tmp_path, caplog):
+    path = tmp_path / "snmp"
+    path.write_text(SNMP.format(10, 3))
+    sampler = UdpStatsSampler(path=path)
+
+    sampler.sample()
+    path.write_text(SNMP.format(15, 7))
+    sampler.sample()
+
+    assert metrics.get("kernel_udp").get("RcvbufErrors") == 7
+    warnings = [record for record in caplog.records if record.levelno == WARNING]
+    assert [record.getMessage() for record in warnings] == [
+        "Kernel dropped UDP datagrams: RcvbufErrors +4"
+    ]
+
+
+@mark.asyncio
+async def test_stop_if_counters_are_missing(tmp_path):
+    sampler = UdpStatsSampler(path=tmp_path / "missing")
+    sampler.start()
+    await sampler.wait_started()
+    await sampler.task
@@ -0,0 +1,74 @@
+from datek_agar_core.benchmark import (
+    PHASES,
+    SCENARIOS,
+    WorldConfig,
+    build_lifecycle,
+    build_world,
+    compare_results,
+    load_results,
+    measure_entity_storage,
+    run_benchmark,
+    run_scenario,
+)
+from datek_agar_core.game import Simulation
+
+config = WorldConfig(bacteria_count=5, food_density=0.01, world_size=100)
+
+
+def test_run_scenario():
+    result = run_scenario(config, ticks=3)
+
+    assert set(result.phases) == set(PHASES)
+    assert all(phase.ops == 3 for phase in result.phases.values())
+    assert result.tick_p99_ns >= result.tick_p50_ns > 0
+
+
+def test_food_density_stays_steady():
+    config = SCENARIOS["medium"]
+    universe, world, _ = build_world(config)
+    lifecycle = build_lifecycle(config)
+    lifecycle.on_spawn(world.organisms.ids)
+    simulation = Simulation(
+        universe=universe, world=world, lifecycle=lifecycle, tick_rate=config.tick_rate
+    )
+    food_count = len(world.organisms)
+
+    for _ in range(50):
+        simulation.age_food()
+        simulation.place_food()
+
+    assert len(world.organisms) > food_count * 0.95
+    assert lifecycle.pending_nutrient > 0
+
+
+def test_compare_results():
+    baseline = run_scenario(config, ticks=2)
+    current = baseline.copy(deep=True)
+    current.phases["place_food"].ns_per_op = baseline.phases["place_food"].ns_per_op * 2
+
+    regressions = compare_results({"a": baseline}, {"a": current}, 0.5)
+
+    assert [regression.metric for regression in regressions] == ["place_food"]
+    assert not compare_results({"a": baseline}, {"a": current}, 1.5)
+    assert not compare_results({"b": baseline}, {"a": current}, 0.5)
+
+
+def test_cli_saves_and_compares_baseline(cli_runner, tmp_path):
+    baseline = tmp_path / "baseline.json"
+    args = ["--scenario", "small", "--ticks", "2", "--baseline", str(baseline)]
+
+    result = cli_runner.invoke(run_benchmark, args=args)
+    assert result.exit_code == 0
+    assert "small" in load_results(baseline)
+
+    result = cli_runner.invoke(run_benchmark, args=[*args, "--threshold", "1000"])
+    assert result.exit_code == 0
+
+    result = cli_runner.invoke(run_benchmark, args=[*args, "--threshold", "-1"])
+    assert result.exit_code == 1
+
+
+def test_measure_entity_storage():
+    result = measure_entity_storage(1000)
+
+    assert result.store_bytes < result.model_bytes
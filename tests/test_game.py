@@ -1,9 +1,14 @@
 from asyncio import Queue, sleep, CancelledError
 from math import isclose, floor, pi
 
-from datek_agar_core.game import Game, GameStatus, Simulation, Bacteria, Organism
-from datek_agar_core.universe import Universe
-from pytest import mark
+import numpy as np
+from datek_agar_core.game import Game, Simulation, Bacteria, MERGE_SECONDS
+from datek_agar_core.lifecycle import FoodLifecycle
+from datek_agar_core.metrics import metrics
+from datek_agar_core.persistence import Snapshot, SnapshotHeader
+from datek_agar_core.universe import Universe, HALF_PI
+from datek_agar_core.world import BacteriaStore, World
+from pytest import mark, raises
 
 
 class TestGame:
@@ -18,9 +23,133 @@ class TestGame:
         await game.change_bacteria_speed(bacteria.id, speed_polar_coordinates)
         await game.calculate_turn()
 
+        bacteria = (await queue.get()).get_bacteria_by_id(bacteria.id)
+        assert bacteria.name == "John"
         assert isclose(bacteria.position[0], 49.875, rel_tol=0.001)
         assert isclose(bacteria.position[1], 50, rel_tol=0.001)
 
+    @mark.asyncio
+    async def test_change_bacteria_speed_moves_every_cell(self):
+        queue = Queue()
+        game = Game(game_status_queue=queue, universe=universe)
+        bacteria = await game.add_bacteria("John", [50, 50])
+        game._world.bacterias.radii[0] = 2
+        await game.split_bacteria(bacteria.id)
+        await game.change_bacteria_speed(bacteria.id, (1, 0))
+        await game.calculate_turn()
+
+        world = await queue.get()
+        rows = world.bacterias.rows_of_owner(bacteria.id)
+        assert len(rows) == 2
+        assert np.all(world.bacterias.speeds[rows, 0] > 0)
+        assert np.allclose(
+            world.bacterias.speeds[rows, 0], world.bacterias.max_speeds[rows]
+        )
+
+    @mark.asyncio
+    async def test_tick_rate_and_broadcast_every(self):
+        queue = Queue()
+        game = Game(
+            game_status_queue=queue, universe=universe, tick_rate=20, broadcast_every=2
+        )
+        bacteria = await game.add_bacteria("John", [50, 50])
+        await game.change_bacteria_speed(bacteria.id, (1, pi))
+
+        await game.calculate_turn()
+        assert queue.empty()
+
+        await game.calculate_turn()
+        world = await queue.get()
+        assert world.turn == 2
+        assert isclose(world.get_bacteria_by_id(bacteria.id).position[0], 49.5)
+
+    @mark.asyncio
+    async def test_remove_player(self):
+        game = Game(game_status_queue=Queue(), universe=universe)
+        bacteria = await game.add_bacteria("John", [50, 50])
+        game._world.bacterias.radii[0] = 2
+        await game.split_bacteria(bacteria.id)
+        other = await game.add_bacteria("Jenny", [10, 10])
+
+        await game.remove_player(bacteria.id)
+
+        assert not await game.has_player(bacteria.id)
+        assert await game.has_player(other.id)
+        assert len(game._world.bacterias) == 1
+
+    @mark.asyncio
+    async def test_restore_snapshot(self):
+        game = Game(game_status_queue=Queue(), universe=universe)
+        bacteria = await game.add_bacteria("John", [50, 50])
+        await game.calculate_turn()
+        snapshot = await game.create_snapshot({"token": bacteria.id})
+
+        restored = Game(game_status_queue=Queue(), universe=universe)
+        restored.restore_snapshot(snapshot)
+        await game.calculate_turn()
+        await restored.calculate_turn()
+
+        assert restored._world.turn == game._world.turn == 2
+        assert np.array_equal(
+            restored._world.organisms.positions, game._world.organisms.positions
+        )
+        assert restored._world.get_bacteria_by_id(bacteria.id).name == "John"
+
+    @mark.asyncio
+    async def test_restored_game_continues_identically(self):
+        game = Game(
+            game_status_queue=Queue(), universe=universe, food_lifetime_seconds=0.05
+        )
+        await game.add_bacteria("John")
+        for _ in range(3):
+            await game.calculate_turn()
+
+        snapshot = await game.create_snapshot()
+        restored = Game(
+            game_status_queue=Queue(), universe=universe, food_lifetime_seconds=0.05
+        )
+        restored.restore_snapshot(snapshot)
+
+        for _ in range(5):
+            await game.calculate_turn()
+            await restored.calculate_turn()
+
+        added = await game.add_bacteria("Jenny")
+        restored_added = await restored.add_bacteria("Jenny")
+        assert np.array_equal(added.position, restored_added.position)
+        assert added.hue == restored_added.hue
+        assert np.array_equal(
+            restored._world.organisms.positions, game._world.organisms.positions
+        )
+
+    def test_restore_snapshot_of_other_universe(self):
+        game = Game(game_status_queue=Queue(), universe=universe)
+        snapshot = Snapshot(
+            SnapshotHeader(
+                world_size=universe.world_size,
+                total_nutrient=universe.total_nutrient + 1,
+                turn=0,
+                current_id=0,
+                random_state={},
+            ),
+            World(),
+        )
+
+        with raises(ValueError):
+            game.restore_snapshot(snapshot)
+
+    @mark.asyncio
+    async def test_calculate_turn_records_metrics(self):
+        game = Game(game_status_queue=Queue(), universe=universe)
+        await game.add_bacteria("John", [50, 50])
+        phase_seconds = metrics.get("turn_phase_seconds")
+        count = phase_seconds.count("move_bacterias")
+
+        await game.calculate_turn()
+
+        assert phase_seconds.count("move_bacterias") == count + 1
+        assert metrics.get("entities").get("bacteria") == 1
+
     @mark.asyncio
     async def test_loop(self):
         game = Game(game_status_queue=Queue(), universe=universe)
@@ -37,7 +166,7 @@ class TestGame:
 
 class TestSimulation:
     def test_total_in_game_organics_size(self):
-        game_status = GameStatus()
+        world = World()
         bacteria = Bacteria(
             name="asd",
             current_speed=[0, 0],
@@ -46,18 +175,17 @@ class TestSimulation:
             position=[0, 0],
             radius=1,
         )
-        game_status.bacterias.append(bacteria)
-        organism = Organism(position=[0, 0], radius=2)
-        game_status.organisms.append(organism)
+        world.bacterias = BacteriaStore.from_bacterias([bacteria])
+        world.organisms.add(np.array([[0, 0]]), 2)
 
-        simulation = Simulation(universe=universe, game_status=game_status)
+        simulation = Simulation(universe=universe, world=world)
 
-        wanted = organism.size + bacteria.size
+        wanted = 2**2 * HALF_PI + bacteria.size
         assert isclose(simulation.total_in_game_organics_size, wanted)
 
     def test_place_food(self):
-        game_status = GameStatus()
-        simulation = Simulation(universe=universe, game_status=game_status)
+        world = World()
+        simulation = Simulation(universe=universe, world=world)
 
         wanted_count = floor(
             (universe.total_nutrient - simulation.total_in_game_organics_size)
@@ -66,13 +194,35 @@ class TestSimulation:
 
         simulation.place_food()
 
-        assert len(game_status.organisms) == wanted_count
+        assert len(world.organisms) == wanted_count
+        simulation.place_food()
+        assert len(world.organisms) == wanted_count
+        assert np.all(world.organisms.positions < WORLD_SIZE)
+
+    def test_place_food_holds_back_decayed_nutrient(self):
+        world = World()
+        lifecycle = FoodLifecycle(
+            min_lifetime_turns=1, max_lifetime_turns=1, respawn_turns=5
+        )
+        simulation = Simulation(universe=universe, world=world, lifecycle=lifecycle)
+
+        simulation.place_food()
+        count = len(world.organisms)
+        assert lifecycle.scheduled_count == count
+
+        simulation.age_food()
         simulation.place_food()
-        assert len(game_status.organisms) == wanted_count
+        assert len(world.organisms) == 0
+
+        for _ in range(5):
+            simulation.age_food()
+            simulation.place_food()
+
+        assert len(world.organisms) == count
 
     def test_feed_organisms_to_bacterias(self):
-        game_status = GameStatus()
-        simulation = Simulation(universe=universe, game_status=game_status)
+        world = World()
+        simulation = Simulation(universe=universe, world=world)
 
         bacteria1 = Bacteria(
             name="asd",
@@ -93,28 +243,42 @@ class TestSimulation:
             radius=2,
         )
 
-        organism1 = Organism(
-            position=[1, 1],
-            radius=1,
+        organism_size = 1**2 * HALF_PI
+        organism_ids = world.organisms.add(
+            np.array([[1, 1], [60, 60]]), np.array([1, 2])
         )
-        organism_size = organism1.size
 
-        organism2 = Organism(
-            position=[60, 60],
-            radius=2,
+        world.bacterias = BacteriaStore.from_bacterias([bacteria1, bacteria2])
+
+        simulation.feed_organisms_to_bacterias()
+
+        assert list(world.organisms.ids) == [organism_ids[1]]
+        bacteria1 = world.get_bacteria_by_id(bacteria1.id)
+        assert isclose(bacteria1.size, initial_size + organism_size, rel_tol=0.001)
+        assert isclose(
+            bacteria1.max_speed,
+            universe.calculate_organism_max_speed(bacteria1.radius),
+            rel_tol=0.001,
         )
 
-        game_status.bacterias = [bacteria1, bacteria2]
-        game_status.organisms = [organism1, organism2]
+    def test_food_is_eaten_by_the_first_bacteria_across_the_edge(self):
+        world = World()
+        simulation = Simulation(universe=universe, world=world)
+        world.bacterias.add(
+            np.array([[WORLD_SIZE - 1, 1], [1, WORLD_SIZE - 1], [1, 1]]),
+            np.array([2, 3, 2]),
+        )
+        world.organisms.add(np.array([[0.2, 0.2], [0.5, 50]]), 0.1)
 
         simulation.feed_organisms_to_bacterias()
 
-        assert len(game_status.organisms) == 1
-        assert isclose(bacteria1.size, initial_size + organism_size, rel_tol=0.001)
+        assert len(world.organisms) == 1
+        assert world.bacterias.radii[0] > 2
+        assert np.allclose(world.bacterias.radii[1:], [3, 2])
 
     def test_feed_bacterias_to_bacterias(self):
-        game_status = GameStatus()
-        simulation = Simulation(universe=universe, game_status=game_status)
+        world = World()
+        simulation = Simulation(universe=universe, world=world)
 
         bacteria1 = Bacteria(
             name="asd",
@@ -145,29 +309,125 @@ class TestSimulation:
             radius=2,
         )
 
-        game_status.bacterias = [bacteria1, bacteria2, bacteria3]
+        world.bacterias = BacteriaStore.from_bacterias(
+            [bacteria1, bacteria2, bacteria3]
+        )
 
         simulation.feed_bacterias_to_other_bacterias()
 
-        assert len(game_status.bacterias) == 2
-        assert bacteria2.id not in [bacteria.id for bacteria in game_status.bacterias]
+        assert len(world.bacterias) == 2
+        assert bacteria2.id not in world.bacterias.ids
+        bacteria1 = world.get_bacteria_by_id(bacteria1.id)
         assert isclose(bacteria1.size, initial_size + bacteria2_size, rel_tol=0.001)
 
-    def test_get_organisms_to_eat_returns_empty_list(self):
-        bacteria = Bacteria(
-            name="asd",
-            current_speed=[0, 0],
-            max_speed=0,
-            hue=0,
-            position=[0, 0],
-            radius=1,
+    def test_bigger_bacteria_eats_first_across_the_edge(self):
+        world = World()
+        simulation = Simulation(universe=universe, world=world)
+        ids = world.bacterias.add(
+            np.array([[1, 1], [WORLD_SIZE - 1, 1], [1, 2], [50, 50]]),
+            np.array([3, 4, 1, 3]),
+        )
+
+        simulation.feed_bacterias_to_other_bacterias()
+
+        assert set(world.bacterias.ids) == {ids[1], ids[3]}
+
+    def test_cells_of_a_player_do_not_eat_each_other(self):
+        world = World()
+        simulation = Simulation(universe=universe, world=world)
+        ids = world.bacterias.add(np.array([[0, 0], [1, 0]]), np.array([3, 1]))
+        world.bacterias.owners[1] = ids[0]
+
+        simulation.feed_bacterias_to_other_bacterias()
+
+        assert len(world.bacterias) == 2
+
+    def test_split_cells(self):
+        world = World()
+        simulation = Simulation(universe=universe, world=world, tick_rate=20)
+        size = Universe.MIN_SPLIT_SIZE * 2.2
+        max_speed = universe.calculate_organism_max_speed((size / HALF_PI) ** 0.5)
+        (id_,) = world.bacterias.add(
+            np.array([[10, 10]]),
+            (size / HALF_PI) ** 0.5,
+            speeds=np.array([[0, 1]]),
+            max_speeds=max_speed,
+            names=["John"],
         )
 
-        game_status = GameStatus(bacterias=[bacteria])
+        simulation.split_cells(int(id_))
+        simulation.split_cells(int(id_))
+
+        bacterias = world.bacterias
+        rows = bacterias.rows_of_owner(int(id_))
+        sizes = bacterias.radii**2 * HALF_PI
+        assert len(rows) == 4
+        assert np.allclose(sizes, size / 4)
+        assert np.isclose(np.sum(sizes), size)
+        assert list(bacterias.names) == ["John"] * 4
+        assert np.all(bacterias.merge_countdowns == MERGE_SECONDS * 20)
+        assert np.allclose(bacterias.positions[:, 0], 10)
+        assert bacterias.positions[0, 1] == 10
+        assert np.all(bacterias.positions[1:, 1] > 10)
+        assert np.allclose(bacterias.speeds[:, 1] / bacterias.max_speeds, 1 / max_speed)
+
+    def test_split_cells_respects_max_cell_count(self):
+        world = World()
+        simulation = Simulation(universe=universe, world=world)
+        ids = world.bacterias.add(
+            np.zeros((Universe.MAX_CELL_COUNT, 2)),
+            Universe.BACTERIA_STARTING_RADIUS * 2,
+        )
+        world.bacterias.owners[:] = ids[0]
+
+        simulation.split_cells(int(ids[0]))
+
+        assert len(world.bacterias) == Universe.MAX_CELL_COUNT
 
-        simulation = Simulation(universe=universe, game_status=game_status)
+    def test_merge_cells(self):
+        world = World()
+        simulation = Simulation(universe=universe, world=world)
+        bacterias = world.bacterias
+        ids = bacterias.add(
+            np.array([[10, 10], [10.5, 10], [11, 10], [30, 30]]),
+            np.array([2, 1, 1, 1]),
+            merge_countdowns=np.array([1, 1, 2, 0]),
+        )
+        bacterias.owners[:3] = ids[0]
+        bacterias.owners[3] = ids[0]
+        sizes = bacterias.radii.astype(np.float64) ** 2 * HALF_PI
+
+        simulation.merge_cells()
+
+        assert set(bacterias.ids) == {ids[0], ids[2], ids[3]}
+        assert np.isclose(bacterias.radii[0] ** 2 * HALF_PI, sizes[0] + sizes[1])
+        assert bacterias.merge_countdowns[bacterias.row_of(int(ids[2]))] == 1
+
+    def test_eject(self):
+        world = World()
+        simulation = Simulation(universe=universe, world=world)
+        (id_,) = world.bacterias.add(
+            np.array([[10, 10]]), 2, speeds=np.array([[-1, 0]])
+        )
+        size = world.bacterias.total_size
+
+        simulation.eject(int(id_))
+
+        assert len(world.organisms) == 1
+        assert np.isclose(world.organisms.radii[0], Universe.EJECTED_ORGANISM_RADIUS)
+        assert world.organisms.positions[0, 0] < 10 - 2
+        assert np.isclose(
+            world.bacterias.total_size + world.organisms.total_size, size, rtol=1e-5
+        )
+
+    def test_feed_organisms_to_bacterias_without_food(self):
+        world = World()
+        world.bacterias.add(np.zeros((1, 2)), 1)
+        simulation = Simulation(universe=universe, world=world)
+
+        simulation.feed_organisms_to_bacterias()
 
-        assert not simulation.get_organisms_to_eat(bacteria)
+        assert world.bacterias.radii[0] == 1
 
 
 WORLD_SIZE = 100
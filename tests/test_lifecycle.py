@@ -0,0 +1,83 @@
+import numpy as np
+from datek_agar_core.lifecycle import ExpiryQueue, FoodLifecycle
+from datek_agar_core.universe import Universe
+from datek_agar_core.world import OrganismStore
+
+
+class TestExpiryQueue:
+    def test_advance_returns_ids_due_on_the_tick(self):
+        queue = ExpiryQueue()
+
+        queue.schedule(np.array([1, 2, 3, 4]), np.array([2, 1, 2, 0]))
+        queue.schedule(np.array([5]), 2)
+
+        assert len(queue) == 5
+        assert sorted(queue.advance()) == [2, 4]
+        assert sorted(queue.advance()) == [1, 3, 5]
+        assert len(queue.advance()) == 0
+        assert len(queue) == 0
+        assert queue.tick == 3
+
+    def test_restore_scheduled_ids(self):
+        queue = ExpiryQueue()
+        queue.schedule(np.array([1, 2, 3]), np.array([2, 1, 2]))
+        queue.advance()
+
+        restored = ExpiryQueue()
+        restored.restore(queue.tick, *queue.get_scheduled())
+
+        assert len(restored) == 2
+        assert sorted(restored.advance()) == [1, 3]
+        assert restored.tick == 2
+
+
+class TestFoodLifecycle:
+    def test_decayed_food_is_removed_and_respawned_later(self):
+        organisms = OrganismStore()
+        lifecycle = FoodLifecycle(
+            min_lifetime_turns=2, max_lifetime_turns=2, respawn_turns=3
+        )
+        ids = organisms.add(np.zeros((3, 2)))
+        lifecycle.on_spawn(ids)
+        organisms.remove_rows(np.array([organisms.row_of(int(ids[0]))]))
+
+        assert lifecycle.advance(organisms) == 0
+        assert lifecycle.advance(organisms) == 2
+        assert len(organisms) == 0
+        assert lifecycle.scheduled_count == 0
+        assert np.isclose(
+            lifecycle.pending_nutrient, 2 * Universe.FOOD_ORGANISM_SIZE, rtol=1e-5
+        )
+
+        lifecycle.advance(organisms)
+        lifecycle.advance(organisms)
+        assert lifecycle.pending_nutrient > 0
+
+        lifecycle.advance(organisms)
+        assert lifecycle.pending_nutrient == 0
+
+    def test_restored_lifecycle_continues_identically(self):
+        organisms = OrganismStore()
+        lifecycle = FoodLifecycle(
+            min_lifetime_turns=1, max_lifetime_turns=4, respawn_turns=3, seed=0
+        )
+        lifecycle.on_spawn(organisms.add(np.zeros((20, 2))))
+        lifecycle.advance(organisms)
+        lifecycle.advance(organisms)
+
+        restored_organisms = organisms.copy()
+        restored = FoodLifecycle(
+            min_lifetime_turns=1, max_lifetime_turns=4, respawn_turns=3
+        )
+        restored.restore(lifecycle.get_state())
+
+        assert restored.pending_nutrient == lifecycle.pending_nutrient
+        assert restored.scheduled_count == lifecycle.scheduled_count
+        ids = organisms.add(np.zeros((5, 2)))
+        lifecycle.on_spawn(ids)
+        restored_organisms.add(np.zeros((5, 2)), ids=ids)
+        restored.on_spawn(ids)
+        for _ in range(5):
+            assert restored.advance(restored_organisms) == lifecycle.advance(organisms)
+            assert restored.pending_nutrient == lifecycle.pending_nutrient
+            assert sorted(restored_organisms.ids) == sorted(organisms.ids)
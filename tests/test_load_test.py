@@ -0,0 +1,73 @@
+from random import Random
+
+from datek_agar_core.game import REFRESH_FREQUENCY
+from datek_agar_core.load_test import (
+    PATTERNS,
+    BotStats,
+    create_report,
+    fetch_metric,
+    run_bots,
+)
+from datek_agar_core.metrics import AdminServer, MetricsRegistry
+from pytest import mark
+
+from .conftest import HOST, PORT
+
+
+@mark.asyncio
+async def test_run_bots(test_server):
+    stats = await run_bots(
+        host=HOST,
+        port=PORT,
+        bots=2,
+        duration_seconds=0.3,
+        change_interval_sec=0.05,
+    )
+
+    assert len(stats) == 2
+    assert all(item.connect_seconds is not None for item in stats)
+    assert all(item.frames_received for item in stats)
+    assert all(item.frame_rate == REFRESH_FREQUENCY for item in stats)
+
+
+def test_create_report():
+    stats = [
+        BotStats(
+            connect_seconds=0.01,
+            connected_seconds=1,
+            frame_rate=10,
+            frames_received=8,
+            inter_arrival_seconds=[0.1] * 7,
+        ),
+        BotStats(),
+    ]
+
+    report = create_report(stats, 1, turn_overruns=2)
+
+    assert report.bots == 2
+    assert report.connected_bots == 1
+    assert report.frames_expected == 10
+    assert report.frames_lost == 2
+    assert report.jitter_seconds < 1e-9
+    assert report.turn_overruns == 2
+
+
+@mark.parametrize("pattern", PATTERNS.values())
+def test_patterns(pattern):
+    speed = pattern(1, 0.5, Random(0))
+
+    assert speed is None or 0 <= speed[0] <= 1
+
+
+@mark.asyncio
+async def test_fetch_metric():
+    registry = MetricsRegistry()
+    registry.counter("turn_overruns_total", "Overruns").inc(3)
+    server = AdminServer(host=HOST, port=9998, registry=registry)
+    server.start()
+    await server.wait_started()
+
+    assert await fetch_metric(HOST, 9998, "agar_turn_overruns_total") == 3
+    assert await fetch_metric(HOST, 9998, "agar_missing") is None
+
+    server.stop()
@@ -0,0 +1,76 @@
+from asyncio import open_connection
+
+from datek_agar_core.metrics import AdminServer, MetricsRegistry
+from pytest import fixture, mark
+
+ADMIN_HOST = "127.0.0.1"
+ADMIN_PORT = 9998
+
+
+class TestMetricsRegistry:
+    def test_render_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("packets_total", "Packets", ("direction",))
+        gauge = registry.gauge("entities", "Entities")
+
+        counter.inc(2, "in")
+        counter.inc(1, "in")
+        gauge.set(5)
+
+        assert counter.get("in") == 3
+        assert registry.counter("packets_total", "Packets") is counter
+
+        rendered = registry.render()
+        assert "# TYPE agar_packets_total counter" in rendered
+        assert 'agar_packets_total{direction="in"} 3' in rendered
+        assert "agar_entities 5" in rendered
+
+    def test_render_histogram(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("seconds", "Seconds", ("phase",), (0.1, 1))
+
+        histogram.observe(0.05, "move")
+        histogram.observe(0.5, "move")
+        histogram.observe(5, "move")
+
+        assert histogram.count("move") == 3
+        rendered = registry.render()
+        assert 'agar_seconds_bucket{phase="move",le="0.1"} 1' in rendered
+        assert 'agar_seconds_bucket{phase="move",le="1"} 2' in rendered
+        assert 'agar_seconds_bucket{phase="move",le="+Inf"} 3' in rendered
+        assert 'agar_seconds_count{phase="move"} 3' in rendered
+
+
+class TestAdminServer:
+    @mark.asyncio
+    async def test_metrics_endpoint(self, admin_server):
+        response = await _get("/metrics")
+
+        assert response.startswith(b"HTTP/1.1 200 OK")
+        assert b"agar_requests_total 1" in response
+
+    @mark.asyncio
+    async def test_not_found(self, admin_server):
+        response = await _get("/")
+
+        assert response.startswith(b"HTTP/1.1 404 Not Found")
+
+
+@fixture
+async def admin_server():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").inc()
+    server = AdminServer(host=ADMIN_HOST, port=ADMIN_PORT, registry=registry)
+    server.start()
+    await server.wait_started()
+    yield server
+    server.stop()
+
+
+async def _get(path: str) -> bytes:
+    reader, writer = await open_connection(ADMIN_HOST, ADMIN_PORT)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
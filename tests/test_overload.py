@@ -0,0 +1,67 @@
+from datek_agar_core.overload import OverloadController, OverloadLevel
+
+from .utils import Clock
+
+
+class TestOverloadController:
+    def test_level_steps_up_and_recovers_with_hysteresis(self):
+        clock = Clock()
+        controller = create_controller(clock)
+
+        for _ in range(3):
+            observe_turn(controller, clock, 2)
+
+        assert controller.level == OverloadLevel.REDUCED_BROADCAST
+
+        for _ in range(10):
+            observe_turn(controller, clock, 0.75)
+
+        assert controller.level == OverloadLevel.REDUCED_BROADCAST
+
+        for _ in range(4):
+            observe_turn(controller, clock, 0)
+
+        assert controller.level == OverloadLevel.NORMAL
+
+    def test_level_is_capped(self):
+        clock = Clock()
+        controller = create_controller(clock)
+
+        for _ in range(100):
+            observe_turn(controller, clock, 2)
+
+        assert controller.level == OverloadLevel.FULL
+
+    def test_work_between_turns_and_queue_depth_count(self):
+        clock = Clock()
+        controller = create_controller(clock)
+
+        for _ in range(3):
+            # broadcast of the previous turn and this turn
+            clock.now += 0.6
+            observe_turn(controller, clock, 0.6)
+
+        assert controller.level == OverloadLevel.REDUCED_BROADCAST
+
+        controller = create_controller(clock)
+        for _ in range(3):
+            controller.observe_queue_depth(5)
+            observe_turn(controller, clock, 0)
+
+        assert controller.level == OverloadLevel.REDUCED_BROADCAST
+
+
+def create_controller(clock: Clock) -> OverloadController:
+    return OverloadController(
+        budget_seconds=1,
+        max_queue_depth=2,
+        escalate_turns=3,
+        recover_turns=4,
+        smoothing=1,
+        clock=clock,
+    )
+
+
+def observe_turn(controller: OverloadController, clock: Clock, seconds: float):
+    clock.now += seconds
+    controller.observe_turn()
@@ -0,0 +1,98 @@
+import numpy as np
+from datek_agar_core.lifecycle import FoodLifecycleState
+from datek_agar_core.persistence import (
+    Snapshot,
+    SnapshotHeader,
+    read_snapshot,
+    write_snapshot,
+)
+from datek_agar_core.universe import Universe
+from datek_agar_core.world import World
+from pytest import raises
+
+
+class TestSnapshot:
+    def test_write_and_read(self, tmp_path):
+        world = World(turn=7)
+        world.organisms.add(np.arange(10).reshape(5, 2), 0.3)
+        world.bacterias.add(
+            np.array([[1, 2], [3, 4], [5, 6]]),
+            np.array([1, 2, 3]),
+            speeds=np.array([[0.5, 0.5], [0, 1], [1, 0]]),
+            names=["John", "Jenny", "Jenny"],
+            owners=np.array([1, 2, 2]),
+            merge_countdowns=np.array([0, 5, 5]),
+        )
+        header = SnapshotHeader(
+            world_size=100,
+            total_nutrient=90,
+            turn=world.turn,
+            current_id=123,
+            random_state=np.random.default_rng(0).bit_generator.state,
+            sessions={"token": 2},
+        )
+        path = tmp_path / "world.snapshot"
+
+        write_snapshot(path, Snapshot(header, world))
+        snapshot = read_snapshot(path)
+
+        assert list(tmp_path.iterdir()) == [path]
+        assert snapshot.header == header
+        assert snapshot.world.turn == 7
+        for store, restored in (
+            (world.organisms, snapshot.world.organisms),
+            (world.bacterias, snapshot.world.bacterias),
+        ):
+            assert store.columns().keys() == restored.columns().keys()
+            for name, column in store.columns().items():
+                assert np.array_equal(column, restored.columns()[name])
+
+        assert list(snapshot.world.bacterias.rows_of_owner(2)) == [1, 2]
+
+    def test_write_and_read_lifecycle(self, tmp_path):
+        random_state = np.random.default_rng(1).bit_generator.state
+        lifecycle = FoodLifecycleState(
+            tick=10,
+            decay_ids=np.array([3, 4, 5]),
+            decay_ticks=np.array([11, 11, 14]),
+            respawn_queue=[(12, 0.5), (13, 0.25)],
+            random_state=random_state,
+        )
+        path = tmp_path / "world.snapshot"
+
+        write_snapshot(path, Snapshot(_create_header(), World(), lifecycle))
+        restored = read_snapshot(path).lifecycle
+
+        assert restored.tick == 10
+        assert np.array_equal(restored.decay_ids, [3, 4, 5])
+        assert np.array_equal(restored.decay_ticks, [11, 11, 14])
+        assert restored.respawn_queue == [(12, 0.5), (13, 0.25)]
+        assert restored.random_state == random_state
+
+    def test_read_raises_error_if_universe_differs(self, tmp_path):
+        path = tmp_path / "world.snapshot"
+        write_snapshot(path, Snapshot(_create_header(), World()))
+
+        read_snapshot(path, Universe(world_size=100, total_nutrient=90))
+        with raises(ValueError):
+            read_snapshot(path, Universe(world_size=100, total_nutrient=91))
+
+        with raises(ValueError):
+            read_snapshot(path, Universe(world_size=101, total_nutrient=90))
+
+    def test_read_raises_error_if_not_snapshot(self, tmp_path):
+        path = tmp_path / "world.snapshot"
+        path.write_bytes(b"something else")
+
+        with raises(ValueError):
+            read_snapshot(path)
+
+
+def _create_header() -> SnapshotHeader:
+    return SnapshotHeader(
+        world_size=100,
+        total_nutrient=90,
+        turn=0,
+        current_id=0,
+        random_state=np.random.default_rng(0).bit_generator.state,
+    )
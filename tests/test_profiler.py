@@ -0,0 +1,62 @@
+from pathlib import Path
+from pstats import Stats
+
+from datek_agar_core.profiler import TurnProfiler
+from pytest import mark
+
+
+def test_profiles_windows(tmp_path):
+    profiler = TurnProfiler(
+        directory=tmp_path, window_turns=2, interval_turns=3, enabled=True
+    )
+
+    for _ in range(7):
+        profiler.on_turn()
+        _work()
+
+    profiler.stop()
+
+    files = sorted(tmp_path.glob("*.pstats"))
+    assert _turns(files) == [(1, 2), (4, 5), (7, 7)]
+    assert Stats(str(files[0])).total_calls
+
+
+def test_toggle(tmp_path):
+    profiler = TurnProfiler(directory=tmp_path, window_turns=10)
+
+    profiler.on_turn()
+    assert not profiler.is_profiling
+
+    profiler.toggle()
+    profiler.on_turn()
+    assert profiler.is_profiling
+
+    profiler.toggle()
+    assert not profiler.is_profiling
+    assert len(list(tmp_path.glob("*.pstats"))) == 1
+
+
+@mark.parametrize(
+    ["keep_files", "kept"], [(0, []), (1, [(5, 5)]), (2, [(4, 4), (5, 5)])]
+)
+def test_rotates_files(tmp_path, keep_files, kept):
+    profiler = TurnProfiler(
+        directory=tmp_path, window_turns=1, interval_turns=1, keep_files=keep_files
+    )
+    profiler.toggle()
+
+    for index in range(5):
+        profiler.on_turn()
+
+    profiler.stop()
+
+    assert _turns(sorted(tmp_path.glob("*.pstats"))) == kept
+
+
+def _turns(files: list[Path]) -> list[tuple[int, int]]:
+    turns = [path.stem.split("-turns-")[1].split("-") for path in files]
+    return [(int(first), int(last)) for first, last in turns]
+
+
+def _work():
+    sum(range(100))
@@ -2,6 +2,7 @@ from threading import Thread
 from time import sleep
 
 from datek_agar_core.run_server import run_server, stop_server
+from pytest import mark
 from tests.conftest import PORT, HOST
 
 
@@ -12,6 +13,68 @@ def test_run(cli_runner):
     assert result.exit_code == 0
 
 
+def test_run_with_admin_server(cli_runner):
+    Thread(target=stop, args=(0.1,)).start()
+    result = cli_runner.invoke(run_server, args="--admin-port 9997")
+
+    assert result.exit_code == 0
+
+
+def test_run_with_profiler(cli_runner, tmp_path):
+    Thread(target=stop, args=(0.2,)).start()
+    result = cli_runner.invoke(
+        run_server,
+        args=f"--profile --profile-dir {tmp_path} --profile-window 2",
+    )
+
+    assert result.exit_code == 0
+    assert list(tmp_path.glob("*.pstats"))
+
+
+def test_negative_profile_keep_is_rejected(cli_runner):
+    result = cli_runner.invoke(run_server, args="--profile-keep -1")
+
+    assert result.exit_code == 2
+
+
+def test_negative_food_lifetime_is_rejected(cli_runner):
+    result = cli_runner.invoke(run_server, args="--food-lifetime -1")
+
+    assert result.exit_code == 2
+
+
+@mark.parametrize(
+    "args",
+    [
+        "--tick-rate 0",
+        "--broadcast-rate 0",
+        "--broadcast-rate -1",
+        "--tick-rate 20 --broadcast-rate 40",
+    ],
+)
+def test_invalid_rates_are_rejected(cli_runner, args):
+    result = cli_runner.invoke(run_server, args=args)
+
+    assert result.exit_code == 2
+
+
+def test_restore_without_snapshot_is_rejected(cli_runner):
+    result = cli_runner.invoke(run_server, args="--restore")
+
+    assert result.exit_code == 2
+    assert "--restore requires --snapshot" in result.output
+
+
+def test_run_with_ingress_workers(cli_runner, tmp_path):
+    Thread(target=stop, args=(1,)).start()
+    result = cli_runner.invoke(
+        run_server,
+        args=f"--ingress-workers 1 --ingress-socket {tmp_path / 'ingress.sock'}",
+    )
+
+    assert result.exit_code == 0
+
+
 def test_port_already_in_use(test_server, cli_runner):
     result = cli_runner.invoke(run_server, args=f"--host {HOST} --port {PORT}")
 
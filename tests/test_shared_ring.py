@@ -0,0 +1,84 @@
+from concurrent.futures import ProcessPoolExecutor
+from uuid import uuid4
+
+import numpy as np
+from datek_agar_core.shared_ring import WorldRingPublisher, WorldRingReader
+from datek_agar_core.world import World
+from pytest import fixture
+
+
+class TestWorldRing:
+    def test_read_latest_returns_views_of_published_world(self, publisher):
+        reader = WorldRingReader(publisher.name)
+        assert reader.read_latest() is None
+
+        world = create_world()
+        publisher.publish(world)
+        world.turn += 1
+        world.organisms.positions[0] = (9, 9)
+        publisher.publish(world)
+
+        snapshot = reader.read_latest()
+        assert snapshot.turn == 1
+        assert np.array_equal(
+            snapshot.organisms["positions"], world.organisms.positions
+        )
+        assert np.array_equal(snapshot.bacterias["owners"], world.bacterias.owners)
+        assert snapshot.is_valid()
+
+        for _ in range(2):
+            publisher.publish(world)
+
+        assert not snapshot.is_valid()
+        del snapshot
+        reader.close()
+
+    def test_publish_truncates_to_capacity(self, publisher):
+        world = create_world()
+        world.organisms.add(np.zeros((10, 2)))
+        publisher.publish(world)
+        reader = WorldRingReader(publisher.name)
+
+        snapshot = reader.read_latest()
+
+        assert len(snapshot.organisms["ids"]) == 8
+        del snapshot
+        reader.close()
+
+    def test_read_from_other_process(self, publisher):
+        world = create_world()
+        publisher.publish(world)
+
+        with ProcessPoolExecutor(1) as executor:
+            turn, ids = executor.submit(_read_latest, publisher.name).result()
+
+        assert turn == world.turn
+        assert ids == world.bacterias.ids.tolist()
+
+
+@fixture
+def publisher() -> WorldRingPublisher:
+    publisher = WorldRingPublisher(
+        f"agar-test-{uuid4().hex[:8]}",
+        slot_count=2,
+        organism_capacity=8,
+        bacteria_capacity=4,
+    )
+    yield publisher
+    publisher.close()
+
+
+def create_world() -> World:
+    world = World()
+    world.organisms.add(np.arange(6).reshape(3, 2))
+    world.bacterias.add(np.ones((2, 2)), owners=np.array([5, 5]))
+    return world
+
+
+def _read_latest(name: str) -> tuple[int, list[int]]:
+    reader = WorldRingReader(name)
+    snapshot = reader.read_latest()
+    result = snapshot.turn, snapshot.bacterias["ids"].tolist()
+    del snapshot
+    reader.close()
+    return result
@@ -1,5 +1,12 @@
 import numpy as np
-from datek_agar_core.types import Position, Bacteria, GameStatus, Organism
+from datek_agar_core.types import (
+    Position,
+    Bacteria,
+    DensityGrid,
+    GameStatus,
+    Organism,
+    IdAllocator,
+)
 from pydantic import ValidationError
 from pydantic.main import BaseModel
 from pytest import raises
@@ -45,6 +52,27 @@ class TestPosition:
             Box(x="a", y=(0, 6))
 
 
+class TestDensityCounts:
+    def test_bytes_are_reshaped_to_square(self):
+        density_grid = DensityGrid(position=(0, 0), cell_size=1, counts=bytes(range(4)))
+
+        assert density_grid.counts.dtype == np.uint8
+        assert np.array_equal(density_grid.counts, [[0, 1], [2, 3]])
+
+    def test_raises_validation_error_if_not_square(self):
+        with raises(ValidationError):
+            DensityGrid(position=(0, 0), cell_size=1, counts=bytes(3))
+
+
+class TestIdAllocator:
+    def test_create_many_continues_and_wraps(self):
+        allocator = IdAllocator(max_count=5)
+
+        assert allocator.create() == 1
+        assert list(allocator.create_many(5)) == [2, 3, 4, 0, 1]
+        assert allocator.create() == 2
+
+
 class Box(BaseModel):
     x: Position
     y: Position
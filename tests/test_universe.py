@@ -1,5 +1,5 @@
 import numpy as np
-from datek_agar_core.universe import Universe
+from datek_agar_core.universe import Universe, ScratchBuffer
 from pydantic import BaseModel
 
 
@@ -20,3 +20,82 @@ class TestUniverse:
 
         is_close = np.isclose(result, wanted_result, rtol=0.001)
         assert np.all(is_close)
+
+    def test_calculate_view_distance(self):
+        universe = Universe(total_nutrient=20, world_size=100)
+
+        view_distances = universe.calculate_view_distance(
+            np.array([0.1, Universe.BACTERIA_STARTING_RADIUS * 4, 100])
+        )
+
+        assert np.allclose(
+            view_distances,
+            [Universe.VIEW_DISTANCE, Universe.VIEW_DISTANCE * 2, 50],
+        )
+
+    def test_calculate_squared_distances(self):
+        universe = Universe(total_nutrient=20, world_size=100)
+        rng = np.random.default_rng(0)
+        origins = rng.uniform(0, 100, (4, 2)).astype(np.float32)
+        points = rng.uniform(0, 100, (50, 2)).astype(np.float32)
+        out = np.empty((4, 50), np.float32)
+        work = np.empty((4, 50), np.float32)
+
+        result = universe.calculate_squared_distances(origins, points, out, work)
+
+        vectors = universe.calculate_position_vector_array(
+            origins[:, None, :], points[None, :, :]
+        )
+        assert result is out
+        assert np.allclose(result, np.sum(vectors**2, axis=2), rtol=1e-4)
+
+    def test_apply_minimal_image_in_place(self):
+        universe = Universe(total_nutrient=20, world_size=100)
+        vectors = np.array([[60, -60], [-10, 99]], np.float32)
+
+        result = universe.apply_minimal_image(vectors)
+
+        assert result is vectors
+        assert np.allclose(vectors, [[-40, 40], [-10, -1]])
+
+    def test_find_candidate_pairs_contains_every_pair_within_radius(self):
+        universe = Universe(total_nutrient=20, world_size=100)
+        rng = np.random.default_rng(0)
+        origins = rng.uniform(0, 100, (40, 2)).astype(np.float32)
+        origins[0] = [99.5, 0.5]
+        radii = rng.uniform(0.5, 8, 40).astype(np.float32)
+        radii[1] = 70
+        points = rng.uniform(0, 100, (500, 2)).astype(np.float32)
+        points[0] = [0.2, 99.8]
+
+        left, right = universe.find_candidate_pairs(origins, radii, points, 4)
+
+        within = universe.calculate_squared_distances(origins, points) <= (
+            radii[:, None] ** 2
+        )
+        candidates = np.zeros_like(within)
+        candidates[left, right] = True
+        assert within[0, 0]
+        assert not np.any(within & ~candidates)
+        assert len(set(zip(left.tolist(), right.tolist()))) == len(left)
+        assert np.all(np.diff(left) >= 0)
+
+    def test_calculate_pair_squared_distances(self):
+        universe = Universe(total_nutrient=20, world_size=100)
+        origins = np.array([[1, 1], [10, 20]], np.float32)
+        points = np.array([[99, 98], [13, 24]], np.float32)
+
+        result = universe.calculate_pair_squared_distances(origins, points)
+
+        assert np.allclose(result, [13, 25])
+
+
+class TestScratchBuffer:
+    def test_reuses_memory(self):
+        buffer = ScratchBuffer()
+
+        large = buffer.get((4, 10))
+        small = buffer.get((2, 3))
+
+        assert small.shape == (2, 3)
+        assert np.shares_memory(large, small)
@@ -0,0 +1,86 @@
+from asyncio import sleep
+from logging import INFO, Handler, LogRecord, getLogger
+from threading import current_thread, main_thread
+
+from datek_agar_core.utils import LogQueueHandler, LogRateLimiter
+from pytest import fixture, mark
+
+from .utils import Clock
+
+
+class ListHandler(Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages: list[str] = []
+        self.threads = set()
+
+    def emit(self, record: LogRecord):
+        self.messages.append(self.format(record))
+        self.threads.add(current_thread())
+
+
+@fixture
+def handler():
+    handler = ListHandler()
+    logger = getLogger("test_utils")
+    logger.setLevel(INFO)
+    logger.addHandler(handler)
+    yield handler
+    logger.removeHandler(handler)
+
+
+class TestLogRateLimiter:
+    def test_suppress_and_report_with_next_message(self, handler):
+        clock = Clock()
+        rate_limiter = LogRateLimiter(
+            getLogger("test_utils"), burst=2, interval_seconds=1, clock=clock
+        )
+
+        for index in range(5):
+            rate_limiter.log("a", f"a{index}")
+
+        rate_limiter.log("b", "b0")
+        clock.now = 1
+        rate_limiter.log("a", "a5")
+
+        assert handler.messages == [
+            "a0",
+            "a1",
+            "b0",
+            "3 similar messages suppressed in 1s, last: a4",
+            "a5",
+        ]
+
+    @mark.asyncio
+    async def test_report_when_interval_ends(self, handler):
+        rate_limiter = LogRateLimiter(
+            getLogger("test_utils"), level=INFO, burst=1, interval_seconds=0.01
+        )
+
+        for index in range(3):
+            rate_limiter.log("a", f"a{index}")
+
+        await sleep(0.02)
+
+        assert handler.messages == [
+            "a0",
+            "2 similar messages suppressed in 0.01s, last: a2",
+        ]
+
+
+class TestLogQueueHandler:
+    def test_write_on_listener_thread(self):
+        target = ListHandler()
+        queue_handler = LogQueueHandler(target)
+        logger = getLogger("test_utils.queue")
+        logger.addHandler(queue_handler)
+
+        logger.error("in place")
+        queue_handler.start()
+        logger.error("queued")
+        queue_handler.stop()
+        logger.removeHandler(queue_handler)
+
+        assert target.messages == ["in place", "queued"]
+        assert len(target.threads) == 2
+        assert main_thread() in target.threads
@@ -0,0 +1,117 @@
+import numpy as np
+from datek_agar_core.types import Bacteria, Organism
+from datek_agar_core.world import BacteriaStore, OrganismStore, World
+
+
+class TestOrganismStore:
+    def test_add_grows_capacity(self):
+        store = OrganismStore(capacity=2)
+
+        ids = store.add(np.arange(10).reshape(5, 2), 0.3)
+        store.add(np.zeros((3, 2)), np.full(3, 0.5))
+
+        assert len(store) == 8
+        assert list(store.ids[:5]) == list(ids)
+        assert np.array_equal(store.positions[:5], np.arange(10).reshape(5, 2))
+        assert np.isclose(store.radii[5], 0.5)
+
+    def test_remove_rows_keeps_ids_and_positions_together(self):
+        store = OrganismStore()
+        positions = np.array([[id_, id_] for id_ in range(6)])
+        ids = store.add(positions)
+        position_by_id = dict(zip(ids, positions[:, 0]))
+
+        store.row_of(int(ids[0]))
+        store.remove_rows(np.array([0, 2, 5]))
+
+        assert len(store) == 3
+        assert set(store.ids) == {ids[1], ids[3], ids[4]}
+        for id_ in store.ids:
+            row = store.row_of(int(id_))
+            assert store.ids[row] == id_
+            assert store.positions[row][0] == position_by_id[id_]
+
+        assert store.row_of(int(ids[0])) is None
+
+    def test_total_size(self):
+        store = OrganismStore()
+        store.add(np.zeros((2, 2)), np.array([1, 2]))
+
+        assert np.isclose(store.total_size, Organism(radius=1).size * 5)
+
+    def test_copy_is_independent(self):
+        store = OrganismStore()
+        store.add(np.zeros((2, 2)))
+
+        copy = store.copy()
+        store.positions[0] = 5
+        store.remove_rows(np.array([1]))
+
+        assert len(copy) == 2
+        assert np.all(copy.positions == 0)
+
+
+class TestBacteriaStore:
+    def test_remove_rows_moves_every_column(self):
+        store = BacteriaStore(capacity=1)
+        ids = store.add(
+            np.array([[0, 0], [1, 1], [2, 2]]),
+            np.array([1, 2, 3]),
+            speeds=np.array([[0, 0], [1, 1], [2, 2]]),
+            max_speeds=np.array([3, 2, 1]),
+            names=["a", "b", "c"],
+        )
+
+        store.remove_rows(np.array([0]))
+
+        (bacteria,) = store.to_bacterias([store.row_of(int(ids[2]))])
+        assert bacteria.name == "c"
+        assert bacteria.radius == 3
+        assert bacteria.max_speed == 1
+        assert np.array_equal(bacteria.current_speed, [2, 2])
+        assert list(store.names) == ["c", "b"]
+
+    def test_rows_of_owner_follows_changes(self):
+        store = BacteriaStore()
+        ids = store.add(np.zeros((3, 2)))
+        store.owners[2] = ids[0]
+
+        assert list(store.rows_of_owner(int(ids[0]))) == [0, 2]
+
+        store.remove_rows(np.array([0]))
+        (new_id,) = store.add(np.zeros((1, 2)), owners=np.array([ids[0]]))
+
+        assert list(store.ids[store.rows_of_owner(int(ids[0]))]) == [ids[2], new_id]
+        assert not len(store.rows_of_owner(-1))
+
+    def test_from_bacterias(self):
+        bacteria = Bacteria(name="a", current_speed=[1, 2], max_speed=3, hue=0.5)
+
+        store = BacteriaStore.from_bacterias([bacteria])
+        copy = store.copy()
+        store.speeds[0] = 0
+
+        (copied,) = copy.to_bacterias()
+        assert (copied.id, copied.name, copied.max_speed, copied.hue) == (
+            bacteria.id,
+            "a",
+            3,
+            0.5,
+        )
+        assert np.array_equal(copy.speeds[0], [1, 2])
+
+
+class TestWorld:
+    def test_get_by_id(self):
+        bacteria = Bacteria(position=[1, 1])
+        world = World(bacterias=BacteriaStore.from_bacterias([bacteria]))
+        (organism_id,) = world.organisms.add(np.array([[2, 3]]), 1)
+
+        organism = world.get_organism_by_id(int(organism_id))
+
+        assert np.array_equal(world.get_bacteria_by_id(bacteria.id).position, [1, 1])
+        assert np.array_equal(organism.position, [2, 3])
+        assert np.isclose(world.get_bacteria_by_id(bacteria.id).hue, bacteria.hue)
+        assert world.get_bacteria_by_id(-1) is None
+        assert organism.radius == 1
+        assert world.get_organism_by_id(-1) is None
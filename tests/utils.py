@@ -35,3 +35,11 @@ class Function(_BaseFunction):
         self._called_kwargs.append(kwargs)
         self._called_count += 1
         return self._return_value
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now